@@ -0,0 +1,108 @@
+"""
+Realistic Russian-language fixtures for microbenchmarks.
+
+Sizes follow production limits: problems up to ~1500 chars, 4-question
+analysis, discussions up to 25 turns and solutions up to 2500 tokens.
+"""
+
+from typing import Dict, List
+
+SHORT_PROBLEM = "Не могу заставить себя заниматься спортом"
+
+LONG_PROBLEM = (
+    "Уже полгода не могу начать работать утром. Сажусь за компьютер в девять, "
+    "открываю почту, потом соцсети, потом новости, и через час понимаю, что ничего "
+    "не сделал. Пробовал **помодоро**, списки дел, блокировщики сайтов — хватает на "
+    "пару дней. Работаю удалённо, начальник не контролирует, дедлайны размытые. "
+    "Вечером чувствую вину и засиживаюсь до ночи, из-за этого плохо сплю и утром "
+    "всё повторяется. Жена говорит, что я стал раздражительным. "
+) * 3
+
+USER_CONTEXT = {
+    "gender": "female",
+    "age": 32,
+    "occupation": "Продакт-менеджер в IT",
+    "work_format": "remote",
+}
+
+_QUESTIONS = (
+    "В какие моменты утра желание отложить работу сильнее всего?",
+    "Что ты уже пробовал, и почему это переставало работать через пару дней?",
+    "Вспомни день, когда начать получилось легко. Что было иначе?",
+    "Что ты чувствуешь прямо перед тем, как открыть соцсети вместо задачи?",
+)
+_ANSWERS = (
+    "Сразу после завтрака, когда сажусь за стол и вижу список задач.",
+    "Помодоро, списки, блокировщики. Бросал, когда появлялась срочная мелочь.",
+    "Когда был созвон в 9:30 и надо было показать результат команде.",
+    "Тревогу, что задача большая и непонятно с чего начать. Хочется отвлечься.",
+)
+
+SOLUTION_2500_TOKENS = "\n\n".join([
+    "🎯 **В ЧЁМ СУТЬ**\n"
+    + "Проблема не в лени, а в том, что утро начинается с *неопределённой* задачи. "
+    "Мозг избегает неопределённости и ищет быстрый дофамин в соцсетях. " * 6,
+    "💡 **МЕХАНИЗМ**\n"
+    + "Каждое утро ты открываешь __большой список__, видишь размытую задачу и чувствуешь "
+    "тревогу. Соцсети снимают тревогу на минуту, а вечером приходит вина. " * 8,
+    "📋 **ПЛАН ДЕЙСТВИЙ**\n\n*Прямо сейчас (5-15 мин):*\n"
+    + "".join(f"- Шаг {i}: запиши первое действие на завтра в `заметки` одной строкой.\n" for i in range(1, 9))
+    + "\n*На этой неделе:*\n"
+    + "".join(f"- До среды: договорись о созвоне в 9:30 с коллегой №{i} и покажи результат.\n" for i in range(1, 9))
+    + "\n*Долгосрочно (месяц+):*\n"
+    + "".join(f"- Привычка {i}: вечером 5 минут планирования, утром ~~список~~ одна задача.\n" for i in range(1, 7)),
+    "🎯 **ЧТО ИЗМЕНИТСЯ**\n"
+    + "- Через неделю: начинаешь работу за 10 минут после завтрака.\n" * 5
+    + "- Ты почувствуешь: спокойствие вместо вины.\n" * 5,
+    "⚡ **ПЛАН Б (если сорвёшься)**\n"
+    + "Если открыл соцсети — поставь таймер на 2 минуты и сделай [самый маленький шаг](https://example.com). " * 6,
+])
+
+
+def questioning_history(answered: int) -> List[Dict[str, str]]:
+    """Q/A history after `answered` answers (0..4)"""
+    history: List[Dict[str, str]] = []
+    for question, answer in list(zip(_QUESTIONS, _ANSWERS))[:answered]:
+        history.append({"role": "assistant", "content": question})
+        history.append({"role": "user", "content": answer})
+    return history
+
+
+def discussion_history(turns: int) -> List[Dict[str, str]]:
+    """Full analysis + solution + `turns` discussion Q/A pairs"""
+    history = questioning_history(4)
+    history.append({"role": "assistant", "content": SOLUTION_2500_TOKENS})
+    for i in range(turns):
+        history.append({
+            "role": "user",
+            "content": f"Вопрос {i + 1}: а что делать, если утром совсем нет сил даже на первый шаг?",
+        })
+        history.append({
+            "role": "assistant",
+            "content": (
+                "💡 Начни с действия на 2 минуты: открой файл и напиши заголовок. "
+                "Силы приходят *после* начала, а не до него. " * 4
+            ),
+        })
+    return history
+
+
+TITLE_WITH_MARKDOWN = "**Прокрастинация** по утрам и _вина_ вечером"
+
+# (input, strip_markdown, to_telegram_html): checked before timing
+MARKDOWN_CASES = [
+    (TITLE_WITH_MARKDOWN, "Прокрастинация по утрам и вина вечером",
+     "<b>Прокрастинация</b> по утрам и <i>вина</i> вечером"),
+    ("**bold *it***", "bold it", "<b>bold <i>it</i></b>"),
+    ("***both***", "both", "<b><i>both</i></b>"),
+    ("**a *b* c**", "a b c", "<b>a <i>b</i> c</b>"),
+    ("**a** and **b**", "a and b", "<b>a</b> and <b>b</b>"),
+    ("x ** y ** z", "x ** y ** z", "x ** y ** z"),
+    ("2 * 3 * 4", "2 * 3 * 4", "2 * 3 * 4"),
+    ("snake_case и __ a __", "snake_case и __ a __", "snake_case и __ a __"),
+    ("~~x~~ ~~ y ~~", "x ~~ y ~~", "<s>x</s> ~~ y ~~"),
+    ("`**code**` [ссылка](https://t.me/x)", "**code** ссылка",
+     '<code>**code**</code> <a href="https://t.me/x">ссылка</a>'),
+]
+ROOT_CAUSE_500 = SOLUTION_2500_TOKENS[:500]
+PLAN_1500 = SOLUTION_2500_TOKENS[:1500]
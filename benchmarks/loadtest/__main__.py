@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Offline load test: real Dispatcher + fake Telegram Bot API + fake Claude.
+
+The bot runs on the main thread's event loop exactly as in production
+(long polling, same routers and middlewares). Fake servers and simulated
+users run on a separate thread with their own loop, so anything that
+blocks the bot's loop shows up as latency instead of deadlocking the test.
+
+Usage:
+    python -m benchmarks.loadtest --users 1000
+    python -m benchmarks.loadtest --users 200 --claude-ttft 1.0 --json report.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from benchmarks.loadtest.fake_claude import ClaudeProfile, FakeClaudeServer
+from benchmarks.loadtest.fake_telegram import FakeTelegramServer
+from benchmarks.loadtest.scenario import SCENARIO, SimulatedUser, UserRun
+
+BOT_TOKEN = "123456789:LOADTEST"
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class Harness:
+    """Fake servers + simulated users, living on their own thread and loop"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="loadtest-harness", daemon=True)
+        self.telegram: Optional[FakeTelegramServer] = None
+        self.claude: Optional[FakeClaudeServer] = None
+        self.telegram_url = ""
+        self.claude_url = ""
+
+    def start(self) -> None:
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self._start_servers(), self.loop).result()
+
+    async def _start_servers(self) -> None:
+        self.telegram = FakeTelegramServer(BOT_TOKEN, rtt=self.args.telegram_rtt)
+        self.claude = FakeClaudeServer(ClaudeProfile(
+            ttft=self.args.claude_ttft,
+            tokens_per_second=self.args.claude_tps,
+            question_tokens=self.args.question_tokens,
+            solution_tokens=self.args.solution_tokens,
+            discussion_tokens=self.args.discussion_tokens,
+        ))
+        self.telegram_url = await self.telegram.start()
+        self.claude_url = await self.claude.start()
+
+    def simulate(self) -> Future:
+        return asyncio.run_coroutine_threadsafe(self._simulate(), self.loop)
+
+    async def _simulate(self) -> List[UserRun]:
+        users = [
+            SimulatedUser(self.telegram, i, self.args.step_timeout, self.args.think_time)
+            for i in range(self.args.users)
+        ]
+        ramp = self.args.ramp_up / max(len(users), 1)
+        return await asyncio.gather(*(user.run(start_delay=i * ramp) for i, user in enumerate(users)))
+
+    def stop(self) -> None:
+        async def _stop():
+            await self.telegram.stop()
+            await self.claude.stop()
+        asyncio.run_coroutine_threadsafe(_stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+async def monitor_loop_lag(samples: List[float], interval: float = 0.05) -> None:
+    """Record how late the bot's event loop wakes up (blocking detector)"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+async def run_bot(harness: Harness) -> Dict:
+    """Run the real dispatcher until all simulated users finish"""
+    from aiogram import Bot
+    from aiogram.client.default import DefaultBotProperties
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+    from aiogram.enums import ParseMode
+
+    from bot.database.engine import init_db
+    from bot.main import create_dispatcher
+
+    await init_db()
+
+    bot = Bot(
+        token=BOT_TOKEN,
+        session=AiohttpSession(api=TelegramAPIServer.from_base(harness.telegram_url)),
+        default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN),
+    )
+    dp = create_dispatcher()
+
+    lag_samples: List[float] = []
+    lag_task = asyncio.create_task(monitor_loop_lag(lag_samples))
+
+    started = time.perf_counter()
+    simulation = asyncio.wrap_future(harness.simulate())
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, polling_timeout=1))
+
+    runs = await simulation
+    elapsed = time.perf_counter() - started
+
+    await dp.stop_polling()
+    await polling
+    lag_task.cancel()
+
+    return {"runs": runs, "elapsed": elapsed, "lag": lag_samples}
+
+
+def build_report(runs: List[UserRun], elapsed: float, lag: List[float], harness: Harness) -> Dict:
+    per_step: Dict[str, List[float]] = {step.name: [] for step in SCENARIO}
+    errors: Dict[str, Dict[str, int]] = {}
+    for run in runs:
+        for result in run.results:
+            if result.latency is not None:
+                per_step[result.step].append(result.latency)
+            else:
+                step_errors = errors.setdefault(result.step, {})
+                step_errors[result.error] = step_errors.get(result.error, 0) + 1
+
+    steps = {}
+    for name, values in per_step.items():
+        values.sort()
+        steps[name] = {
+            "count": len(values),
+            "p50": percentile(values, 0.50),
+            "p95": percentile(values, 0.95),
+            "p99": percentile(values, 0.99),
+            "max": values[-1] if values else float("nan"),
+        }
+
+    completed = sum(1 for run in runs if run.completed)
+    updates = sum(len(run.results) for run in runs)
+    lag.sort()
+    return {
+        "users": len(runs),
+        "completed_flows": completed,
+        "elapsed_seconds": elapsed,
+        "flows_per_second": completed / elapsed if elapsed else 0.0,
+        "updates_per_second": updates / elapsed if elapsed else 0.0,
+        "bot_api_calls": harness.telegram.calls_total,
+        "claude_requests": harness.claude.requests_total,
+        "event_loop_lag": {
+            "p50": percentile(lag, 0.50),
+            "p99": percentile(lag, 0.99),
+            "max": lag[-1] if lag else float("nan"),
+        },
+        "steps": steps,
+        "errors": errors,
+    }
+
+
+def print_report(report: Dict) -> None:
+    print()
+    print(f"Users: {report['users']}   completed flows: {report['completed_flows']}   "
+          f"elapsed: {report['elapsed_seconds']:.1f}s")
+    print(f"Throughput: {report['flows_per_second']:.2f} flows/s, "
+          f"{report['updates_per_second']:.1f} updates/s   "
+          f"(Bot API calls: {report['bot_api_calls']}, Claude requests: {report['claude_requests']})")
+    lag = report["event_loop_lag"]
+    print(f"Bot event loop lag: p50 {lag['p50'] * 1000:.1f} ms, p99 {lag['p99'] * 1000:.1f} ms, "
+          f"max {lag['max'] * 1000:.1f} ms")
+    print()
+    print(f"{'step':<24}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, stats in report["steps"].items():
+        print(f"{name:<24}{stats['count']:>7}"
+              f"{stats['p50'] * 1000:>10.1f}{stats['p95'] * 1000:>10.1f}"
+              f"{stats['p99'] * 1000:>10.1f}{stats['max'] * 1000:>10.1f}")
+    if report["errors"]:
+        print()
+        print("Errors:")
+        for step, step_errors in report["errors"].items():
+            for error, count in step_errors.items():
+                print(f"  {step}: {error} x{count}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline load test for the bot")
+    parser.add_argument("--users", type=int, default=500, help="Concurrent simulated users")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Seconds to spread user start times over")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Pause between user steps (seconds)")
+    parser.add_argument("--step-timeout", type=float, default=120.0, help="Max wait for a bot reply")
+    parser.add_argument("--telegram-rtt", type=float, default=0.0,
+                        help="Simulated Bot API round trip per call (seconds)")
+    parser.add_argument("--claude-ttft", type=float, default=0.3, help="Fake Claude time to first token")
+    parser.add_argument("--claude-tps", type=float, default=400.0, help="Fake Claude output tokens/second")
+    parser.add_argument("--question-tokens", type=int, default=60)
+    parser.add_argument("--solution-tokens", type=int, default=900)
+    parser.add_argument("--discussion-tokens", type=int, default=250)
+    parser.add_argument("--database-url", help="Database URL (default: fresh temporary SQLite file)")
+    parser.add_argument("--with-logging", action="store_true", help="Keep bot logging enabled")
+    parser.add_argument("--json", help="Write report as JSON to this path")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="bot-loadtest-")
+
+    harness = Harness(args)
+    harness.start()
+
+    # Environment must be ready before bot modules are imported
+    os.environ.update({
+        "BOT_TOKEN": BOT_TOKEN,
+        "CLAUDE_API_KEY": "loadtest",
+        "ANTHROPIC_BASE_URL": harness.claude_url,
+        "YOOKASSA_SHOP_ID": "loadtest",
+        "YOOKASSA_SECRET_KEY": "loadtest",
+        "DATABASE_URL": args.database_url or f"sqlite+aiosqlite:///{os.path.join(workdir, 'loadtest.db')}",
+        "ENVIRONMENT": "production",
+        "METRICS_ENABLED": "false",
+    })
+    os.chdir(workdir)  # logs/ directory is created relative to cwd
+
+    import bot.main  # noqa: F401  (configures logging)
+    if not args.with_logging:
+        logging.disable(logging.CRITICAL)
+
+    try:
+        result = asyncio.run(run_bot(harness))
+    finally:
+        harness.stop()
+
+    report = build_report(result["runs"], result["elapsed"], result["lag"], harness)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
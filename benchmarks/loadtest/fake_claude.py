@@ -0,0 +1,117 @@
+"""
+Fake Anthropic Messages API.
+
+Responds to POST /v1/messages after a configurable delay modelled as
+time-to-first-token + output_tokens / tokens_per_second, with a
+realistic Russian-language body and usage block.
+"""
+
+import itertools
+import random
+import asyncio
+from dataclasses import dataclass
+from typing import Optional
+
+from aiohttp import web
+
+_FILLER = (
+    "Попробуй заметить момент, когда появляется желание отложить дело. "
+    "Запиши, что ты чувствуешь и что происходит вокруг. "
+    "Через неделю станет видно, какой триггер повторяется чаще всего. "
+)
+
+_SOLUTION_SECTIONS = (
+    "🎯 **В ЧЁМ СУТЬ**\n",
+    "\n\n💡 **МЕХАНИЗМ**\n",
+    "\n\n📋 **ПЛАН ДЕЙСТВИЙ**\n\n*Прямо сейчас (5-15 мин):*\n- ",
+    "\n\n🎯 **ЧТО ИЗМЕНИТСЯ**\n- Через неделю: ",
+    "\n\n⚡ **ПЛАН Б (если сорвёшься)**\n",
+)
+
+# Rough average for Russian text with Claude tokenizer
+CHARS_PER_TOKEN = 3.5
+
+
+@dataclass
+class ClaudeProfile:
+    """Latency and size model of the fake Claude endpoint"""
+    ttft: float = 0.3            # seconds before the first token
+    tokens_per_second: float = 400.0
+    jitter: float = 0.2          # +/- fraction applied to the total delay
+    question_tokens: int = 60
+    solution_tokens: int = 900
+    discussion_tokens: int = 250
+
+
+def _text_of_tokens(tokens: int) -> str:
+    length = int(tokens * CHARS_PER_TOKEN)
+    repeats = length // len(_FILLER) + 1
+    return (_FILLER * repeats)[:length].rstrip()
+
+
+def _solution_text(tokens: int) -> str:
+    per_section = max(tokens // len(_SOLUTION_SECTIONS), 1)
+    return "".join(header + _text_of_tokens(per_section) for header in _SOLUTION_SECTIONS)
+
+
+class FakeClaudeServer:
+    """Minimal /v1/messages implementation"""
+
+    def __init__(self, profile: ClaudeProfile, seed: int = 42):
+        self.profile = profile
+        self.requests_total = 0
+        self._ids = itertools.count(1)
+        self._random = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start server, return base URL for ANTHROPIC_BASE_URL"""
+        app = web.Application(client_max_size=10 * 1024 * 1024)
+        app.router.add_post("/v1/messages", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{bound_port}"
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+
+    def _output_for(self, max_tokens: int) -> str:
+        # ClaudeService uses distinct max_tokens per operation
+        if max_tokens >= 2000:
+            return _solution_text(self.profile.solution_tokens)
+        if max_tokens <= 300:
+            return _text_of_tokens(self.profile.question_tokens).rstrip(".") + "?"
+        return _text_of_tokens(self.profile.discussion_tokens)
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests_total += 1
+        body = await request.json()
+
+        text = self._output_for(int(body.get("max_tokens", 300)))
+        output_tokens = int(len(text) / CHARS_PER_TOKEN)
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in body.get("messages", []))
+        system_chars = sum(len(block.get("text", "")) for block in body.get("system", []) or [])
+
+        delay = self.profile.ttft + output_tokens / self.profile.tokens_per_second
+        delay *= 1 + self._random.uniform(-self.profile.jitter, self.profile.jitter)
+        await asyncio.sleep(delay)
+
+        return web.json_response({
+            "id": f"msg_loadtest_{next(self._ids)}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "claude-loadtest"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": int(prompt_chars / CHARS_PER_TOKEN),
+                "output_tokens": output_tokens,
+                "cache_creation_input_tokens": 0,
+                "cache_read_input_tokens": int(system_chars / CHARS_PER_TOKEN),
+            },
+        })
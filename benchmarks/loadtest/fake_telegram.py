@@ -0,0 +1,157 @@
+"""
+Fake Telegram Bot API server.
+
+Serves getUpdates from an in-memory queue and records every outgoing
+bot call (sendMessage, editMessageText, ...) per chat, so simulated users
+can wait for the bot's reply and measure latency.
+"""
+
+import asyncio
+import itertools
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+BOT_ID = 700000001
+BOT_USERNAME = "loadtest_bot"
+
+
+@dataclass
+class BotCall:
+    """One Bot API request made by the bot under test"""
+    method: str
+    params: Dict[str, Any]
+    message_id: Optional[int] = None
+    received_at: float = field(default_factory=time.perf_counter)
+
+    @property
+    def text(self) -> str:
+        return self.params.get("text") or ""
+
+
+class FakeTelegramServer:
+    """In-process Bot API implementation sufficient for the problem-solving flow"""
+
+    def __init__(self, token: str, rtt: float = 0.0):
+        self.token = token
+        # Simulated network round trip of every Bot API call (except getUpdates)
+        self.rtt = rtt
+        self.updates: asyncio.Queue = asyncio.Queue()
+        self.calls_total = 0
+        self._outboxes: Dict[int, asyncio.Queue] = {}
+        self._message_ids = itertools.count(1)
+        self._update_ids = itertools.count(1)
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def bot_user(self) -> Dict[str, Any]:
+        return {"id": BOT_ID, "is_bot": True, "first_name": "LoadTest", "username": BOT_USERNAME}
+
+    def next_message_id(self) -> int:
+        return next(self._message_ids)
+
+    def next_update_id(self) -> int:
+        return next(self._update_ids)
+
+    def outbox(self, chat_id: int) -> asyncio.Queue:
+        """Queue of BotCall objects addressed to chat_id"""
+        queue = self._outboxes.get(chat_id)
+        if queue is None:
+            queue = self._outboxes[chat_id] = asyncio.Queue()
+        return queue
+
+    def push_update(self, update: Dict[str, Any]) -> None:
+        self.updates.put_nowait(update)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start server, return base URL for TelegramAPIServer.from_base()"""
+        app = web.Application(client_max_size=10 * 1024 * 1024)
+        app.router.add_route("*", "/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{bound_port}"
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+
+    # ------------------------------------------------------------------
+    # Request handling
+    # ------------------------------------------------------------------
+
+    async def _read_params(self, request: web.Request) -> Dict[str, Any]:
+        params: Dict[str, Any] = dict(request.query)
+        if request.can_read_body:
+            if request.content_type == "application/json":
+                params.update(await request.json())
+            else:
+                params.update(await request.post())
+        return params
+
+    def _ok(self, result: Any) -> web.Response:
+        return web.json_response({"ok": True, "result": result})
+
+    def _message(self, chat_id: int, text: str, message_id: Optional[int] = None) -> Dict[str, Any]:
+        return {
+            "message_id": message_id or self.next_message_id(),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": self.bot_user,
+            "text": text,
+        }
+
+    async def _get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        timeout = float(params.get("timeout") or 0)
+        limit = int(params.get("limit") or 100)
+        try:
+            first = await asyncio.wait_for(self.updates.get(), timeout=max(timeout, 0.01))
+        except asyncio.TimeoutError:
+            return []
+
+        batch = [first]
+        while len(batch) < limit and not self.updates.empty():
+            batch.append(self.updates.get_nowait())
+        return batch
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        if request.match_info["token"] != self.token:
+            return web.json_response({"ok": False, "error_code": 401, "description": "Unauthorized"}, status=401)
+
+        method = request.match_info["method"].lower()
+        params = await self._read_params(request)
+
+        if method == "getme":
+            return self._ok(self.bot_user)
+        if method == "getupdates":
+            return self._ok(await self._get_updates(params))
+
+        self.calls_total += 1
+        if self.rtt:
+            # Whole round trip before the call is visible: simulated users
+            # react immediately and must not overtake the bot's next await
+            await asyncio.sleep(self.rtt)
+        chat_id = params.get("chat_id")
+        if chat_id is not None:
+            chat_id = int(chat_id)
+        if isinstance(params.get("reply_markup"), str):
+            params["reply_markup"] = json.loads(params["reply_markup"])
+
+        result: Any = True
+        message_id = None
+        if method == "sendmessage":
+            result = self._message(chat_id, params.get("text", ""))
+            message_id = result["message_id"]
+        elif method == "editmessagetext":
+            message_id = int(params["message_id"])
+            result = self._message(chat_id, params.get("text", ""), message_id)
+
+        # sendChatAction, deleteMessage, answerCallbackQuery, ... just return True
+        if chat_id is not None:
+            self.outbox(chat_id).put_nowait(BotCall(method, params, message_id))
+        return self._ok(result)
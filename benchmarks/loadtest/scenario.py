@@ -0,0 +1,198 @@
+"""
+Simulated user journey:
+
+/start → onboarding (gender, birth date, occupation, work format) →
+"🚀 Решить проблему" → problem → 4 answers → solution →
+discussion → one discussion question.
+
+Each step sends one update to the fake Telegram server and waits for the
+bot call that completes it; the elapsed time is the step latency.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.loadtest.fake_telegram import BotCall, FakeTelegramServer
+
+# Status messages are edited/deleted later and never complete a step
+STATUS_PREFIX = "⏳"
+# Texts sent by ErrorHandlingMiddleware
+ERROR_PREFIXES = ("❌ Что-то пошло не так", "❌ Ошибка", "⚠️ Ошибка", "⚠️ Проблема", "⏱ Слишком")
+
+PROBLEM_TEXT = (
+    "Не могу заставить себя начать работу утром. Сажусь за компьютер, "
+    "открываю соцсети и через час понимаю, что ничего не сделал. "
+    "Длится уже полгода, пробовал будильники и списки дел."
+)
+ANSWERS = (
+    "Чаще всего утром, когда нет срочных задач и никто не контролирует.",
+    "Пробовал помодоро и списки дел, хватало на пару дней.",
+    "Когда есть дедлайн или созвон с командой — начинаю сразу.",
+    "Наверное боюсь, что сделаю плохо, и оттягиваю момент оценки.",
+)
+DISCUSSION_QUESTION = "А что делать, если утром совсем нет сил даже на первый шаг?"
+
+
+def _is_reply(*methods: str) -> Callable[[BotCall], bool]:
+    def predicate(call: BotCall) -> bool:
+        return call.method in methods and not call.text.startswith(STATUS_PREFIX)
+    return predicate
+
+
+def _has_button(callback_data: str) -> Callable[[BotCall], bool]:
+    # Long replies are split into several messages; the keyboard comes with the last one
+    def predicate(call: BotCall) -> bool:
+        keyboard = (call.params.get("reply_markup") or {}).get("inline_keyboard") or []
+        return any(button.get("callback_data") == callback_data for row in keyboard for button in row)
+    return predicate
+
+
+def _has_text(text: str) -> Callable[[BotCall], bool]:
+    return lambda call: call.method == "sendmessage" and call.text == text
+
+
+@dataclass
+class Step:
+    name: str
+    kind: str  # 'message' or 'callback'
+    payload: str
+    done: Callable[[BotCall], bool]
+
+
+SCENARIO: List[Step] = [
+    Step("start", "message", "/start", _is_reply("sendmessage")),
+    Step("onboarding_gender", "callback", "gender_male", _is_reply("editmessagetext")),
+    Step("onboarding_birth_date", "message", "15.03.1995", _is_reply("sendmessage")),
+    Step("onboarding_occupation", "message", "Менеджер в IT", _is_reply("sendmessage")),
+    Step("onboarding_work_format", "callback", "work_format_remote", _has_text("👇")),
+    Step("menu_new_problem", "message", "🚀 Решить проблему", _is_reply("sendmessage")),
+    Step("problem_to_question", "message", PROBLEM_TEXT, _is_reply("editmessagetext")),
+    Step("answer_1", "message", ANSWERS[0], _is_reply("editmessagetext")),
+    Step("answer_2", "message", ANSWERS[1], _is_reply("editmessagetext")),
+    Step("answer_3", "message", ANSWERS[2], _is_reply("editmessagetext")),
+    Step("answer_4_solution", "message", ANSWERS[3], _has_button("start_discussion")),
+    Step("start_discussion", "callback", "start_discussion", _is_reply("sendmessage")),
+    Step("discussion_answer", "message", DISCUSSION_QUESTION, _is_reply("editmessagetext")),
+]
+
+
+@dataclass
+class StepResult:
+    step: str
+    latency: Optional[float]  # None on timeout or error
+    error: Optional[str] = None
+
+
+@dataclass
+class UserRun:
+    user_index: int
+    results: List[StepResult] = field(default_factory=list)
+    completed: bool = False
+
+
+class SimulatedUser:
+    """One Telegram user walking through SCENARIO"""
+
+    def __init__(self, server: FakeTelegramServer, user_index: int, step_timeout: float, think_time: float):
+        self.server = server
+        self.user_index = user_index
+        self.chat_id = 100_000_000 + user_index
+        self.step_timeout = step_timeout
+        self.think_time = think_time
+        self.last_bot_message_id: Optional[int] = None
+        self.outbox = server.outbox(self.chat_id)
+
+    @property
+    def user(self) -> Dict[str, Any]:
+        return {
+            "id": self.chat_id,
+            "is_bot": False,
+            "first_name": f"User{self.user_index}",
+            "username": f"loadtest_user_{self.user_index}",
+            "language_code": "ru",
+        }
+
+    def _message_update(self, text: str) -> Dict[str, Any]:
+        return {
+            "update_id": self.server.next_update_id(),
+            "message": {
+                "message_id": self.server.next_message_id(),
+                "date": int(time.time()),
+                "chat": {"id": self.chat_id, "type": "private"},
+                "from": self.user,
+                "text": text,
+            },
+        }
+
+    def _callback_update(self, data: str) -> Dict[str, Any]:
+        update_id = self.server.next_update_id()
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": self.user,
+                "chat_instance": str(self.chat_id),
+                "data": data,
+                "message": {
+                    "message_id": self.last_bot_message_id or self.server.next_message_id(),
+                    "date": int(time.time()),
+                    "chat": {"id": self.chat_id, "type": "private"},
+                    "from": self.server.bot_user,
+                    "text": "...",
+                },
+            },
+        }
+
+    def _drain(self) -> None:
+        while not self.outbox.empty():
+            self._remember(self.outbox.get_nowait())
+
+    def _remember(self, call: BotCall) -> None:
+        # Callback queries are attached to the latest message sent by the bot
+        if call.method == "sendmessage":
+            self.last_bot_message_id = call.message_id
+
+    async def _run_step(self, step: Step) -> StepResult:
+        self._drain()
+        update = (
+            self._message_update(step.payload)
+            if step.kind == "message"
+            else self._callback_update(step.payload)
+        )
+
+        started = time.perf_counter()
+        self.server.push_update(update)
+        deadline = started + self.step_timeout
+
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return StepResult(step.name, None, "timeout")
+            try:
+                call = await asyncio.wait_for(self.outbox.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return StepResult(step.name, None, "timeout")
+
+            self._remember(call)
+            if call.method == "sendmessage" and call.text.startswith(ERROR_PREFIXES):
+                return StepResult(step.name, None, call.text[:60])
+            if step.done(call):
+                return StepResult(step.name, call.received_at - started)
+
+    async def run(self, start_delay: float = 0.0) -> UserRun:
+        run = UserRun(self.user_index)
+        if start_delay:
+            await asyncio.sleep(start_delay)
+
+        for step in SCENARIO:
+            result = await self._run_step(step)
+            run.results.append(result)
+            if result.latency is None:
+                return run
+            if self.think_time:
+                await asyncio.sleep(self.think_time)
+
+        run.completed = True
+        return run
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark: handler latency under heavy logging, synchronous vs queued writer.
+
+Every simulated handler logs like a busy update: structlog events with a
+few fields, DEBUG lines and aiogram's "Update ... is handled". Each mode
+runs in its own process with the real setup_logging() (files in a temp
+directory, console redirected to a file):
+- sync:  LOG_QUEUE_SIZE=0, handlers render and write on the event loop
+- queue: records go to the writer thread (orjson if installed)
+
+Usage:
+    python -m benchmarks.logging_overhead
+    python -m benchmarks.logging_overhead --io-wait 5     # handlers also wait for I/O
+    python -m benchmarks.logging_overhead --handlers 5000 --concurrency 200 --environment development
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PAYLOAD = "Не могу заставить себя начать работу над дипломом, откладываю уже третью неделю"
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run_handlers(args) -> Dict:
+    import logging
+
+    import structlog
+
+    from bot.logging_config import LOG_RECORDS_DROPPED, setup_logging
+
+    writer = setup_logging()
+    log = structlog.get_logger("bot.handlers.bench")
+    aiogram_log = logging.getLogger("aiogram.event")
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: List[float] = []
+
+    async def handler(update_id: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            for step in range(args.records):
+                log.info("step_done", user_id=update_id, step=step, problem_id=update_id * 10, text=PAYLOAD)
+                log.debug("cache_lookup", key=f"user:{update_id}", hit=step % 2 == 0)
+                if step % 5 == 4:
+                    await asyncio.sleep(args.io_wait / 1000)  # Bot API / database call
+            aiogram_log.info("Update id=%s is handled. Duration %d ms by bot id=%d", update_id, 42, 1)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(handler(i) for i in range(args.handlers)))
+    elapsed = time.perf_counter() - started
+
+    drain = 0.0
+    if writer is not None:
+        drain_started = time.perf_counter()
+        writer.stop()
+        drain = time.perf_counter() - drain_started
+
+    latencies.sort()
+    return {
+        "elapsed": elapsed,
+        "drain": drain,
+        "p50": percentile(latencies, 0.50),
+        "p99": percentile(latencies, 0.99),
+        "max": latencies[-1],
+        "dropped": sum(LOG_RECORDS_DROPPED.value(level=level) for level in ("DEBUG", "INFO", "WARNING", "ERROR")),
+    }
+
+
+def child(args) -> None:
+    """One mode inside its own process (cwd is the temp directory)"""
+    sys.stdout = open("console.log", "w", encoding="utf-8")
+    result = asyncio.run(run_handlers(args))
+    with open(args.result, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+def run_mode(args, mode: str) -> Dict:
+    workdir = tempfile.mkdtemp(prefix=f"bot-logbench-{mode}-")
+    result_path = os.path.join(workdir, "result.json")
+    env = dict(
+        os.environ,
+        BOT_TOKEN="123:bench",
+        CLAUDE_API_KEY="bench",
+        YOOKASSA_SHOP_ID="bench",
+        YOOKASSA_SECRET_KEY="bench",
+        ENVIRONMENT=args.environment,
+        LOG_QUEUE_SIZE="0" if mode == "sync" else str(args.queue_size),
+        PYTHONPATH=ROOT,
+    )
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.logging_overhead", "--child", "--result", result_path,
+         "--handlers", str(args.handlers), "--records", str(args.records),
+         "--concurrency", str(args.concurrency), "--io-wait", str(args.io_wait)],
+        cwd=workdir, env=env, check=True,
+    )
+    with open(result_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Handler latency under heavy logging")
+    parser.add_argument("--handlers", type=int, default=2000, help="Simulated updates")
+    parser.add_argument("--records", type=int, default=20, help="structlog events per update (plus as many DEBUG)")
+    parser.add_argument("--concurrency", type=int, default=100, help="Updates handled at the same time")
+    parser.add_argument("--io-wait", type=float, default=0, help="ms awaited every 5 events (0: logging only)")
+    parser.add_argument("--environment", choices=("production", "development"), default="production")
+    parser.add_argument("--queue-size", type=int, default=10000, help="LOG_QUEUE_SIZE for the queue mode")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        child(args)
+        return
+
+    try:
+        import orjson  # noqa: F401
+        serializer = "orjson"
+    except ImportError:
+        serializer = "json"
+
+    print(f"{args.handlers} updates x {args.records * 2 + 1} log calls, concurrency {args.concurrency}, "
+          f"I/O wait {args.io_wait} ms, {args.environment}, JSON: {serializer}\n")
+    print(f"{'mode':<8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'total s':>10}{'drain s':>10}{'dropped':>10}")
+    for mode in ("sync", "queue"):
+        r = run_mode(args, mode)
+        print(f"{mode:<8}{r['p50'] * 1e3:10.2f}{r['p99'] * 1e3:10.2f}{r['max'] * 1e3:10.2f}"
+              f"{r['elapsed']:10.2f}{r['drain']:10.2f}{int(r['dropped']):10d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for PromptBuilder and bot/utils/text.py.
+
+Every function here runs on each user interaction. Results are compared
+against benchmarks/baseline.json; the run fails (exit code 1) when any
+benchmark is slower than baseline * threshold.
+
+Usage:
+    python -m benchmarks.prompt_and_text                 # compare with baseline
+    python -m benchmarks.prompt_and_text --save          # store new baseline
+    python -m benchmarks.prompt_and_text --threshold 1.5 -k strip
+    python -m benchmarks.prompt_and_text --rounds 15     # steadier, slower
+
+Before timing, strip_markdown and to_telegram_html are checked against
+fixtures.MARKDOWN_CASES; a wrong output fails the run as well.
+
+Every benchmark is timed in several rounds, each right after a calibration
+workload (regex substitution plus string building, like the code under
+test). The compared value is the median over rounds of benchmark /
+calibration, so CPU frequency changes and noisy neighbours mostly cancel
+out. Baselines are still machine-specific: refresh them with --save on the
+machine that runs the comparison before starting an optimization.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import timeit
+from typing import Callable, Dict, List, Tuple
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import fixtures
+from bot.services.prompt_builder import PromptBuilder
+from bot.utils.text import prepare_problem_text, strip_markdown, to_telegram_html, truncate_at_sentence
+
+prompt_builder = PromptBuilder()
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 1.5
+DEFAULT_ROUNDS = 7
+
+_history_4 = fixtures.questioning_history(4)
+_history_2 = fixtures.questioning_history(2)
+_discussion_25 = fixtures.discussion_history(25)
+
+BENCHMARKS: List[Tuple[str, Callable[[], object]]] = [
+    ("build_system_prompt[no_context]", lambda: prompt_builder.build_system_prompt()),
+    ("build_system_prompt[full_context]", lambda: prompt_builder.build_system_prompt(**fixtures.USER_CONTEXT)),
+    ("build_questioning_context[step1]", lambda: prompt_builder.build_questioning_context(
+        fixtures.SHORT_PROBLEM, [], 1)),
+    ("build_questioning_context[step3_long]", lambda: prompt_builder.build_questioning_context(
+        fixtures.LONG_PROBLEM, _history_2, 3)),
+    ("build_solution_context[4_answers]", lambda: prompt_builder.build_solution_context(
+        fixtures.LONG_PROBLEM, _history_4)),
+    ("build_discussion_context[25_turns]", lambda: prompt_builder.build_discussion_context(
+        fixtures.LONG_PROBLEM, _discussion_25, "А если не получится?")),
+    ("strip_markdown[title]", lambda: strip_markdown(fixtures.TITLE_WITH_MARKDOWN)),
+    ("strip_markdown[plan_1500]", lambda: strip_markdown(fixtures.PLAN_1500)),
+    ("strip_markdown[solution_2500_tokens]", lambda: strip_markdown(fixtures.SOLUTION_2500_TOKENS)),
+    ("truncate_at_sentence[plan_1500]", lambda: truncate_at_sentence(fixtures.PLAN_1500, 300)),
+    ("prepare_problem_text[history_view]", lambda: prepare_problem_text(
+        title=fixtures.LONG_PROBLEM,
+        root_cause=fixtures.ROOT_CAUSE_500,
+        action_plan=fixtures.SOLUTION_2500_TOKENS,
+        max_plan_length=1500,
+    )),
+]
+
+
+def check_outputs() -> List[str]:
+    """Mismatches between the text helpers and fixtures.MARKDOWN_CASES"""
+    failures = []
+    for text, stripped, html in fixtures.MARKDOWN_CASES:
+        for func, expected in ((strip_markdown, stripped), (to_telegram_html, html)):
+            actual = func(text)
+            if actual != expected:
+                failures.append(f"{func.__name__}({text!r}) = {actual!r}, expected {expected!r}")
+    return failures
+
+
+class Measurement:
+    """Timer with a loop count fixed up front, so every round times the same work"""
+
+    def __init__(self, func: Callable[[], object], round_seconds: float = 0.02):
+        self.timer = timeit.Timer(func)
+        number, elapsed = self.timer.autorange()
+        self.number = max(1, int(number * round_seconds / elapsed))
+
+    def __call__(self, repeat: int = 3) -> float:
+        """Best-of-N time per call in microseconds"""
+        return min(self.timer.repeat(repeat=repeat, number=self.number)) / self.number * 1e6
+
+
+# Not the regexes under test: an optimization of bot/utils/text.py must not move the calibration
+_CALIBRATION_RE = re.compile(r"\*\*([^*\n]+)\*\*|__([^_\n]+)__|`([^`\n]+)`")
+_CALIBRATION_TEXT = "**Шаг 1.** Запиши __три__ причины и `одно` действие на завтра.\n" * 16
+
+
+def _calibration_workload() -> int:
+    # Regex substitution + string building + dict lookups, the mix of the code under test
+    text = _CALIBRATION_RE.sub(lambda m: m.group(m.lastindex), _CALIBRATION_TEXT)
+    parts = []
+    table = {i: str(i) for i in range(64)}
+    for i in range(256):
+        parts.append(table[i % 64])
+    return len(text) + len("".join(parts))
+
+
+def run(
+    selected: List[Tuple[str, Callable[[], object]]],
+    rounds: int = DEFAULT_ROUNDS
+) -> Tuple[float, Dict[str, float], Dict[str, float]]:
+    """
+    Return (calibration µs, {name: µs}, {name: µs / calibration µs}).
+
+    Rounds interleave all benchmarks, each timed right after the calibration
+    workload; every value is the median over rounds.
+    """
+    calibration = Measurement(_calibration_workload)
+    measurements = [(name, Measurement(func)) for name, func in selected]
+    calibrations: List[float] = []
+    timings: Dict[str, List[float]] = {name: [] for name, _ in selected}
+    normalized: Dict[str, List[float]] = {name: [] for name, _ in selected}
+    for _ in range(rounds):
+        for name, measurement in measurements:
+            calibration_us = calibration()
+            value = measurement()
+            calibrations.append(calibration_us)
+            timings[name].append(value)
+            normalized[name].append(value / calibration_us)
+    return (
+        statistics.median(calibrations),
+        {name: statistics.median(values) for name, values in timings.items()},
+        {name: statistics.median(values) for name, values in normalized.items()},
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PromptBuilder / text utils microbenchmarks")
+    parser.add_argument("--save", action="store_true", help="Store results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Fail when slower than baseline * threshold")
+    parser.add_argument("-k", dest="keyword", help="Only run benchmarks containing this substring")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS,
+                        help=f"Interleaved timing rounds, the median is compared (default: {DEFAULT_ROUNDS})")
+    args = parser.parse_args()
+
+    failures = check_outputs()
+    if failures:
+        print("\n".join(failures))
+        sys.exit(1)
+
+    selected = [(name, func) for name, func in BENCHMARKS if not args.keyword or args.keyword in name]
+    calibration, results, normalized = run(selected, args.rounds)
+
+    baseline = {"calibration_us": calibration, "benchmarks": {}}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f)
+    base_calibration = baseline["calibration_us"]
+    speed_factor = calibration / base_calibration
+
+    regressions = []
+    print(f"calibration: {calibration:.2f} µs (baseline {base_calibration:.2f} µs, "
+          f"machine speed factor {speed_factor:.2f})\n")
+    print(f"{'benchmark':<42}{'µs/call':>12}{'baseline':>12}{'ratio':>8}")
+    for name, value in results.items():
+        base = baseline["benchmarks"].get(name)
+        if base:
+            # Ratio of normalized timings: >1 means slower relative to baseline
+            ratio = normalized[name] * base_calibration / base
+            marker = "  REGRESSION" if ratio > args.threshold else ""
+            if marker:
+                regressions.append(name)
+            print(f"{name:<42}{value:>12.2f}{base:>12.2f}{ratio:>8.2f}{marker}")
+        else:
+            print(f"{name:<42}{value:>12.2f}{'-':>12}{'-':>8}")
+
+    if args.save:
+        # Store timings rescaled to the baseline calibration so partial (-k) saves stay consistent
+        baseline["benchmarks"].update({
+            name: round(value * base_calibration, 3) for name, value in normalized.items()
+        })
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, ensure_ascii=False, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline saved to {BASELINE_PATH}")
+        return
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower than baseline x{args.threshold}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,10 +8,75 @@ load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 CLAUDE_API_KEY = os.getenv("CLAUDE_API_KEY")
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///bot_database.db")
+# Log every SQL statement (SQLAlchemy echo)
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+# PostgreSQL (postgresql+asyncpg://...) connection pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "30"))
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
 
 # Logging configuration
 LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG" if ENVIRONMENT == "development" else "INFO")
+# Records go through a bounded queue to a writer thread (0: write synchronously);
+# when it is full, new DEBUG/INFO records are dropped
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Share of repeated DEBUG records kept (first of each kind always kept)
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0" if ENVIRONMENT == "development" else "0.1"))
+# Identical service errors: one log line per interval (seconds) or per N occurrences, all counted in metrics
+ERROR_LOG_INTERVAL = float(os.getenv("ERROR_LOG_INTERVAL", "60"))
+ERROR_LOG_EVERY = int(os.getenv("ERROR_LOG_EVERY", "100"))
+
+# Metrics endpoint (Prometheus text format at http://METRICS_HOST:METRICS_PORT/metrics)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+
+# Store parsed solutions zlib-compressed (problems.solution_data)
+SOLUTION_COMPRESSION = os.getenv("SOLUTION_COMPRESSION", "true").lower() == "true"
+
+# Generate the first question concurrently with storing the problem
+CLAUDE_PIPELINE_FIRST_QUESTION = os.getenv("CLAUDE_PIPELINE_FIRST_QUESTION", "true").lower() == "true"
+# Write the system prompt to Claude's prompt cache while the user types the problem
+CLAUDE_CACHE_PREWARM = os.getenv("CLAUDE_CACHE_PREWARM", "false").lower() == "true"
+
+# Background tasks (bot.services.task_supervisor): max running at once,
+# and how long shutdown waits for update handlers, then for background
+# tasks (twice this must stay below systemd TimeoutStopSec)
+BACKGROUND_TASK_CONCURRENCY = int(os.getenv("BACKGROUND_TASK_CONCURRENCY", "20"))
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "20"))
+
+# Local similarity index: "patterns seen before" hints for solutions
+SIMILARITY_ENABLED = os.getenv("SIMILARITY_ENABLED", "true").lower() == "true"
+SIMILARITY_MAX_ITEMS = int(os.getenv("SIMILARITY_MAX_ITEMS", "2000"))
+SIMILARITY_HINTS_RATE = float(os.getenv("SIMILARITY_HINTS_RATE", "1.0"))  # Share of solutions that get hints (A/B)
+
+# Data retention (bot.services.retention): rows older than N days are
+# archived (problems, payments) or deleted (sessions, events); 0 disables a policy
+RETENTION_ENABLED = os.getenv("RETENTION_ENABLED", "true").lower() == "true"
+RETENTION_HOUR = int(os.getenv("RETENTION_HOUR", "4"))  # UTC, after the 03:00 backup
+RETENTION_SOLVED_PROBLEMS_DAYS = int(os.getenv("RETENTION_SOLVED_PROBLEMS_DAYS", "365"))
+RETENTION_ABANDONED_PROBLEMS_DAYS = int(os.getenv("RETENTION_ABANDONED_PROBLEMS_DAYS", "30"))
+RETENTION_SESSIONS_DAYS = int(os.getenv("RETENTION_SESSIONS_DAYS", "30"))
+RETENTION_PAYMENTS_DAYS = int(os.getenv("RETENTION_PAYMENTS_DAYS", "365"))
+RETENTION_EVENTS_DAYS = int(os.getenv("RETENTION_EVENTS_DAYS", "180"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "200"))
+RETENTION_BATCH_PAUSE = float(os.getenv("RETENTION_BATCH_PAUSE", "0.2"))  # Seconds between batches
+RETENTION_VACUUM_PAGES = int(os.getenv("RETENTION_VACUUM_PAGES", "1000"))  # Pages per incremental_vacuum step
+
+# Admin dashboard (/stats and GET /stats on the metrics server): Telegram
+# ids allowed to use it, rollup flush interval, optional bearer token for HTTP
+ADMIN_IDS = {int(value) for value in os.getenv("ADMIN_IDS", "").replace(" ", "").split(",") if value}
+STATS_FLUSH_INTERVAL = float(os.getenv("STATS_FLUSH_INTERVAL", "30"))
+STATS_API_TOKEN = os.getenv("STATS_API_TOKEN", "")
+
+# Funnel events (bot.services.events): ring buffer size (oldest events are
+# dropped when full), rows per insert batch and max seconds between flushes
+EVENTS_BUFFER_SIZE = int(os.getenv("EVENTS_BUFFER_SIZE", "10000"))
+EVENTS_BATCH_SIZE = int(os.getenv("EVENTS_BATCH_SIZE", "500"))
+EVENTS_FLUSH_INTERVAL = float(os.getenv("EVENTS_FLUSH_INTERVAL", "5"))
 
 # YooKassa payment settings
 YOOKASSA_SHOP_ID = os.getenv("YOOKASSA_SHOP_ID")
@@ -1,9 +1,15 @@
-from sqlalchemy import select
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
-from bot.database.models import User, Session, Problem, Payment, Subscription, Referral
-from typing import Optional, List
+from bot.database.models import User, Session, Problem, ConversationTurn, Payment, Subscription, Referral
+from bot.services.stats import NEW_USERS, stats
+from bot.utils.text import estimate_tokens
+from typing import AsyncIterator, Optional, List, Sequence, Tuple
 from datetime import datetime, timedelta
+import asyncio
+import json
 import secrets
+import weakref
 
 
 def calculate_age(birth_date: datetime) -> Optional[int]:
@@ -46,6 +52,7 @@ async def get_or_create_user(
     session.add(user)
     await session.commit()
     await session.refresh(user)
+    stats.record(NEW_USERS)
     return user
 
 
@@ -57,6 +64,64 @@ async def get_user_by_telegram_id(session: AsyncSession, telegram_id: int) -> Op
     return result.scalar_one_or_none()
 
 
+async def add_user_credits(
+    session: AsyncSession,
+    user_id: int,
+    problems: int = 0,
+    discussions: int = 0
+) -> Optional[Tuple[int, int]]:
+    """
+    Atomically add credits (caller commits).
+
+    A single UPDATE ... RETURNING, so concurrent payments and rewards never
+    overwrite each other. Returns new (problems_remaining, discussion_credits).
+    """
+    result = await session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(
+            problems_remaining=User.problems_remaining + problems,
+            discussion_credits=User.discussion_credits + discussions
+        )
+        .returning(User.problems_remaining, User.discussion_credits)
+    )
+    row = result.one_or_none()
+    return (row.problems_remaining, row.discussion_credits) if row else None
+
+
+async def consume_problem_credit(session: AsyncSession, user_id: int) -> Optional[int]:
+    """Take one problem credit (caller commits); returns credits left, None if there were none"""
+    result = await session.execute(
+        update(User)
+        .where(User.id == user_id, User.problems_remaining > 0)
+        .values(problems_remaining=User.problems_remaining - 1)
+        .returning(User.problems_remaining)
+    )
+    return result.scalar_one_or_none()
+
+
+async def consume_discussion_credit(session: AsyncSession, user_id: int) -> Optional[int]:
+    """Take one purchased discussion credit (caller commits); None if there were none"""
+    result = await session.execute(
+        update(User)
+        .where(User.id == user_id, User.discussion_credits > 0)
+        .values(discussion_credits=User.discussion_credits - 1)
+        .returning(User.discussion_credits)
+    )
+    return result.scalar_one_or_none()
+
+
+async def mark_first_payment(session: AsyncSession, user_id: int) -> bool:
+    """Set users.first_paid_at once (caller commits); True for the user's first purchase"""
+    result = await session.execute(
+        update(User)
+        .where(User.id == user_id, User.first_paid_at.is_(None))
+        .values(first_paid_at=datetime.utcnow())
+        .returning(User.id)
+    )
+    return result.scalar_one_or_none() is not None
+
+
 async def update_user_credits(
     session: AsyncSession,
     user_id: int,
@@ -85,9 +150,10 @@ async def create_problem(
     user_id: int,
     title: str,
     problem_type: Optional[str] = None,
-    methodology: Optional[str] = None
+    methodology: Optional[str] = None,
+    commit: bool = True
 ) -> Problem:
-    """Create new problem"""
+    """Create new problem (commit=False: only flush, the caller commits)"""
     problem = Problem(
         user_id=user_id,
         title=title,
@@ -95,6 +161,9 @@ async def create_problem(
         methodology=methodology
     )
     session.add(problem)
+    if not commit:
+        await session.flush()
+        return problem
     await session.commit()
     await session.refresh(problem)
     return problem
@@ -109,3 +178,199 @@ async def get_user_problems(session: AsyncSession, user_id: int, limit: int = 10
         .limit(limit)
     )
     return result.scalars().all()
+
+
+# Keyset cursor: (created_at, id) of a row on the page boundary
+ProblemCursor = Tuple[datetime, int]
+
+
+async def get_user_problems_page(
+    session: AsyncSession,
+    user_id: int,
+    limit: int = 10,
+    older_than: Optional[ProblemCursor] = None,
+    newer_than: Optional[ProblemCursor] = None,
+    title_length: int = 40
+) -> Tuple[List[Row], bool, bool]:
+    """
+    One page of user's problems, newest first, via keyset pagination.
+
+    Selects only (id, title, status, created_at); title is cut to
+    title_length + 1 chars in SQL so callers can tell it was longer.
+    Uses ix_problems_user_created, so cost does not depend on page number.
+
+    Returns:
+        (rows, has_older, has_newer)
+    """
+    key = tuple_(Problem.created_at, Problem.id)
+    query = (
+        select(
+            Problem.id,
+            func.substr(Problem.title, 1, title_length + 1).label("title"),
+            Problem.status,
+            Problem.created_at,
+        )
+        .where(Problem.user_id == user_id)
+        .limit(limit + 1)
+    )
+
+    if newer_than:
+        # Walk towards newer rows, then flip back to newest-first order
+        query = query.where(key > tuple_(*newer_than)).order_by(Problem.created_at.asc(), Problem.id.asc())
+        rows = list((await session.execute(query)).all())
+        has_newer = len(rows) > limit
+        return list(reversed(rows[:limit])), True, has_newer
+
+    if older_than:
+        query = query.where(key < tuple_(*older_than))
+    query = query.order_by(Problem.created_at.desc(), Problem.id.desc())
+    rows = list((await session.execute(query)).all())
+    has_older = len(rows) > limit
+    return rows[:limit], has_older, older_than is not None
+
+
+# Problem session operations (step checkpoints, resume after restart)
+RESUMABLE_STATES = ("questioning", "solution")
+
+
+def decode_history(raw: Optional[str]) -> List[dict]:
+    """Legacy Session.conversation_history (JSON lines or JSON array), used by migrate_db"""
+    if not raw:
+        return []
+    if raw.lstrip().startswith("["):
+        return json.loads(raw)
+    return [json.loads(line) for line in raw.splitlines() if line]
+
+
+# Held from reading max(seq) until the commit, per problem
+_turn_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def conversation_lock(problem_id: Optional[int]) -> asyncio.Lock:
+    """
+    Lock serializing appends to one problem's dialogue.
+
+    Updates run as concurrent tasks: two quick answers would otherwise read
+    the same max(seq) and one would fail on ix_conversation_turns_problem_seq.
+    Hold it around append_conversation_turns and the commit.
+    """
+    lock = _turn_locks.get(problem_id)
+    if lock is None:
+        lock = _turn_locks[problem_id] = asyncio.Lock()
+    return lock
+
+
+async def append_conversation_turns(session: AsyncSession, problem_id: int, turns: Sequence[dict]) -> None:
+    """
+    Insert new turns at the end of a problem's dialogue (caller commits,
+    holding conversation_lock(problem_id)).
+
+    Cost does not depend on the dialogue length: the next seq is read from
+    the (problem_id, seq) index and existing turns are never rewritten.
+    """
+    result = await session.execute(
+        select(func.coalesce(func.max(ConversationTurn.seq), 0))
+        .where(ConversationTurn.problem_id == problem_id)
+    )
+    seq = result.scalar()
+    for turn in turns:
+        seq += 1
+        session.add(ConversationTurn(
+            problem_id=problem_id,
+            seq=seq,
+            role=turn["role"],
+            content=turn["content"],
+            tokens=estimate_tokens(turn["content"])
+        ))
+
+
+async def stream_conversation_turns(session: AsyncSession, problem_id: int) -> AsyncIterator[dict]:
+    """Turns of a problem's dialogue in order, as PromptBuilder messages"""
+    result = await session.stream(
+        select(ConversationTurn.role, ConversationTurn.content)
+        .where(ConversationTurn.problem_id == problem_id)
+        .order_by(ConversationTurn.seq)
+    )
+    async for row in result:
+        yield {"role": row.role, "content": row.content}
+
+
+async def get_conversation(session: AsyncSession, problem_id: int) -> List[dict]:
+    """Whole dialogue of a problem (see stream_conversation_turns)"""
+    return [turn async for turn in stream_conversation_turns(session, problem_id)]
+
+
+async def start_problem_session(session: AsyncSession, user_id: int, problem_id: int) -> Session:
+    """Open the checkpoint session of a new problem (caller commits)"""
+    # A new problem supersedes any unfinished one
+    await session.execute(
+        update(Session)
+        .where(Session.user_id == user_id, Session.state.in_(RESUMABLE_STATES))
+        .values(state="abandoned")
+    )
+    problem_session = Session(
+        user_id=user_id,
+        problem_id=problem_id,
+        state="questioning",
+        current_step=1
+    )
+    session.add(problem_session)
+    return problem_session
+
+
+async def checkpoint_problem_session(
+    session: AsyncSession,
+    problem_id: Optional[int],
+    turns: Sequence[dict] = (),
+    state: Optional[str] = None,
+    current_step: Optional[int] = None
+) -> None:
+    """
+    Append turns to the problem's dialogue and move session state/step
+    (caller commits; with turns, under conversation_lock(problem_id))
+    """
+    if problem_id is None:
+        return
+    if turns:
+        await append_conversation_turns(session, problem_id, turns)
+    values = {"interrupted_at": None}
+    if state is not None:
+        values["state"] = state
+    if current_step is not None:
+        values["current_step"] = current_step
+    await session.execute(update(Session).where(Session.problem_id == problem_id).values(**values))
+
+
+async def mark_session_interrupted(session: AsyncSession, problem_id: int) -> None:
+    """Flag a session whose generation was cut off by shutdown (caller commits)"""
+    await session.execute(
+        update(Session).where(Session.problem_id == problem_id).values(interrupted_at=datetime.utcnow())
+    )
+
+
+async def get_resumable_session(session: AsyncSession, user_id: int) -> Optional[Session]:
+    """User's latest problem session left before the solution"""
+    result = await session.execute(
+        select(Session)
+        .where(Session.user_id == user_id, Session.state.in_(RESUMABLE_STATES))
+        .order_by(Session.id.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+async def get_problem_session(session: AsyncSession, session_id: int) -> Optional[Session]:
+    """Get problem session by ID"""
+    result = await session.execute(select(Session).where(Session.id == session_id))
+    return result.scalar_one_or_none()
+
+
+async def get_interrupted_sessions(session: AsyncSession) -> List[Tuple[Session, int]]:
+    """Sessions cut off by shutdown with their user's telegram_id, oldest first"""
+    result = await session.execute(
+        select(Session, User.telegram_id)
+        .join(User, User.id == Session.user_id)
+        .where(Session.interrupted_at.is_not(None))
+        .order_by(Session.interrupted_at)
+    )
+    return [(row[0], row[1]) for row in result.all()]
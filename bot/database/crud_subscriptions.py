@@ -1,7 +1,9 @@
 """CRUD operations for subscriptions and referrals"""
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from bot.database.crud import add_user_credits
 from bot.database.models import User, Subscription, Referral
+from bot.services.stats import SUBSCRIPTIONS_ENDED, SUBSCRIPTIONS_RENEWED, SUBSCRIPTIONS_STARTED, stats
 from typing import Optional
 from datetime import datetime, timedelta
 import secrets
@@ -37,10 +39,11 @@ async def create_subscription(
     if user:
         user.subscription_id = subscription.id
         # Reset monthly solutions
-        user.problems_remaining += solutions_per_month
+        await add_user_credits(session, user.id, problems=solutions_per_month)
 
     await session.commit()
     await session.refresh(subscription)
+    stats.record(SUBSCRIPTIONS_STARTED, dimension=plan)
     return subscription
 
 
@@ -70,9 +73,12 @@ async def cancel_subscription(session: AsyncSession, subscription_id: int):
     )
     subscription = result.scalar_one_or_none()
     if subscription:
+        was_active = subscription.status == 'active'
         subscription.status = 'cancelled'
         subscription.cancelled_at = datetime.utcnow()
         await session.commit()
+        if was_active:
+            stats.record(SUBSCRIPTIONS_ENDED, dimension=subscription.plan)
 
 
 async def renew_subscription(session: AsyncSession, subscription_id: int, user_id: int):
@@ -94,9 +100,10 @@ async def renew_subscription(session: AsyncSession, subscription_id: int, user_i
     )
     user = result.scalar_one_or_none()
     if user:
-        user.problems_remaining += subscription.solutions_per_month
+        await add_user_credits(session, user.id, problems=subscription.solutions_per_month)
 
     await session.commit()
+    stats.record(SUBSCRIPTIONS_RENEWED, dimension=subscription.plan)
 
 
 # Referral operations
@@ -166,7 +173,7 @@ async def create_referral(
     referrer = result.scalar_one_or_none()
     if referrer:
         referrer.referral_credits += 1
-        referrer.problems_remaining += 1
+        await add_user_credits(session, referrer.id, problems=1)
 
     # Referred user gets 1 solution (already has 1 free, total 2)
     result = await session.execute(
@@ -174,7 +181,7 @@ async def create_referral(
     )
     referred = result.scalar_one_or_none()
     if referred:
-        referred.problems_remaining += 1
+        await add_user_credits(session, referred.id, problems=1)
 
     await session.commit()
     await session.refresh(referral)
@@ -1,16 +1,54 @@
-import os
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from bot.database.models import Base
+from bot.config import (
+    DATABASE_URL,
+    DB_COMMAND_TIMEOUT,
+    DB_ECHO,
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT
+)
+from bot.database.migrations import verify_schema
+from bot.services.metrics import instrument_engine
 
 
-# Get database URL from environment
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///bot_database.db")
+def _engine_options(url: str) -> dict:
+    """create_async_engine() arguments for the configured database"""
+    options = {"echo": DB_ECHO}
+    if url.startswith("postgresql"):
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            # Drop connections before server/proxy idle timeouts close them
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+            connect_args={
+                "command_timeout": DB_COMMAND_TIMEOUT,
+                "server_settings": {"application_name": "problem-solver-bot"},
+            },
+        )
+    return options
+
 
 # Create async engine
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=True  # Set to False in production
-)
+engine = create_async_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+
+# Time every SQL statement (bot_db_statement_duration_seconds)
+instrument_engine(engine.sync_engine)
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _enable_wal(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA page_count")
+        if cursor.fetchone()[0] == 0:
+            # New file: auto_vacuum only takes effect before WAL writes the header
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        # Readers (backups, /stats, exports) never block the bot's writers
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
 
 # Create session factory
 AsyncSessionLocal = async_sessionmaker(
@@ -21,9 +59,8 @@ AsyncSessionLocal = async_sessionmaker(
 
 
 async def init_db():
-    """Initialize database - create all tables"""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    """Check the schema version (schema changes are applied by scripts/migrate_db.py)"""
+    await verify_schema(engine)
 
 
 async def get_session() -> AsyncSession:
@@ -0,0 +1,152 @@
+"""
+Versioned schema migrations.
+
+Each vNNN_*.py module has VERSION and an idempotent upgrade(engine); applied
+versions are recorded in the schema_version table. Migrations are applied
+by scripts/migrate_db.py, never by the bot itself: at startup init_db()
+only compares the recorded version with LATEST_VERSION (one query), except
+for an empty database, which is created from models.py and stamped.
+
+Adding a migration: create the next vNNN module and append it to _MODULES.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+
+import structlog
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from bot.database.migrations import (
+    v001_legacy_columns,
+    v002_indexes,
+    v003_solution_sections,
+    v004_conversation_turns,
+    v005_search_index,
+    v006_archived_records,
+    v007_daily_stats,
+    v008_events,
+    v009_subscription_updated_at,
+)
+from bot.database.models import Base
+from bot.services.search import ensure_search_index
+
+logger = structlog.get_logger(__name__)
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+@dataclass
+class Migration:
+    """One schema version"""
+    version: int
+    name: str
+    upgrade: Callable[[AsyncEngine], Awaitable[None]]
+
+
+_MODULES = (
+    v001_legacy_columns,
+    v002_indexes,
+    v003_solution_sections,
+    v004_conversation_turns,
+    v005_search_index,
+    v006_archived_records,
+    v007_daily_stats,
+    v008_events,
+    v009_subscription_updated_at,
+)
+MIGRATIONS = [
+    Migration(module.VERSION, module.__name__.rsplit(".", 1)[1].split("_", 1)[1], module.upgrade)
+    for module in _MODULES
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+class SchemaVersionError(RuntimeError):
+    """Database schema is older than the code expects"""
+
+
+async def _has_table(conn: AsyncConnection, name: str) -> bool:
+    return await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table(name))
+
+
+async def get_schema_version(conn: AsyncConnection) -> Optional[int]:
+    """Latest applied version; 0 for a database from before versioned migrations, None if empty"""
+    if not await _has_table(conn, schema_version.name):
+        return 0 if await _has_table(conn, "users") else None
+    result = await conn.execute(select(func.max(schema_version.c.version)))
+    return result.scalar() or 0
+
+
+async def _record(conn: AsyncConnection, migration: Migration) -> None:
+    await conn.execute(schema_version.insert().values(
+        version=migration.version, name=migration.name, applied_at=datetime.utcnow()
+    ))
+
+
+async def create_schema(engine: AsyncEngine) -> None:
+    """Create an empty database from models.py and mark every migration as applied"""
+    async with engine.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            # Only takes effect before the first table; lets retention shrink the file
+            await conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(schema_version.create, checkfirst=True)
+        await ensure_search_index(conn)
+        for migration in MIGRATIONS:
+            await _record(conn, migration)
+
+
+def pending_migrations(version: int) -> List[Migration]:
+    return [migration for migration in MIGRATIONS if migration.version > version]
+
+
+async def upgrade(engine: AsyncEngine, log: Callable[[str], None] = logger.info) -> List[Migration]:
+    """Apply pending migrations in order; returns the applied ones"""
+    async with engine.connect() as conn:
+        version = await get_schema_version(conn)
+    if version is None:
+        log("Empty database: creating schema")
+        await create_schema(engine)
+        return list(MIGRATIONS)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(schema_version.create, checkfirst=True)
+
+    applied = []
+    for migration in pending_migrations(version):
+        log(f"Applying {migration.version:03d} {migration.name}")
+        await migration.upgrade(engine)
+        # Recorded only after success; an interrupted migration is simply run again
+        async with engine.begin() as conn:
+            await _record(conn, migration)
+        applied.append(migration)
+    return applied
+
+
+async def verify_schema(engine: AsyncEngine) -> int:
+    """
+    Startup check: raise SchemaVersionError if migrations are pending.
+
+    An empty database is created right away (first start, tests, loadtest).
+    """
+    async with engine.connect() as conn:
+        version = await get_schema_version(conn)
+    if version is None:
+        await create_schema(engine)
+        logger.info("database_schema_created", version=LATEST_VERSION)
+        return LATEST_VERSION
+    if version < LATEST_VERSION:
+        raise SchemaVersionError(
+            f"Database schema version {version}, code expects {LATEST_VERSION}: "
+            "run python scripts/migrate_db.py"
+        )
+    if version > LATEST_VERSION:
+        logger.warning("database_schema_newer_than_code", version=version, expected=LATEST_VERSION)
+    return version
@@ -0,0 +1,90 @@
+"""
+Building blocks for migrations that are safe to run next to the live bot.
+
+Every operation is idempotent, so an interrupted migration can simply be
+started again. Long data changes run in short batches, each in its own
+transaction, instead of holding one write lock for the whole table.
+"""
+from typing import Awaitable, Callable, Sequence, Set
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from bot.database.models import Base
+
+DEFAULT_BATCH_SIZE = 500
+
+
+async def existing_columns(conn: AsyncConnection, table: str) -> Set[str]:
+    """Column names of a table (works on SQLite and PostgreSQL)"""
+    return await conn.run_sync(lambda sync_conn: {c["name"] for c in inspect(sync_conn).get_columns(table)})
+
+
+async def add_missing_columns(engine: AsyncEngine, table: str, columns: Sequence[str]) -> None:
+    """
+    Add model columns that the table doesn't have yet.
+
+    Types are compiled from models.py for the connected database; NOT NULL
+    columns get their model default, so existing rows stay valid.
+    """
+    async with engine.begin() as conn:
+        present = await existing_columns(conn, table)
+        for name in columns:
+            if name in present:
+                continue
+            column = Base.metadata.tables[table].c[name]
+            sql = f"ALTER TABLE {table} ADD COLUMN {name} {column.type.compile(dialect=conn.dialect)}"
+            if not column.nullable and column.default is not None and column.default.is_scalar:
+                sql += f" DEFAULT {column.default.arg!r} NOT NULL"
+            await conn.execute(text(sql))
+
+
+async def create_index(engine: AsyncEngine, name: str, table: str, columns: str, unique: bool = False) -> None:
+    """
+    CREATE INDEX IF NOT EXISTS; on PostgreSQL CONCURRENTLY, so writes aren't blocked.
+
+    CONCURRENTLY can't run inside a transaction, hence the autocommit connection.
+    A failed or interrupted CONCURRENTLY build leaves an INVALID index that
+    IF NOT EXISTS would skip forever, so it is dropped and built again.
+    """
+    unique_sql = "UNIQUE " if unique else ""
+    async with engine.connect() as conn:
+        concurrently = ""
+        if conn.dialect.name == "postgresql":
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            concurrently = "CONCURRENTLY "
+            valid = await conn.scalar(
+                text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"), {"name": name}
+            )
+            if valid is False:
+                await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        await conn.execute(text(
+            f"CREATE {unique_sql}INDEX {concurrently}IF NOT EXISTS {name} ON {table} ({columns})"
+        ))
+        await conn.commit()
+
+
+async def in_batches(
+    engine: AsyncEngine,
+    query: str,
+    handle: Callable[[AsyncConnection, Sequence[Row]], Awaitable[None]],
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> int:
+    """
+    Run handle() over query results batch by batch; returns number of rows.
+
+    query selects the row id first and must contain
+    "id > :last_id ORDER BY id LIMIT :limit". Each batch is one transaction.
+    """
+    count = 0
+    last_id = 0
+    while True:
+        async with engine.begin() as conn:
+            rows = (await conn.execute(text(query), {"last_id": last_id, "limit": batch_size})).fetchall()
+            if not rows:
+                break
+            await handle(conn, rows)
+        count += len(rows)
+        last_id = rows[-1][0]
+    return count
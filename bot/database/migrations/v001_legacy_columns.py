@@ -0,0 +1,17 @@
+"""Tables and columns added before versioned migrations (subscriptions, referrals, solutions, sessions)"""
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from bot.database.migrations.ops import add_missing_columns
+from bot.database.models import Base
+
+VERSION = 1
+
+
+async def upgrade(engine: AsyncEngine) -> None:
+    # New tables only: create_all skips tables that already exist
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    await add_missing_columns(engine, "users", ["subscription_id", "referred_by", "referral_code", "referral_credits"])
+    await add_missing_columns(engine, "problems", ["solution_data", "preview"])
+    await add_missing_columns(engine, "sessions", ["interrupted_at"])
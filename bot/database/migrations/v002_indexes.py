@@ -0,0 +1,12 @@
+"""Indexes for history pagination and session checkpoints"""
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from bot.database.migrations.ops import create_index
+
+VERSION = 2
+
+
+async def upgrade(engine: AsyncEngine) -> None:
+    await create_index(engine, "ix_problems_user_created", "problems", "user_id, created_at, id")
+    await create_index(engine, "ix_sessions_problem", "sessions", "problem_id")
+    await create_index(engine, "ix_sessions_user_state", "sessions", "user_id, state")
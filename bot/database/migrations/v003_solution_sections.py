@@ -0,0 +1,38 @@
+"""Convert full-text solutions (problems.action_plan) into sections + preview"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from bot.config import SOLUTION_COMPRESSION
+from bot.database.migrations.ops import in_batches
+from bot.services.solution_parser import build_preview, encode_sections, parse_solution
+
+VERSION = 3
+
+
+async def _convert(conn, rows) -> None:
+    params = []
+    for problem_id, title, action_plan in rows:
+        sections = parse_solution(action_plan)
+        params.append({
+            "root_cause": sections.core,
+            "solution_data": encode_sections(sections, compress=SOLUTION_COMPRESSION),
+            "preview": build_preview(title, sections),
+            "id": problem_id,
+        })
+    await conn.execute(
+        text(
+            "UPDATE problems SET root_cause = :root_cause, solution_data = :solution_data, "
+            "preview = :preview, action_plan = NULL WHERE id = :id"
+        ),
+        params
+    )
+
+
+async def upgrade(engine: AsyncEngine) -> None:
+    await in_batches(
+        engine,
+        "SELECT id, title, action_plan FROM problems "
+        "WHERE action_plan IS NOT NULL AND solution_data IS NULL "
+        "AND id > :last_id ORDER BY id LIMIT :limit",
+        _convert
+    )
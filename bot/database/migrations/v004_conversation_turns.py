@@ -0,0 +1,49 @@
+"""Move sessions.conversation_history blobs into conversation_turns rows"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from bot.database.crud import decode_history
+from bot.database.migrations.ops import in_batches
+from bot.utils.text import estimate_tokens
+
+VERSION = 4
+
+
+async def _move(conn, rows) -> None:
+    for session_id, problem_id, raw_history in rows:
+        existing = await conn.execute(
+            text("SELECT 1 FROM conversation_turns WHERE problem_id = :problem_id LIMIT 1"),
+            {"problem_id": problem_id}
+        )
+        turns = decode_history(raw_history)
+        if turns and existing.first() is None:
+            await conn.execute(
+                text(
+                    "INSERT INTO conversation_turns (problem_id, seq, role, content, tokens, created_at) "
+                    "VALUES (:problem_id, :seq, :role, :content, :tokens, CURRENT_TIMESTAMP)"
+                ),
+                [
+                    {
+                        "problem_id": problem_id,
+                        "seq": seq,
+                        "role": turn["role"],
+                        "content": turn["content"],
+                        "tokens": estimate_tokens(turn["content"]),
+                    }
+                    for seq, turn in enumerate(turns, start=1)
+                ]
+            )
+        await conn.execute(
+            text("UPDATE sessions SET conversation_history = NULL WHERE id = :id"),
+            {"id": session_id}
+        )
+
+
+async def upgrade(engine: AsyncEngine) -> None:
+    await in_batches(
+        engine,
+        "SELECT id, problem_id, conversation_history FROM sessions "
+        "WHERE conversation_history IS NOT NULL AND problem_id IS NOT NULL "
+        "AND id > :last_id ORDER BY id LIMIT :limit",
+        _move
+    )
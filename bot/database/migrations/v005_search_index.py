@@ -0,0 +1,19 @@
+"""Full-text search index (SQLite FTS5; other databases use the LIKE fallback)"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from bot.services.search import FTS_TABLE, ensure_search_index, rebuild_search_index
+
+VERSION = 5
+
+
+async def upgrade(engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        if not await ensure_search_index(conn):
+            return
+        # Already filled (incrementally by the bot or by an earlier run)
+        if (await conn.execute(text(f"SELECT 1 FROM {FTS_TABLE} LIMIT 1"))).first() is not None:
+            return
+        async with AsyncSession(bind=conn) as session:
+            await rebuild_search_index(session)
+            await session.flush()
@@ -0,0 +1,11 @@
+"""Archive table for the retention job"""
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from bot.database.models import ArchivedRecord
+
+VERSION = 6
+
+
+async def upgrade(engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(ArchivedRecord.__table__.create, checkfirst=True)
@@ -0,0 +1,79 @@
+"""Rollup table for /stats, seeded from existing rows"""
+from collections import Counter
+from datetime import date, datetime
+
+from sqlalchemy import Date, bindparam, cast, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from bot.database.migrations.ops import add_missing_columns
+from bot.database.models import DailyStat, Payment, Problem, Subscription, User
+from bot.services import stats
+
+VERSION = 7
+
+# Stars payments are stored as 'completed'; YooKassa rows stay 'pending' and
+# are counted from now on by the payment handler only
+PAID_STATUSES = ("completed", "succeeded")
+
+
+def _day(conn, column):
+    # CAST(... AS DATE) on SQLite would turn '2025-01-02 ...' into 2025
+    return func.date(column) if conn.dialect.name == "sqlite" else cast(column, Date)
+
+
+def _as_date(value) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+async def _backfill(conn) -> None:
+    totals: Counter = Counter()
+
+    async def count_by_day(metric, column, *where, dimension=None, value=None):
+        keys = [_day(conn, column)] + ([dimension] if dimension is not None else [])
+        aggregate = func.count() if value is None else func.sum(value)
+        query = select(aggregate, *keys).where(column.is_not(None), *where).group_by(*keys)
+        for amount, row_day, *row_dimension in await conn.execute(query):
+            key = (_as_date(row_day), metric, (row_dimension[0] if row_dimension else None) or "")
+            totals[key] += float(amount or 0)
+
+    await count_by_day(stats.NEW_USERS, User.created_at)
+    await count_by_day(stats.PROBLEMS_STARTED, Problem.created_at)
+    await count_by_day(stats.PROBLEMS_SOLVED, Problem.solved_at)
+    paid = Payment.status.in_(PAID_STATUSES)
+    provider = func.coalesce(Payment.provider, "unknown")
+    await count_by_day(stats.PAYMENTS, Payment.created_at, paid, dimension=provider)
+    await count_by_day(stats.REVENUE, Payment.created_at, paid, dimension=provider, value=Payment.amount)
+    await count_by_day(stats.SUBSCRIPTIONS_STARTED, Subscription.created_at, dimension=Subscription.plan)
+    await count_by_day(
+        stats.SUBSCRIPTIONS_ENDED, Subscription.cancelled_at, Subscription.status != "active",
+        dimension=Subscription.plan
+    )
+
+    # First purchase per user: users.first_paid_at and first_purchases per day
+    first_payments = (await conn.execute(
+        select(Payment.user_id, func.min(Payment.created_at)).where(paid).group_by(Payment.user_id)
+    )).all()
+    params = []
+    for user_id, paid_at in first_payments:
+        paid_at = paid_at if isinstance(paid_at, datetime) else datetime.fromisoformat(str(paid_at))
+        params.append({"b_user_id": user_id, "b_paid_at": paid_at})
+        totals[(paid_at.date(), stats.FIRST_PURCHASES, "")] += 1
+    if params:
+        await conn.execute(
+            update(User).where(User.id == bindparam("b_user_id")).values(first_paid_at=bindparam("b_paid_at")),
+            params
+        )
+
+    if totals:
+        await conn.execute(insert(DailyStat), [
+            {"day": day, "metric": metric, "dimension": dimension, "value": value}
+            for (day, metric, dimension), value in totals.items()
+        ])
+
+
+async def upgrade(engine: AsyncEngine) -> None:
+    await add_missing_columns(engine, "users", ["last_active_on", "first_paid_at"])
+    async with engine.begin() as conn:
+        await conn.run_sync(DailyStat.__table__.create, checkfirst=True)
+        if await conn.scalar(select(func.count()).select_from(DailyStat)) == 0:
+            await _backfill(conn)
@@ -0,0 +1,11 @@
+"""Funnel events table"""
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from bot.database.models import Event
+
+VERSION = 8
+
+
+async def upgrade(engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Event.__table__.create, checkfirst=True)
@@ -0,0 +1,19 @@
+"""subscriptions.updated_at: export watermark that renewals move too"""
+from sqlalchemy import func, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from bot.database.migrations.ops import add_missing_columns
+from bot.database.models import Subscription
+
+VERSION = 9
+
+
+async def upgrade(engine: AsyncEngine) -> None:
+    await add_missing_columns(engine, "subscriptions", ["updated_at"])
+    # Small table: one statement; the last known change is the best estimate
+    async with engine.begin() as conn:
+        await conn.execute(
+            update(Subscription)
+            .where(Subscription.updated_at.is_(None))
+            .values(updated_at=func.coalesce(Subscription.cancelled_at, Subscription.created_at))
+        )
@@ -1,6 +1,8 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List
-from sqlalchemy import BigInteger, Boolean, Integer, String, Text, DECIMAL, DateTime, ForeignKey
+from sqlalchemy import (
+    BigInteger, Boolean, Date, Float, Index, Integer, LargeBinary, String, Text, DECIMAL, DateTime, ForeignKey
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -33,6 +35,10 @@ class User(Base):
     referral_code: Mapped[Optional[str]] = mapped_column(String(20), unique=True)
     referral_credits: Mapped[int] = mapped_column(Integer, default=0)  # Bonus credits from referrals
 
+    # Rollup guards (bot.services.stats): each user counted once per day / once as a buyer
+    last_active_on: Mapped[Optional[date]] = mapped_column(Date)
+    first_paid_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -48,14 +54,20 @@ class User(Base):
 class Session(Base):
     """Session model for storing active FSM sessions"""
     __tablename__ = "sessions"
-    
+    __table_args__ = (
+        # Checkpoint updates (by problem) and resume lookup (by user)
+        Index("ix_sessions_problem", "problem_id"),
+        Index("ix_sessions_user_state", "user_id", "state"),
+    )
+
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     problem_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("problems.id", ondelete="SET NULL"))
-    state: Mapped[str] = mapped_column(String(50), nullable=False)  # 'diagnosis', 'questioning', 'solution'
+    state: Mapped[str] = mapped_column(String(50), nullable=False)  # 'questioning', 'solution', 'discussion', 'solved', 'abandoned'
     methodology: Mapped[Optional[str]] = mapped_column(String(50))  # '5_whys', 'fishbone', 'first_principles'
     current_step: Mapped[int] = mapped_column(Integer, default=1)
-    conversation_history: Mapped[Optional[str]] = mapped_column(Text)  # JSON array
+    conversation_history: Mapped[Optional[str]] = mapped_column(Text)  # Legacy: JSON history (now conversation_turns)
+    interrupted_at: Mapped[Optional[datetime]] = mapped_column(DateTime)  # Generation cut off by shutdown
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -65,14 +77,20 @@ class Session(Base):
 class Problem(Base):
     """Problem model for storing problem analysis records"""
     __tablename__ = "problems"
-    
+    __table_args__ = (
+        # Keyset pagination of history (get_user_problems_page)
+        Index("ix_problems_user_created", "user_id", "created_at", "id"),
+    )
+
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     title: Mapped[str] = mapped_column(Text, nullable=False)
     problem_type: Mapped[Optional[str]] = mapped_column(String(50))  # 'linear', 'multifactor', 'systemic'
     methodology: Mapped[Optional[str]] = mapped_column(String(50))
-    root_cause: Mapped[Optional[str]] = mapped_column(Text)
-    action_plan: Mapped[Optional[str]] = mapped_column(Text)  # JSON
+    root_cause: Mapped[Optional[str]] = mapped_column(Text)  # "В чём суть" section
+    action_plan: Mapped[Optional[str]] = mapped_column(Text)  # Legacy: full solution text (rows before solution_data)
+    solution_data: Mapped[Optional[bytes]] = mapped_column(LargeBinary)  # Parsed sections, see solution_parser
+    preview: Mapped[Optional[str]] = mapped_column(Text)  # Ready-to-send plain-text history view
     status: Mapped[str] = mapped_column(String(20), default='active')  # 'active', 'solved', 'archived'
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     solved_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
@@ -81,6 +99,23 @@ class Problem(Base):
     user: Mapped["User"] = relationship(back_populates="problems")
 
 
+class ConversationTurn(Base):
+    """One message of a problem's dialogue (append-only)"""
+    __tablename__ = "conversation_turns"
+    __table_args__ = (
+        # Ordered reads of a dialogue and next seq lookup
+        Index("ix_conversation_turns_problem_seq", "problem_id", "seq", unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    problem_id: Mapped[int] = mapped_column(Integer, ForeignKey("problems.id", ondelete="CASCADE"), nullable=False)
+    seq: Mapped[int] = mapped_column(Integer, nullable=False)  # 1-based position in the dialogue
+    role: Mapped[str] = mapped_column(String(20), nullable=False)  # 'user', 'assistant'
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    tokens: Mapped[int] = mapped_column(Integer, default=0)  # Estimated (~3 chars per token)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
 class Payment(Base):
     """Payment model for storing payment records (YooKassa and Telegram Stars)"""
     __tablename__ = "payments"
@@ -100,6 +135,48 @@ class Payment(Base):
     user: Mapped["User"] = relationship(back_populates="payments")
 
 
+class ArchivedRecord(Base):
+    """Row moved out of a hot table by retention (bot.services.retention)"""
+    __tablename__ = "archived_records"
+    __table_args__ = (
+        Index("ix_archived_records_source", "source_table", "source_id", unique=True),
+        Index("ix_archived_records_user", "user_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    source_table: Mapped[str] = mapped_column(String(50), nullable=False)  # 'problems', 'payments'
+    source_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    user_id: Mapped[Optional[int]] = mapped_column(Integer)  # No FK: archive outlives the user row
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)  # Of the original row
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    payload: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)  # zlib-compressed JSON of the row
+
+
+class DailyStat(Base):
+    """Pre-aggregated counter for one day (bot.services.stats)"""
+    __tablename__ = "daily_stats"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    metric: Mapped[str] = mapped_column(String(40), primary_key=True)  # 'problems_started', 'revenue', ...
+    dimension: Mapped[str] = mapped_column(String(40), primary_key=True, default="")  # provider, plan, operation
+    value: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+
+
+class Event(Base):
+    """Funnel event written in batches by bot.services.events"""
+    __tablename__ = "events"
+    __table_args__ = (
+        Index("ix_events_name_created", "name", "created_at"),
+        Index("ix_events_telegram_created", "telegram_id", "created_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)  # When tracked, not when flushed
+    name: Mapped[str] = mapped_column(String(40), nullable=False)  # 'problem_started', 'payment_succeeded', ...
+    telegram_id: Mapped[Optional[int]] = mapped_column(BigInteger)  # No FK: events outlive the user row
+    properties: Mapped[Optional[str]] = mapped_column(Text)  # Compact JSON, e.g. {"step":2}
+
+
 class Subscription(Base):
     """Subscription model for recurring monthly subscriptions"""
     __tablename__ = "subscriptions"
@@ -114,6 +191,7 @@ class Subscription(Base):
     next_billing_date: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     cancelled_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     user: Mapped[Optional["User"]] = relationship(back_populates="subscription", foreign_keys="User.subscription_id")
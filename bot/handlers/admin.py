@@ -0,0 +1,60 @@
+"""Admin-only dashboard (/stats), numbers from bot.services.stats rollups"""
+from html import escape
+
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.types import Message
+import structlog
+
+from bot.config import ADMIN_IDS
+from bot.services.stats import get_dashboard
+
+router = Router()
+logger = structlog.get_logger(__name__)
+
+PERIOD_TITLES = {"today": "Сегодня", "7d": "7 дней", "30d": "30 дней"}
+CURRENCIES = {"yookassa": "₽", "telegram_stars": "⭐️"}
+
+
+def _percent(value) -> str:
+    return "—" if value is None else f"{value * 100:.1f}%"
+
+
+def _number(value: float) -> str:
+    return f"{value:,.0f}".replace(",", " ")
+
+
+def format_dashboard(dashboard: dict) -> str:
+    lines = [f"📊 <b>Статистика</b> (UTC, {escape(dashboard['generated_at'])})",
+             f"Активных подписок: <b>{dashboard['active_subscriptions']}</b>"]
+    for period, title in PERIOD_TITLES.items():
+        stats = dashboard["periods"][period]
+        revenue = ", ".join(
+            f"{_number(amount)} {CURRENCIES.get(provider, escape(provider))}"
+            for provider, amount in sorted(stats["revenue"].items())
+        ) or "—"
+        tokens = stats["tokens"]
+        lines += [
+            "",
+            f"<b>{title}</b>",
+            f"DAU: {stats['dau']:g} · новых: {stats['new_users']}",
+            f"Проблем: {stats['problems_started']} начато, {stats['problems_solved']} решено "
+            f"({_percent(stats['solve_rate'])})",
+            f"Первые покупки: {stats['first_purchases']} (конверсия {_percent(stats['conversion'])})",
+            f"Платежей: {sum(stats['payments'].values())} · выручка: {revenue}",
+            f"Подписки: +{stats['subscriptions_started']} / продлено {stats['subscriptions_renewed']}"
+            f" / −{stats['subscriptions_ended']}",
+            f"Токены: {_number(tokens['input'])} in, {_number(tokens['output'])} out,"
+            f" {_number(tokens['cache_read'])} из кэша",
+        ]
+    return "\n".join(lines)
+
+
+@router.message(Command("stats"))
+async def cmd_stats(message: Message):
+    """Handle /stats (admins only; ignored for everyone else)"""
+    if message.from_user.id not in ADMIN_IDS:
+        return
+    dashboard = await get_dashboard()
+    logger.info("admin_stats_viewed", telegram_id=message.from_user.id)
+    await message.answer(format_dashboard(dashboard), parse_mode="HTML")
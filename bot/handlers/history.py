@@ -1,42 +1,114 @@
 from aiogram import Router, F
-from aiogram.types import CallbackQuery
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from datetime import datetime
+from typing import Optional, Tuple
 import json
 
 from bot.database.engine import AsyncSessionLocal
-from bot.database.crud import get_user_by_telegram_id, get_user_problems
+from bot.database.crud import get_user_by_telegram_id, get_user_problems_page, ProblemCursor
 from bot.utils.text import prepare_problem_text
 
 router = Router()
 
+HISTORY_PAGE_SIZE = 10
+_CURSOR_TIME_FORMAT = "%Y%m%d%H%M%S%f"
+
+# Where the list was opened from: controls the back button
+ORIGIN_MENU = "menu"
+ORIGIN_PROFILE = "profile"
+
+
+def _encode_cursor(created_at: datetime, problem_id: int) -> str:
+    return f"{created_at.strftime(_CURSOR_TIME_FORMAT)}_{problem_id}"
+
+
+def _decode_cursor(stamp: str, problem_id: str) -> ProblemCursor:
+    return datetime.strptime(stamp, _CURSOR_TIME_FORMAT), int(problem_id)
+
+
+async def build_history_page(
+    telegram_id: int,
+    origin: str = ORIGIN_MENU,
+    older_than: Optional[ProblemCursor] = None,
+    newer_than: Optional[ProblemCursor] = None
+) -> Optional[Tuple[str, InlineKeyboardMarkup]]:
+    """History list text and keyboard; None if user has no problems"""
+    async with AsyncSessionLocal() as session:
+        user = await get_user_by_telegram_id(session, telegram_id)
+        if not user:
+            return None
+        rows, has_older, has_newer = await get_user_problems_page(
+            session, user.id, limit=HISTORY_PAGE_SIZE, older_than=older_than, newer_than=newer_than
+        )
+
+    if not rows:
+        return None
+
+    builder = InlineKeyboardBuilder()
+    for p in rows:
+        status_emoji = "✅" if p.status == "solved" else "⏳"
+        title = p.title[:40] + "..." if len(p.title) > 40 else p.title
+        builder.button(
+            text=f"{status_emoji} {title}",
+            callback_data=f"view_problem_{p.id}"
+        )
+
+    # Navigation row: cursors point at the first/last row of this page
+    navigation = []
+    if has_newer:
+        first = rows[0]
+        navigation.append(("◀️ Новее", f"history_newer_{origin}_{_encode_cursor(first.created_at, first.id)}"))
+    if has_older:
+        last = rows[-1]
+        navigation.append(("Старее ▶️", f"history_older_{origin}_{_encode_cursor(last.created_at, last.id)}"))
+    for text, callback_data in navigation:
+        builder.button(text=text, callback_data=callback_data)
+
+    sizes = [1] * len(rows)
+    if navigation:
+        sizes.append(len(navigation))
+    if origin == ORIGIN_PROFILE:
+        builder.button(text="◀️ Назад в профиль", callback_data="back_to_profile")
+        sizes.append(1)
+    builder.adjust(*sizes)
+
+    return "📖 История решений:", builder.as_markup()
+
+
 @router.callback_query(F.data == "my_problems")
 async def show_problems_list(callback: CallbackQuery):
     """Show user's problems history"""
-    async with AsyncSessionLocal() as session:
-        user = await get_user_by_telegram_id(session, callback.from_user.id)
-        problems = await get_user_problems(session, user.id, limit=10)
+    page = await build_history_page(callback.from_user.id)
 
-        if not problems:
-            await callback.message.answer("📭 У тебя пока нет решённых задач")
-            await callback.answer()
-            return
+    if not page:
+        await callback.message.answer("📭 У тебя пока нет решённых задач")
+        await callback.answer()
+        return
 
-        builder = InlineKeyboardBuilder()
-        for p in problems:
-            status_emoji = "✅" if p.status == "solved" else "⏳"
-            title = p.title[:40] + "..." if len(p.title) > 40 else p.title
-            builder.button(
-                text=f"{status_emoji} {title}",
-                callback_data=f"view_problem_{p.id}"
-            )
-        builder.adjust(1)
+    text, markup = page
+    await callback.message.answer(text, reply_markup=markup)
+    await callback.answer()
 
-        from bot.keyboards import get_main_menu_keyboard
-        await callback.message.answer(
-            "📖 История решений:",
-            reply_markup=builder.as_markup()
-        )
 
+@router.callback_query(F.data.startswith("history_older_") | F.data.startswith("history_newer_"))
+async def paginate_problems_list(callback: CallbackQuery):
+    """Show next/previous history page in place"""
+    # history_{older|newer}_{origin}_{stamp}_{id}
+    _, direction, origin, stamp, problem_id = callback.data.split("_")
+    cursor = _decode_cursor(stamp, problem_id)
+
+    if direction == "older":
+        page = await build_history_page(callback.from_user.id, origin, older_than=cursor)
+    else:
+        page = await build_history_page(callback.from_user.id, origin, newer_than=cursor)
+
+    if not page:
+        await callback.answer("Больше задач нет")
+        return
+
+    text, markup = page
+    await callback.message.edit_text(text, reply_markup=markup)
     await callback.answer()
 
 @router.callback_query(F.data.startswith("view_problem_"))
@@ -48,22 +120,26 @@ async def view_problem_detail(callback: CallbackQuery):
         from sqlalchemy import select
         from bot.database.models import Problem
 
+        # Only the columns needed for display; solution_data stays on disk
         result = await session.execute(
-            select(Problem).where(Problem.id == problem_id)
+            select(Problem.title, Problem.preview, Problem.root_cause, Problem.action_plan)
+            .where(Problem.id == problem_id)
         )
-        problem = result.scalar_one_or_none()
+        problem = result.one_or_none()
 
         if not problem:
             await callback.answer("Проблема не найдена", show_alert=True)
             return
 
-        # Always use safe text preparation to strip markdown
-        text = prepare_problem_text(
-            title=problem.title,
-            root_cause=problem.root_cause,
-            action_plan=problem.action_plan,
-            max_plan_length=1500
-        )
+        text = problem.preview
+        if text is None:
+            # Rows saved before previews were precomputed
+            text = prepare_problem_text(
+                title=problem.title,
+                root_cause=problem.root_cause,
+                action_plan=problem.action_plan,
+                max_plan_length=1500
+            )
 
         builder = InlineKeyboardBuilder()
         builder.button(text="🔙 К списку", callback_data="my_problems")
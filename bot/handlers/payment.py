@@ -4,8 +4,12 @@ from aiogram.types import CallbackQuery, Message, LabeledPrice, PreCheckoutQuery
 from aiogram.utils.keyboard import InlineKeyboardBuilder, InlineKeyboardMarkup, InlineKeyboardButton
 
 from bot.database.engine import AsyncSessionLocal
-from bot.database.crud import get_user_by_telegram_id
+from bot.database.crud import get_user_by_telegram_id, mark_first_payment
 from bot.database.models import Payment as PaymentModel
+from bot.services.events import (
+    PAYMENT_INITIATED, PAYMENT_METHODS_SHOWN, PAYMENT_SUCCEEDED, PURCHASE_SCREEN, events
+)
+from bot.services.stats import FIRST_PURCHASES, PAYMENTS, REVENUE, stats
 from bot.services.yookassa_service import YooKassaService
 from bot.config import (
     ENABLE_YOOKASSA,
@@ -27,6 +31,7 @@ logger = structlog.get_logger()
 @router.callback_query(F.data == "buy_solutions")
 async def show_purchase_type_selection(callback: CallbackQuery):
     """Show purchase type selection: subscriptions vs one-time packages (Level 0)"""
+    events.track(PURCHASE_SCREEN, callback.from_user.id, screen="purchase_type")
     text = """💳 <b>Что тебе удобнее?</b>
 
 <b>📅 Подписка</b>
@@ -63,6 +68,7 @@ async def show_purchase_type_selection(callback: CallbackQuery):
 @router.callback_query(F.data == "show_subscriptions")
 async def show_subscriptions(callback: CallbackQuery):
     """Show only subscription options (Level 1)"""
+    events.track(PURCHASE_SCREEN, callback.from_user.id, screen="subscriptions")
     text = """📅 <b>Выбери подписку</b>
 
 <b>🔸 Стандарт</b>
@@ -96,6 +102,7 @@ async def show_subscriptions(callback: CallbackQuery):
 @router.callback_query(F.data == "show_packages")
 async def show_packages(callback: CallbackQuery):
     """Show only one-time packages (Level 1)"""
+    events.track(PURCHASE_SCREEN, callback.from_user.id, screen="packages")
     text = """💰 <b>Выбери пакет</b>
 
 <b>🔥 Стартовый</b>
@@ -129,6 +136,7 @@ async def show_packages(callback: CallbackQuery):
 @router.callback_query(F.data == "buy_discussions")
 async def show_discussion_packages(callback: CallbackQuery):
     """Show discussion question packages (Level 1)"""
+    events.track(PURCHASE_SCREEN, callback.from_user.id, screen="discussions")
     text = """💬 <b>Пакеты вопросов для обсуждения</b>
 
 После каждого решения можно задать дополнительные вопросы.
@@ -171,6 +179,7 @@ async def show_payment_methods(callback: CallbackQuery):
     if not yookassa_package and not stars_package:
         await callback.answer("❌ Пакет не найден", show_alert=True)
         return
+    events.track(PAYMENT_METHODS_SHOWN, callback.from_user.id, package=package_type)
 
     # Build description based on package type
     package_name = yookassa_package['name'] if yookassa_package else stars_package['name']
@@ -310,6 +319,7 @@ async def initiate_yookassa_payment(callback: CallbackQuery):
 
         await callback.message.answer(text, reply_markup=keyboard, parse_mode="HTML")
         await callback.answer()
+        events.track(PAYMENT_INITIATED, user_id, provider="yookassa", package=package_type)
 
         logger.info(
             "yookassa_payment_initiated",
@@ -368,7 +378,9 @@ async def process_successful_yookassa_payment(callback: CallbackQuery, payment_s
 
             # Activate package
             success_msg = await activate_package(session, user, package, package_type)
+            first_purchase = await mark_first_payment(session, user.id)
             await session.commit()
+            _record_payment("yookassa", user_id, package_type, payment_status['amount'], first_purchase)
 
             await callback.message.answer(success_msg, parse_mode="HTML")
             await callback.answer("✅ Оплата успешна!")
@@ -421,6 +433,7 @@ async def initiate_stars_payment(callback: CallbackQuery):
             prices=prices
         )
         await callback.answer()
+        events.track(PAYMENT_INITIATED, callback.from_user.id, provider="telegram_stars", package=package_type)
 
         logger.info(
             "stars_payment_initiated",
@@ -475,7 +488,11 @@ async def process_successful_stars_payment(message: Message):
 
         # Activate package
         success_msg = await activate_package(session, user, package, package_type)
+        first_purchase = await mark_first_payment(session, user.id)
         await session.commit()
+    _record_payment(
+        "telegram_stars", message.from_user.id, package_type, payment_info.total_amount, first_purchase
+    )
 
     from bot.keyboards import get_main_menu_keyboard
     await message.answer(success_msg, reply_markup=get_main_menu_keyboard(), parse_mode="HTML")
@@ -492,6 +509,18 @@ async def process_successful_stars_payment(message: Message):
 # Shared helper: Activate package for both payment providers
 # ============================================================================
 
+def _record_payment(provider: str, telegram_id: int, package_type: str, amount: float, first_purchase: bool) -> None:
+    """Count a committed payment for /stats and the funnel (amount in the provider's currency)"""
+    stats.record(PAYMENTS, dimension=provider)
+    stats.record(REVENUE, amount, dimension=provider)
+    if first_purchase:
+        stats.record(FIRST_PURCHASES)
+    events.track(
+        PAYMENT_SUCCEEDED, telegram_id,
+        provider=provider, package=package_type, amount=amount, first_purchase=first_purchase
+    )
+
+
 async def activate_package(session, user, package: dict, package_type: str) -> str:
     """
     Activate purchased package (works for both YooKassa and Telegram Stars)
@@ -505,6 +534,7 @@ async def activate_package(session, user, package: dict, package_type: str) -> s
     Returns:
         Success message text
     """
+    from bot.database.crud import add_user_credits
     from bot.database.crud_subscriptions import create_subscription
 
     if package_type.startswith('subscription_'):
@@ -515,7 +545,7 @@ async def activate_package(session, user, package: dict, package_type: str) -> s
             plan=package['plan'],
             price=package['price']
         )
-        user.problems_remaining += package['solutions']
+        await add_user_credits(session, user.id, problems=package['solutions'])
         user.subscription_id = subscription.id
 
         success_msg = (
@@ -528,7 +558,7 @@ async def activate_package(session, user, package: dict, package_type: str) -> s
 
     elif package_type.startswith('discussion_'):
         # Add discussion credits
-        user.discussion_credits += package['discussions']
+        await add_user_credits(session, user.id, discussions=package['discussions'])
 
         success_msg = (
             f"✅ <b>Вопросы добавлены!</b>\n\n"
@@ -538,7 +568,7 @@ async def activate_package(session, user, package: dict, package_type: str) -> s
 
     else:
         # One-time package
-        user.problems_remaining += package['solutions']
+        await add_user_credits(session, user.id, problems=package['solutions'])
         user.last_purchased_package = package_type
 
         success_msg = (
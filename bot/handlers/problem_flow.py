@@ -7,27 +7,131 @@ from aiogram.utils.chat_action import ChatActionSender
 import json
 import random
 import asyncio
+import time
 from datetime import datetime
+from typing import Awaitable, List, Optional, Tuple
 
 from bot.states import ProblemSolvingStates
 from bot.services.claude_service import ClaudeService
 from bot.services.prompt_builder import PromptBuilder
 from bot.database.engine import AsyncSessionLocal
-from bot.database.crud import get_user_by_telegram_id, create_problem, calculate_age
+from bot.database.crud import (
+    get_user_by_telegram_id, create_problem, calculate_age, add_user_credits, consume_discussion_credit,
+    consume_problem_credit,
+    checkpoint_problem_session, conversation_lock, get_conversation, get_problem_session, start_problem_session
+)
 from bot.database.models import Problem
+from bot.services.events import (
+    DISCUSSION_MESSAGE, DISCUSSION_STARTED, PROBLEM_STARTED, QUESTION_ANSWERED, SOLUTION_DELIVERED, events
+)
+from bot.services.inflight import GenerationSnapshot, inflight
+from bot.services.metrics import TIME_TO_QUESTION
+from bot.services.search import index_problem
+from bot.services.task_supervisor import supervisor
+from bot.services.similarity import remember_solution, similar_patterns_hint
+from bot.services.stats import PROBLEMS_SOLVED, PROBLEMS_STARTED, stats
+from bot.services.solution_parser import build_preview, encode_sections, parse_solution
+from bot.utils.messages import answer_formatted, edit_formatted
+from bot.utils.tasks import gather_calls
 from bot.config import (
+    CLAUDE_CACHE_PREWARM,
+    CLAUDE_PIPELINE_FIRST_QUESTION,
     FREE_DISCUSSION_QUESTIONS,
     STARTER_DISCUSSION_LIMIT,
     MEDIUM_DISCUSSION_LIMIT,
-    LARGE_DISCUSSION_LIMIT
+    LARGE_DISCUSSION_LIMIT,
+    SOLUTION_COMPRESSION
 )
 from sqlalchemy import select
+from structlog.contextvars import bind_contextvars
 
 router = Router()
 claude = ClaudeService()
 prompt_builder = PromptBuilder()
 
+def _build_user_context(user) -> dict:
+    """Profile fields used by PromptBuilder.build_system_prompt"""
+    return {
+        'gender': user.gender if user else None,
+        'age': calculate_age(user.birth_date) if user and user.birth_date else None,
+        'occupation': user.occupation if user else None,
+        'work_format': user.work_format if user else None
+    }
+
+
+def prewarm_prompt_cache(user) -> None:
+    """Start writing user's system prompt to Claude's cache (CLAUDE_CACHE_PREWARM)"""
+    if CLAUDE_CACHE_PREWARM:
+        supervisor.spawn(claude.prewarm_cache(_build_user_context(user)), name="prompt_cache_prewarm")
+
+
+def _snapshot(message: Message, data: dict, kind: str) -> GenerationSnapshot:
+    """Problem whose session is flagged if shutdown interrupts the generation"""
+    return GenerationSnapshot(
+        kind=kind,
+        telegram_id=message.chat.id,
+        user_id=data.get('user_id'),
+        problem_id=data.get('problem_id')
+    )
+
+
+async def _checkpoint(problem_id: Optional[int], **changes) -> None:
+    """Store new dialogue turns and flow progress (the dialogue lives only in the database)"""
+    async with conversation_lock(problem_id), AsyncSessionLocal() as session:
+        await checkpoint_problem_session(session, problem_id, **changes)
+        await session.commit()
+
+
+async def _load_conversation(problem_id: Optional[int]) -> List[dict]:
+    if problem_id is None:
+        return []
+    async with AsyncSessionLocal() as session:
+        return await get_conversation(session, problem_id)
+
+
+async def _answer_no_credits(message: Message) -> None:
+    builder = InlineKeyboardBuilder()
+    builder.button(text="💳 Купить решения", callback_data="buy_solutions")
+    builder.adjust(1)
 
+    await message.answer(
+        "❌ У тебя закончились решения!\n\n"
+        "💳 Купи пакет решений, чтобы продолжить анализ проблем.",
+        reply_markup=builder.as_markup()
+    )
+
+
+async def _delete_quietly(msg: Message) -> None:
+    try:
+        await msg.delete()
+    except Exception:
+        pass
+
+
+async def _generate_with_status(message: Message, status_text: str, generation: Awaitable[str]) -> Tuple[Message, str]:
+    """
+    Run a Claude generation behind a status message and typing indicator.
+
+    The Claude request is started before the status message is sent, and
+    typing is sent by ChatActionSender's worker, so no Telegram round trip
+    delays the generation. Returns (status message, generated text).
+    """
+    generation = asyncio.ensure_future(generation)
+    try:
+        status_msg = await message.answer(status_text)
+        # Typing goes after the status message: sending a message clears the chat action
+        async with ChatActionSender(
+            bot=message.bot,
+            chat_id=message.chat.id,
+            action="typing",
+            initial_sleep=0,
+            interval=3.0
+        ):
+            text = await generation
+    except BaseException:
+        generation.cancel()
+        raise
+    return status_msg, text
 
 
 @router.callback_query(F.data == "new_problem")
@@ -38,128 +142,150 @@ async def start_new_problem(callback: CallbackQuery, state: FSMContext):
         user = await get_user_by_telegram_id(session, callback.from_user.id)
 
         if user.problems_remaining <= 0:
-            builder = InlineKeyboardBuilder()
-            builder.button(text="💳 Купить решения", callback_data="buy_solutions")
-            builder.adjust(1)
-
-            await callback.message.answer(
-                "❌ У тебя закончились решения!\n\n"
-                "💳 Купи пакет решений, чтобы продолжить анализ проблем.",
-                reply_markup=builder.as_markup()
-            )
+            await _answer_no_credits(callback.message)
             await callback.answer()
             return
 
-    await callback.message.answer(
-        "🎯 Опиши свою проблему своими словами.\n\n"
-        "Расскажи что происходит — коротко или подробно, как тебе удобно."
-    )
+    # User is typing now: have the system prompt cached before the first question
+    prewarm_prompt_cache(user)
+
     await state.set_state(ProblemSolvingStates.waiting_for_problem)
-    await callback.answer()
+    await gather_calls(
+        callback.message.answer(
+            "🎯 Опиши свою проблему своими словами.\n\n"
+            "Расскажи что происходит — коротко или подробно, как тебе удобно."
+        ),
+        callback.answer()
+    )
 
 
 @router.message(ProblemSolvingStates.waiting_for_problem)
 async def receive_problem(message: Message, state: FSMContext):
     """Start problem analysis (simplified - no pre-analysis)"""
+    started = time.perf_counter()
     problem_text = message.text
 
     # Create problem in DB and get user context
     async with AsyncSessionLocal() as session:
         user = await get_user_by_telegram_id(session, message.from_user.id)
-
-        # Get user context
-        age = calculate_age(user.birth_date) if user.birth_date else None
-
-        user_context = {
-            'gender': user.gender if user else None,
-            'age': age,
-            'occupation': user.occupation if user else None,
-            'work_format': user.work_format if user else None
-        }
-
-        problem = await create_problem(
-            session, user.id, problem_text,
-            problem_type=None,  # Claude will determine internally
-            methodology=None    # No fixed methodology
-        )
-
-        # Decrement problem credits
-        user.problems_remaining -= 1
-        remaining = user.problems_remaining
-        await session.commit()
+        user_context = _build_user_context(user)
+
+        # The first question only needs the problem text and the profile,
+        # so Claude starts on it while the problem is being stored
+        first_question = None
+        if CLAUDE_PIPELINE_FIRST_QUESTION:
+            first_question = asyncio.create_task(claude.generate_question(
+                problem_description=problem_text,
+                conversation_history=[],
+                step=1,
+                user_context=user_context
+            ))
+
+        try:
+            # Decrement problem credits (conditional UPDATE: a double tap can't go below zero)
+            remaining = await consume_problem_credit(session, user.id)
+            if remaining is not None:
+                problem = await create_problem(
+                    session, user.id, problem_text,
+                    problem_type=None,  # Claude will determine internally
+                    methodology=None,   # No fixed methodology
+                    commit=False
+                )
+
+                # One transaction with the credit: a paid problem is always resumable
+                await start_problem_session(session, user.id, problem.id)
+                await session.commit()
+                stats.record(PROBLEMS_STARTED)
+                events.track(PROBLEM_STARTED, message.from_user.id, problem_id=problem.id)
+                bind_contextvars(problem_id=problem.id)
+        except BaseException:
+            if first_question:
+                first_question.cancel()
+            raise
+
+    if remaining is None:
+        if first_question:
+            first_question.cancel()
+        await state.clear()
+        await _answer_no_credits(message)
+        return
 
     # Save to state (including user context for all future requests)
     await state.update_data(
         problem_description=problem_text,
-        conversation_history=[],
         current_step=1,
         problem_id=problem.id,
+        user_id=user.id,
         user_context=user_context  # Save user context once at the beginning
     )
 
     # Ask first question immediately
     await state.set_state(ProblemSolvingStates.asking_questions)
-    await ask_next_question(message, state)
-
-
-async def ask_next_question(message: Message, state: FSMContext):
-    """Generate and send next question with status message editing"""
+    await ask_next_question(message, state, started=started, pending_question=first_question)
+
+
+async def ask_next_question(
+    message: Message,
+    state: FSMContext,
+    started: Optional[float] = None,
+    pending_question: Optional[asyncio.Task] = None
+):
+    """
+    Generate and send next question with status message editing.
+
+    started: perf_counter() when the user's message arrived (time-to-question metric).
+    pending_question: already running generate_question() task for this step.
+    """
+    if started is None:
+        started = time.perf_counter()
     data = await state.get_data()
     user_context = data.get('user_context')  # Get user context from state
 
-    # Show typing indicator while generating question
-    bot = message.bot
-
-    # Send status message that will be edited
-    status_msg = await message.answer("⏳ Формулирую вопрос...")
-
-    # Send initial typing indicator immediately
-    await bot.send_chat_action(chat_id=message.chat.id, action="typing")
-
-    # Keep typing indicator active during Claude request
-    async with ChatActionSender(
-        bot=bot,
-        chat_id=message.chat.id,
-        action="typing",
-        initial_sleep=0.5,
-        interval=3.0
-    ):
-        question = await claude.generate_question(
+    generation = pending_question
+    if generation is None:
+        generation = claude.generate_question(
             problem_description=data['problem_description'],
-            conversation_history=data['conversation_history'],
+            conversation_history=await _load_conversation(data.get('problem_id')),
             step=data['current_step'],
             user_context=user_context
         )
-
-    # Edit status message to show the question
-    await status_msg.edit_text(question)
-
-    # Add to history
-    history = data['conversation_history']
-    history.append({"role": "assistant", "content": question})
-    await state.update_data(conversation_history=history)
+    async with inflight.generation(_snapshot(message, data, "questioning")):
+        status_msg, question = await _generate_with_status(message, "⏳ Формулирую вопрос...", generation)
+
+        # Stored before it is shown, so the answer is always appended after it
+        await _checkpoint(data.get('problem_id'), turns=[{"role": "assistant", "content": question}])
+
+        # Edit status message to show the question
+        await status_msg.edit_text(question)
+    TIME_TO_QUESTION.observe(
+        time.perf_counter() - started,
+        step=str(data['current_step']),
+        mode="pipelined" if pending_question is not None else "sequential"
+    )
 
 
 @router.message(ProblemSolvingStates.asking_questions)
 async def receive_answer(message: Message, state: FSMContext):
     """Process user's answer"""
+    started = time.perf_counter()
     data = await state.get_data()
 
     # Add answer to history
-    history = data['conversation_history']
-    history.append({"role": "user", "content": message.text})
-
     step = data['current_step'] + 1
-    await state.update_data(
-        conversation_history=history,
-        current_step=step
+    await state.update_data(current_step=step)
+    events.track(QUESTION_ANSWERED, message.from_user.id, problem_id=data.get('problem_id'), step=step - 1)
+    await _checkpoint(
+        data.get('problem_id'),
+        turns=[{"role": "user", "content": message.text}],
+        current_step=step,
+        state="solution" if step > 4 else None
     )
 
     # Check if done
     if step > 4:
         await generate_final_solution(message, state)
     else:
-        await ask_next_question(message, state)
+        await ask_next_question(message, state, started=started)
 
 
 async def generate_final_solution(message: Message, state: FSMContext):
@@ -167,35 +293,45 @@ async def generate_final_solution(message: Message, state: FSMContext):
     data = await state.get_data()
     await state.set_state(ProblemSolvingStates.generating_solution)
 
-    bot = message.bot
     user_context = data.get('user_context')
 
-    # Show status message
-    status_msg = await message.answer("⏳ Анализирую всю информацию и готовлю решение...")
-
-    # Keep typing indicator active
-    await bot.send_chat_action(chat_id=message.chat.id, action="typing")
-
-    # Generate solution
-    solution_text = await claude.generate_solution(
-        problem_description=data['problem_description'],
-        conversation_history=data['conversation_history'],
-        user_context=user_context
-    )
-
-    # Save to DB
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Problem).where(Problem.id == data['problem_id'])
+    # Insights from similar problems of other users (local index, no API call)
+    similar_patterns = similar_patterns_hint(data['problem_description'], data.get('user_id'))
+
+    # Generation and saving together: an unsaved solution is resumable after restart
+    async with inflight.generation(_snapshot(message, data, "solution")):
+        # Generate solution
+        status_msg, solution_text = await _generate_with_status(
+            message,
+            "⏳ Анализирую всю информацию и готовлю решение...",
+            claude.generate_solution(
+                problem_description=data['problem_description'],
+                conversation_history=await _load_conversation(data.get('problem_id')),
+                user_context=user_context,
+                similar_patterns=similar_patterns
+            )
         )
-        problem = result.scalar_one_or_none()
 
-        if problem:
-            problem.root_cause = solution_text[:500]
-            problem.action_plan = solution_text
-            problem.status = 'solved'
-            problem.solved_at = datetime.utcnow()
-            await session.commit()
+        # Save to DB
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(Problem).where(Problem.id == data['problem_id'])
+            )
+            problem = result.scalar_one_or_none()
+
+            if problem:
+                # Parse once here so history never re-processes the full text
+                sections = parse_solution(solution_text)
+                problem.root_cause = sections.core
+                problem.solution_data = encode_sections(sections, compress=SOLUTION_COMPRESSION)
+                problem.preview = build_preview(problem.title, sections)
+                problem.status = 'solved'
+                problem.solved_at = datetime.utcnow()
+                await index_problem(session, problem, solution_text)
+                await checkpoint_problem_session(session, problem.id, state="solved")
+                await session.commit()
+                stats.record(PROBLEMS_SOLVED)
+                remember_solution(problem.id, problem.user_id, problem.title, problem.root_cause)
 
     # Prepare discussion option
     await state.update_data(discussion_questions_used=0)
@@ -204,13 +340,13 @@ async def generate_final_solution(message: Message, state: FSMContext):
     builder.button(text="💬 Продолжить обсуждение", callback_data="start_discussion")
     builder.adjust(1)
 
-    # Delete status message and send solution
-    try:
-        await status_msg.delete()
-    except Exception:
-        pass
+    # Status message cleanup must not delay the solution
+    supervisor.spawn(_delete_quietly(status_msg), name="delete_status_message")
 
-    await message.answer(solution_text, parse_mode="Markdown", reply_markup=builder.as_markup())
+    # Solution is already saved; formatting problems must not lose it
+    await answer_formatted(message, solution_text, reply_markup=builder.as_markup())
+    # message may be the bot's own (resume button): the private chat id is the user
+    events.track(SOLUTION_DELIVERED, message.chat.id, problem_id=data.get('problem_id'))
 
 
 # Discussion system handlers
@@ -250,13 +386,19 @@ async def start_discussion(callback: CallbackQuery, state: FSMContext):
             await callback.answer()
             return
 
+        await checkpoint_problem_session(session, data.get('problem_id'), state="discussion")
+        await session.commit()
+        events.track(DISCUSSION_STARTED, callback.from_user.id, problem_id=data.get('problem_id'))
+
         await state.set_state(ProblemSolvingStates.discussing_solution)
-        await callback.message.answer(
-            f"💬 **Обсуждение решения**\n\n"
-            f"Вопросов осталось: {remaining}/{total_available}\n\n"
-            f"Задай любой вопрос по решению проблемы."
+        await gather_calls(
+            callback.message.answer(
+                f"💬 **Обсуждение решения**\n\n"
+                f"Вопросов осталось: {remaining}/{total_available}\n\n"
+                f"Задай любой вопрос по решению проблемы."
+            ),
+            callback.answer()
         )
-        await callback.answer()
 
 
 @router.message(ProblemSolvingStates.discussing_solution)
@@ -265,87 +407,153 @@ async def handle_discussion_question(message: Message, state: FSMContext):
     data = await state.get_data()
     user_context = data.get('user_context')  # Get user context from state (saved at problem start)
 
+    # Short session: no connection or transaction is held while Claude generates
     async with AsyncSessionLocal() as session:
         user = await get_user_by_telegram_id(session, message.from_user.id)
+        conversation_history = await get_conversation(session, data['problem_id']) if data.get('problem_id') else []
+
+    # Determine limits
+    base_limits = {
+        'starter': STARTER_DISCUSSION_LIMIT,
+        'medium': MEDIUM_DISCUSSION_LIMIT,
+        'large': LARGE_DISCUSSION_LIMIT
+    }
+    base_limit = base_limits.get(user.last_purchased_package, FREE_DISCUSSION_QUESTIONS)
+
+    questions_used = data.get('discussion_questions_used', 0)
+    total_available = base_limit + user.discussion_credits
+    remaining = total_available - questions_used
+    paid = questions_used + 1 > base_limit
+
+    if paid and remaining > 0:
+        # Reserve the purchased credit before generating: a concurrent double tap finds none left
+        async with AsyncSessionLocal() as session:
+            if await consume_discussion_credit(session, user.id) is None:
+                remaining = 0
+            await session.commit()
 
-        # Determine limits
-        base_limits = {
-            'starter': STARTER_DISCUSSION_LIMIT,
-            'medium': MEDIUM_DISCUSSION_LIMIT,
-            'large': LARGE_DISCUSSION_LIMIT
-        }
-        base_limit = base_limits.get(user.last_purchased_package, FREE_DISCUSSION_QUESTIONS)
-
-        questions_used = data.get('discussion_questions_used', 0)
-        total_available = base_limit + user.discussion_credits
-        remaining = total_available - questions_used
+    if remaining <= 0:
+        builder = InlineKeyboardBuilder()
+        builder.button(text="💬 Купить вопросы", callback_data="buy_discussions")
+        builder.adjust(1)
 
-        if remaining <= 0:
-            builder = InlineKeyboardBuilder()
-            builder.button(text="💬 Купить вопросы", callback_data="buy_discussions")
-            builder.adjust(1)
+        await message.answer(
+            "❌ Лимит вопросов исчерпан!",
+            reply_markup=builder.as_markup()
+        )
+        return
 
-            await message.answer(
-                "❌ Лимит вопросов исчерпан!",
-                reply_markup=builder.as_markup()
+    # Generate answer using Claude with typing indicator
+    user_question = message.text
+    try:
+        async with inflight.generation(_snapshot(message, data, "discussion")):
+            status_msg, answer = await _generate_with_status(
+                message,
+                "⏳ Обдумываю ответ...",
+                claude.generate_discussion_answer(
+                    problem_description=data.get('problem_description', ''),
+                    conversation_history=conversation_history,
+                    user_question=user_question,
+                    user_context=user_context
+                )
             )
-            return
+    except BaseException:
+        if paid:
+            # No answer was delivered: give the reserved credit back
+            async with AsyncSessionLocal() as session:
+                await add_user_credits(session, user.id, discussions=1)
+                await session.commit()
+        raise
+
+    async with conversation_lock(data.get('problem_id')), AsyncSessionLocal() as session:
+        # Add question and answer to history
+        await checkpoint_problem_session(session, data.get('problem_id'), turns=[
+            {"role": "user", "content": user_question},
+            {"role": "assistant", "content": answer}
+        ])
+        await session.commit()
 
-        # Generate answer using Claude with typing indicator
-        conversation_history = data.get('conversation_history', [])
-        user_question = message.text
+    questions_used += 1
+    await state.update_data(discussion_questions_used=questions_used)
+    events.track(
+        DISCUSSION_MESSAGE, message.from_user.id,
+        problem_id=data.get('problem_id'), paid=paid
+    )
 
-        bot = message.bot
+    remaining = total_available - questions_used
 
-        # Send status message that will be edited
-        status_msg = await message.answer("⏳ Обдумываю ответ...")
+    # Edit status message to show the answer
+    await edit_formatted(status_msg, f"💡 {answer}\n\n📊 Вопросов осталось: {remaining}/{total_available}")
 
-        # Send initial typing indicator immediately
-        await bot.send_chat_action(chat_id=message.chat.id, action="typing")
+    if remaining == 0:
+        builder = InlineKeyboardBuilder()
+        builder.button(text="💬 Купить вопросы", callback_data="buy_discussions")
+        builder.adjust(1)
 
-        # Keep typing indicator active during Claude request
-        async with ChatActionSender(
-            bot=bot,
-            chat_id=message.chat.id,
-            action="typing",
-            initial_sleep=0.5,
-            interval=3.0
-        ):
-            answer = await claude.generate_discussion_answer(
-                problem_description=data.get('problem_description', ''),
-                conversation_history=conversation_history,
-                user_question=user_question,
-                user_context=user_context
-            )
+        await message.answer(
+            "✅ Вопросы закончились!",
+            reply_markup=builder.as_markup()
+        )
 
-        # Add question and answer to history
-        conversation_history.append({"role": "user", "content": user_question})
-        conversation_history.append({"role": "assistant", "content": answer})
-
-        # Increment counter and deduct from appropriate pool
-        questions_used += 1
-        if questions_used > base_limit:
-            # Deduct from purchased credits
-            credits_used_from_purchased = questions_used - base_limit
-            user.discussion_credits = max(0, user.discussion_credits - 1)
-            await session.commit()
 
-        await state.update_data(
-            discussion_questions_used=questions_used,
-            conversation_history=conversation_history
-        )
+# Resume from checkpoints (after a restart, a crash or from /start)
+def resume_keyboard(session_id: int):
+    """Inline button that continues a checkpointed problem"""
+    builder = InlineKeyboardBuilder()
+    builder.button(text="▶️ Продолжить", callback_data=f"resume_problem_{session_id}")
+    return builder.as_markup()
 
-        remaining = total_available - questions_used
 
-        # Edit status message to show the answer
-        await status_msg.edit_text(f"💡 {answer}\n\n📊 Вопросов осталось: {remaining}/{total_available}")
+@router.callback_query(F.data.startswith("resume_problem_"))
+async def resume_problem(callback: CallbackQuery, state: FSMContext):
+    """Continue a problem from its last checkpoint"""
+    session_id = int(callback.data.split("_")[2])
 
-        if remaining == 0:
-            builder = InlineKeyboardBuilder()
-            builder.button(text="💬 Купить вопросы", callback_data="buy_discussions")
-            builder.adjust(1)
+    async with AsyncSessionLocal() as session:
+        user = await get_user_by_telegram_id(session, callback.from_user.id)
+        problem_session = await get_problem_session(session, session_id)
+        if (
+            not user or not problem_session or problem_session.user_id != user.id
+            or problem_session.state in ("solved", "abandoned")
+        ):
+            await callback.answer("❌ Эта сессия уже завершена", show_alert=True)
+            return
 
-            await message.answer(
-                "✅ Вопросы закончились!",
-                reply_markup=builder.as_markup()
-            )
\ No newline at end of file
+        result = await session.execute(
+            select(Problem).where(Problem.id == problem_session.problem_id)
+        )
+        problem = result.scalar_one_or_none()
+        if not problem:
+            await callback.answer("❌ Проблема не найдена", show_alert=True)
+            return
+
+        bind_contextvars(problem_id=problem.id)
+        history = await get_conversation(session, problem.id)
+        kind = problem_session.state
+        step = problem_session.current_step
+        user_context = _build_user_context(user)
+
+    # The problem was paid for when it was created: resuming never charges again
+    await state.set_data({
+        'problem_description': problem.title,
+        'current_step': step,
+        'problem_id': problem.id,
+        'user_id': user.id,
+        'user_context': user_context
+    })
+    await callback.answer()
+
+    if kind == "discussion":
+        # Questioning leaves 4 questions and 4 answers, every discussion question adds a pair
+        await state.update_data(discussion_questions_used=max(0, (len(history) - 8) // 2))
+        await state.set_state(ProblemSolvingStates.discussing_solution)
+        await callback.message.answer("💬 Продолжаем обсуждение. Повтори, пожалуйста, свой вопрос.")
+    elif step > 4:
+        await generate_final_solution(callback.message, state)
+    elif history and history[-1]['role'] == "assistant":
+        # The question of this step was already generated: show it again instead of paying for a new one
+        await state.set_state(ProblemSolvingStates.asking_questions)
+        await callback.message.answer(history[-1]['content'])
+    else:
+        await state.set_state(ProblemSolvingStates.asking_questions)
+        await ask_next_question(callback.message, state)
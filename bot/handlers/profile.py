@@ -127,37 +127,18 @@ async def show_payment_options(callback: CallbackQuery):
 @router.callback_query(F.data == "show_history")
 async def show_history_from_profile(callback: CallbackQuery):
     """Show user's problem history"""
-    async with AsyncSessionLocal() as session:
-        from bot.database.crud import get_user_by_telegram_id, get_user_problems
-
-        user = await get_user_by_telegram_id(session, callback.from_user.id)
-        if not user:
-            await callback.answer("❌ Пользователь не найден", show_alert=True)
-            return
-
-        problems = await get_user_problems(session, user.id, limit=10)
+    from bot.handlers.history import build_history_page, ORIGIN_PROFILE
 
-        if not problems:
-            await callback.message.edit_text("📭 У тебя пока нет решённых задач")
-            await callback.answer()
-            return
+    page = await build_history_page(callback.from_user.id, origin=ORIGIN_PROFILE)
 
-        builder = InlineKeyboardBuilder()
-        for p in problems:
-            status_emoji = "✅" if p.status == "solved" else "⏳"
-            title = p.title[:40] + "..." if len(p.title) > 40 else p.title
-            builder.button(
-                text=f"{status_emoji} {title}",
-                callback_data=f"view_problem_{p.id}"
-            )
-        builder.button(text="◀️ Назад в профиль", callback_data="back_to_profile")
-        builder.adjust(1)
-
-        await callback.message.edit_text(
-            "📖 История решений:",
-            reply_markup=builder.as_markup()
-        )
+    if not page:
+        await callback.message.edit_text("📭 У тебя пока нет решённых задач")
         await callback.answer()
+        return
+
+    text, markup = page
+    await callback.message.edit_text(text, reply_markup=markup)
+    await callback.answer()
 
 
 @router.callback_query(F.data == "copy_referral_link")
@@ -230,7 +211,7 @@ async def save_birth_date_edit(message: Message, state: FSMContext):
             if user:
                 user.birth_date = birth_date
                 await session.commit()
-                logger.info(f"User {user.telegram_id} updated birth_date: {birth_date}")
+                logger.info("profile_updated", field="birth_date")
 
         await state.clear()
         await message.answer(
@@ -277,7 +258,7 @@ async def save_occupation_edit(message: Message, state: FSMContext):
         if user:
             user.occupation = occupation
             await session.commit()
-            logger.info(f"User {user.telegram_id} updated occupation: {occupation}")
+            logger.info("profile_updated", field="occupation")
 
     await state.clear()
     await message.answer(
@@ -327,7 +308,7 @@ async def save_work_format_edit(callback: CallbackQuery, state: FSMContext):
         if user:
             user.work_format = work_format
             await session.commit()
-            logger.info(f"User {user.telegram_id} updated work_format: {work_format}")
+            logger.info("profile_updated", field="work_format", work_format=work_format)
 
     await state.clear()
 
@@ -374,7 +355,7 @@ async def save_gender_edit(callback: CallbackQuery, state: FSMContext):
         if user:
             user.gender = gender
             await session.commit()
-            logger.info(f"User {user.telegram_id} updated gender: {gender}")
+            logger.info("profile_updated", field="gender", gender=gender)
 
     await state.clear()
 
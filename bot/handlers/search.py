@@ -0,0 +1,57 @@
+"""Search over user's past problems (/search)"""
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+import structlog
+
+from bot.database.engine import AsyncSessionLocal
+from bot.database.crud import get_user_by_telegram_id
+from bot.services.search import search_problems
+
+router = Router()
+logger = structlog.get_logger(__name__)
+
+SEARCH_RESULTS_LIMIT = 10
+
+
+@router.message(Command("search"))
+async def cmd_search(message: Message, command: CommandObject):
+    """Handle /search <words>"""
+    query = (command.args or "").strip()
+    if not query:
+        await message.answer(
+            "🔎 Поиск по твоим проблемам и решениям\n\n"
+            "Напиши, что ищешь, прямо после команды:\n"
+            "/search прокрастинация утром",
+            parse_mode=None
+        )
+        return
+
+    async with AsyncSessionLocal() as session:
+        user = await get_user_by_telegram_id(session, message.from_user.id)
+        if not user:
+            await message.answer("❌ Пользователь не найден. Используй /start")
+            return
+        results = await search_problems(session, user.id, query, limit=SEARCH_RESULTS_LIMIT)
+
+    logger.info("search_performed", user_id=user.id, results=len(results))
+
+    if not results:
+        await message.answer(
+            f"🔎 По запросу «{query}» ничего не найдено.\n\n"
+            "Попробуй другие слова или начало слова: «прокраст» найдёт «прокрастинация».",
+            parse_mode=None
+        )
+        return
+
+    lines = [f"🔎 Найдено: {len(results)}\n"]
+    builder = InlineKeyboardBuilder()
+    for index, result in enumerate(results, start=1):
+        title = result.title[:40] + "..." if len(result.title) > 40 else result.title
+        lines.append(f"{index}. {title}\n{result.snippet}\n")
+        builder.button(text=f"{index}. {title}", callback_data=f"view_problem_{result.problem_id}")
+    builder.adjust(1)
+
+    # Snippets are user/Claude text: send without parse mode
+    await message.answer("\n".join(lines), reply_markup=builder.as_markup(), parse_mode=None)
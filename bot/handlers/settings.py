@@ -66,7 +66,7 @@ async def handle_set_gender(callback: CallbackQuery):
         if user:
             user.gender = new_gender
             await session.commit()
-            logger.info(f"User {user.telegram_id} changed gender to: {new_gender}")
+            logger.info("gender_changed", gender=new_gender)
 
     gender_text = "мужской" if new_gender == "male" else "женский"
     await callback.message.edit_text(
@@ -4,9 +4,12 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from bot.database.engine import AsyncSessionLocal
-from bot.database.crud import get_or_create_user, calculate_age
+from bot.database.crud import get_or_create_user, calculate_age, get_resumable_session
 from bot.keyboards import get_main_menu_keyboard
+from bot.services.events import ONBOARDING_COMPLETED, ONBOARDING_STEP, START, events
 from bot.states import OnboardingStates, ProblemSolvingStates
+from bot.services.task_supervisor import supervisor
+from bot.utils.tasks import gather_calls
 import structlog
 import asyncio
 from datetime import datetime, timedelta
@@ -45,6 +48,19 @@ def validate_birth_date(text: str) -> Tuple[bool, Union[datetime, str]]:
 
 
 
+async def _notify_referrer(bot, referrer_telegram_id: int) -> None:
+    """Tell the referrer about the bonus (runs in background, never blocks the new user)"""
+    try:
+        await bot.send_message(
+            referrer_telegram_id,
+            "🎉 <b>Твой друг присоединился!</b>\n\n"
+            "Ты получил +1 бонусное решение за приглашение.",
+            parse_mode="HTML"
+        )
+    except Exception as e:
+        logger.warning("referrer_notification_failed", referrer_telegram_id=referrer_telegram_id, error=str(e))
+
+
 def _get_solutions_word(count: int) -> str:
     """Get correct Russian word form for 'решение' based on count"""
     if count % 10 == 1 and count % 100 != 11:
@@ -65,14 +81,13 @@ async def cmd_start(message: Message, state: FSMContext):
     if user_id in _last_start_calls:
         time_since_last = (now - _last_start_calls[user_id]).total_seconds()
         if time_since_last < _THROTTLE_SECONDS:
-            logger.info(f"Ignoring duplicate /start from user {user_id} (called {time_since_last:.2f}s ago)")
+            logger.info("duplicate_start_ignored", seconds_since_last=round(time_since_last, 2))
             return
 
     # Update last call time
     _last_start_calls[user_id] = now
 
-    logger.info(f"cmd_start called for user {message.from_user.id} (@{message.from_user.username})")
-    logger.info(f"Message text: '{message.text}', Message ID: {message.message_id}")
+    logger.info("start_command", message_id=message.message_id)
 
     # Parse referral code from deep link (e.g., /start ref_ABC12345)
     referral_code = None
@@ -80,7 +95,7 @@ async def cmd_start(message: Message, state: FSMContext):
         param = message.text.split()[1]
         if param.startswith("ref_"):
             referral_code = param[4:]  # Remove "ref_" prefix
-            logger.info(f"Detected referral code: {referral_code}")
+            logger.info("referral_code_detected", referral_code=referral_code)
 
     # Get or create user in database
     async with AsyncSessionLocal() as session:
@@ -97,6 +112,7 @@ async def cmd_start(message: Message, state: FSMContext):
             username=message.from_user.username,
             first_name=message.from_user.first_name
         )
+        events.track(START, user.telegram_id, new=is_new_user, referral=referral_code is not None)
 
         # Check if user has gender set
         if not user.gender:
@@ -134,7 +150,7 @@ async def cmd_start(message: Message, state: FSMContext):
                 reply_markup=builder.as_markup(),
                 parse_mode="HTML"
             )
-            logger.info(f"Requesting gender from new user {message.from_user.id}")
+            logger.info("onboarding_gender_requested")
             return
 
         # Process referral if user is new and code is valid
@@ -147,22 +163,17 @@ async def cmd_start(message: Message, state: FSMContext):
                     await create_referral(session, referrer.id, user.id)
                     referral_bonus_message = "\n\n✨ <b>Бонус!</b> Ты получил +1 решение от друга!\n"
 
-                    # Notify referrer
-                    try:
-                        await message.bot.send_message(
-                            referrer.telegram_id,
-                            "🎉 <b>Твой друг присоединился!</b>\n\n"
-                            "Ты получил +1 бонусное решение за приглашение.",
-                            parse_mode="HTML"
-                        )
-                    except Exception as e:
-                        logger.warning(f"Failed to notify referrer {referrer.telegram_id}: {e}")
-
-                    logger.info(f"Referral processed: {referrer.id} -> {user.id}")
+                    # Notify referrer without delaying the welcome message
+                    supervisor.spawn(_notify_referrer(message.bot, referrer.telegram_id), name="notify_referrer")
+
+                    logger.info("referral_processed", referrer_id=referrer.id, referred_id=user.id)
                 else:
-                    logger.info(f"Invalid referral: code={referral_code}, referrer={referrer}")
+                    logger.info("referral_invalid", referral_code=referral_code, referrer_found=referrer is not None)
             except Exception as e:
-                logger.error(f"Error processing referral: {e}")
+                logger.error("referral_processing_failed", error=str(e))
+
+        # Problem left unfinished (crash, restart or the user just left)
+        resumable = await get_resumable_session(session, user.id)
 
     # Welcome message
     welcome_text = f"""👋 Привет, {message.from_user.first_name}!
@@ -181,13 +192,22 @@ async def cmd_start(message: Message, state: FSMContext):
 
 Используй меню внизу для навигации! 👇"""
 
-    logger.info(f"Sending welcome message to user {message.from_user.id}")
+    logger.info("welcome_message_sending")
     await message.answer(
         text=welcome_text,
         reply_markup=get_main_menu_keyboard(),
         parse_mode="HTML"
     )
-    logger.info(f"Welcome message sent to user {message.from_user.id}")
+    logger.info("welcome_message_sent")
+
+    if resumable:
+        from bot.handlers.problem_flow import resume_keyboard
+        step_text = "решение" if resumable.state == "solution" else f"вопрос {resumable.current_step} из 4"
+        await message.answer(
+            f"⏸ У тебя есть незавершённый разбор проблемы (остановились на: {step_text}).\n\n"
+            "Продолжим с того же места? Повторно решение не списывается.",
+            reply_markup=resume_keyboard(resumable.id)
+        )
 
 @router.message(Command("help"))
 async def cmd_help(message: Message):
@@ -222,6 +242,8 @@ async def cmd_help(message: Message):
 • Отвечай честно — это анонимно и конфиденциально
 • Не спеши, вдумчиво отвечай на вопросы
 
+🔎 Найти старое решение: /search и пара слов из проблемы
+
 🎁 **У тебя 1 бесплатное решение + 3 вопроса для обсуждения** — попробуй прямо сейчас!"""
 
     await message.answer(help_text, reply_markup=get_main_menu_keyboard())
@@ -259,6 +281,8 @@ async def callback_help(callback: CallbackQuery):
 • Отвечай честно — это анонимно и конфиденциально
 • Не спеши, вдумчиво отвечай на вопросы
 
+🔎 Найти старое решение: /search и пара слов из проблемы
+
 🎁 **У тебя 1 бесплатное решение + 3 вопроса для обсуждения** — попробуй прямо сейчас!"""
 
     await callback.message.answer(help_text, reply_markup=get_main_menu_keyboard())
@@ -292,6 +316,10 @@ async def menu_new_problem(message: Message, state: FSMContext):
             )
             return
 
+    # User is typing now: have the system prompt cached before the first question
+    from bot.handlers.problem_flow import prewarm_prompt_cache
+    prewarm_prompt_cache(user)
+
     await message.answer(
         "🎯 Опиши свою проблему своими словами:\n\n"
         "📝 Укажи:\n"
@@ -319,7 +347,8 @@ async def handle_gender_male(callback: CallbackQuery, state: FSMContext):
         if user:
             user.gender = 'male'
             await session.commit()
-            logger.info(f"User {user.telegram_id} selected gender: male")
+            logger.info("onboarding_gender_selected", gender="male")
+            events.track(ONBOARDING_STEP, user.telegram_id, step="gender")
 
     # Move to birth date input
     await state.set_state(OnboardingStates.entering_birth_date)
@@ -345,7 +374,8 @@ async def handle_gender_female(callback: CallbackQuery, state: FSMContext):
         if user:
             user.gender = 'female'
             await session.commit()
-            logger.info(f"User {user.telegram_id} selected gender: female")
+            logger.info("onboarding_gender_selected", gender="female")
+            events.track(ONBOARDING_STEP, user.telegram_id, step="gender")
 
     # Move to birth date input
     await state.set_state(OnboardingStates.entering_birth_date)
@@ -381,7 +411,8 @@ async def handle_birth_date_input(message: Message, state: FSMContext):
         if user:
             user.birth_date = birth_date
             await session.commit()
-            logger.info(f"User {user.telegram_id} entered birth date: {birth_date}")
+            logger.info("onboarding_birth_date_entered")
+            events.track(ONBOARDING_STEP, user.telegram_id, step="birth_date")
 
     # Move to occupation input
     await state.set_state(OnboardingStates.entering_occupation)
@@ -421,7 +452,8 @@ async def handle_occupation_input(message: Message, state: FSMContext):
         if user:
             user.occupation = occupation
             await session.commit()
-            logger.info(f"User {user.telegram_id} entered occupation: {occupation}")
+            logger.info("onboarding_occupation_entered")
+            events.track(ONBOARDING_STEP, user.telegram_id, step="occupation")
 
     # Move to work format selection
     await state.set_state(OnboardingStates.choosing_work_format)
@@ -454,12 +486,14 @@ async def handle_work_format_selection(callback: CallbackQuery, state: FSMContex
         if user:
             user.work_format = work_format
             await session.commit()
-            logger.info(f"User {user.telegram_id} selected work format: {work_format}")
+            logger.info("onboarding_work_format_selected", work_format=work_format)
 
         # Process referral if stored in state
         data = await state.get_data()
         referral_code = data.get('referral_code')
         referral_bonus_message = ""
+        if user:
+            events.track(ONBOARDING_COMPLETED, user.telegram_id, work_format=work_format, referral=referral_code is not None)
 
         if referral_code and user:
             try:
@@ -470,20 +504,12 @@ async def handle_work_format_selection(callback: CallbackQuery, state: FSMContex
                     gender_word = "получил" if user.gender == "male" else "получила"
                     referral_bonus_message = f"\n\n✨ <b>Бонус!</b> Ты {gender_word} +1 решение от друга!\n"
 
-                    # Notify referrer
-                    try:
-                        await callback.bot.send_message(
-                            referrer.telegram_id,
-                            "🎉 <b>Твой друг присоединился!</b>\n\n"
-                            "Ты получил +1 бонусное решение за приглашение.",
-                            parse_mode="HTML"
-                        )
-                    except Exception as e:
-                        logger.warning(f"Failed to notify referrer {referrer.telegram_id}: {e}")
-
-                    logger.info(f"Referral processed: {referrer.id} -> {user.id}")
+                    # Notify referrer without delaying the welcome message
+                    supervisor.spawn(_notify_referrer(callback.bot, referrer.telegram_id), name="notify_referrer")
+
+                    logger.info("referral_processed", referrer_id=referrer.id, referred_id=user.id)
             except Exception as e:
-                logger.error(f"Error processing referral: {e}")
+                logger.error("referral_processing_failed", error=str(e))
 
     # Clear onboarding state
     await state.clear()
@@ -505,12 +531,15 @@ async def handle_work_format_selection(callback: CallbackQuery, state: FSMContex
 
 Используй меню внизу для навигации! 👇"""
 
-    await callback.message.edit_text(
-        text=welcome_text,
-        parse_mode="HTML"
+    # Independent Bot API calls: edited welcome, keyboard message, callback ack
+    await gather_calls(
+        callback.message.edit_text(
+            text=welcome_text,
+            parse_mode="HTML"
+        ),
+        callback.message.answer(
+            "👇",
+            reply_markup=get_main_menu_keyboard()
+        ),
+        callback.answer()
     )
-    await callback.message.answer(
-        "👇",
-        reply_markup=get_main_menu_keyboard()
-    )
-    await callback.answer()
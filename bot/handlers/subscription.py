@@ -159,7 +159,7 @@ async def handle_cancel_subscription_confirmed(callback: CallbackQuery):
             await callback.message.edit_text(text, parse_mode="HTML")
             await callback.answer("Подписка отменена")
 
-            logger.info(f"Subscription cancelled for user {telegram_id}")
+            logger.info("subscription_cancelled", telegram_id=telegram_id)
 
     except Exception as e:
         logger.error("cancel_subscription_error", error=str(e), user_id=telegram_id)
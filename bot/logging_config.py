@@ -5,21 +5,194 @@ Features:
 - JSON logging in production, pretty console in development
 - Automatic log rotation (10MB per file, 5 backups)
 - Separate logs: app.log (INFO+), error.log (ERROR+), debug.log (DEBUG, dev only)
-- Structured logging with user context via contextvars
+- Per-update context via contextvars: trace_id, update_id, user_id, handler,
+  problem_id and duration_ms (bot/middleware/logging_context.py)
 - SQLAlchemy query logging control per environment
+- Non-blocking: the event loop only puts records on a bounded queue; a
+  writer thread renders them (orjson when installed) and writes the files
+- Sampling of repeated DEBUG records (LOG_DEBUG_SAMPLE_RATE)
 """
 
+import atexit
+import json
+import queue
 import sys
+import time
 import logging.config
+import logging.handlers
+from contextvars import ContextVar
 from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
 import structlog
-from bot.config import ENVIRONMENT, LOG_LEVEL
+from bot.config import DB_ECHO, ENVIRONMENT, LOG_DEBUG_SAMPLE_RATE, LOG_LEVEL, LOG_QUEUE_SIZE
+from bot.services.metrics import registry
 
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is used instead
+    orjson = None
 
-def setup_logging():
+LOG_RECORDS_DROPPED = registry.counter(
+    "bot_log_records_dropped_total",
+    "Log records dropped because the log queue was full",
+    labelnames=("level",),
+)
+
+# Warnings and errors wait this long for room in a full queue, the rest is dropped at once
+_BLOCKING_LEVEL = logging.WARNING
+_BLOCK_TIMEOUT = 0.05
+_SAMPLER_MAX_KEYS = 10_000
+
+_writer: Optional[logging.handlers.QueueListener] = None
+
+# perf_counter() when the current update arrived (UpdateContextMiddleware)
+update_started: ContextVar[Optional[float]] = ContextVar("update_started", default=None)
+
+
+def add_update_duration(logger, method_name, event_dict):
+    """Processor: milliseconds since the current update arrived"""
+    started = update_started.get()
+    if started is not None:
+        event_dict["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return event_dict
+
+
+def _dumps(obj, **kwargs) -> str:
+    """JSONRenderer serializer: orjson, falling back to json for what it rejects"""
+    try:
+        return orjson.dumps(obj, default=kwargs.get("default"), option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    except TypeError:  # e.g. integers beyond 64 bits
+        return json.dumps(obj, **kwargs)
+
+
+class DebugSampler(logging.Filter):
+    """Keeps the first DEBUG record of each kind (logger + event), then one in round(1 / rate)"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self._every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._seen: Dict[Tuple[str, str], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self._every == 1:
+            return True
+        if not self._every:
+            return False
+        event = record.msg.get("event") if isinstance(record.msg, dict) else record.msg
+        key = (record.name, str(event))
+        if len(self._seen) >= _SAMPLER_MAX_KEYS:
+            self._seen.clear()
+        count = self._seen.get(key, 0)
+        self._seen[key] = count + 1
+        return count % self._every == 0
+
+
+class _ReusingFormatter(structlog.stdlib.ProcessorFormatter):
+    """
+    Renders a record once: RotatingFileHandler formats it again for its
+    size check, and app.log / error.log share the JSON formatter.
+    """
+
+    _last: Tuple[Optional[logging.LogRecord], str] = (None, "")
+
+    def format(self, record: logging.LogRecord) -> str:
+        last_record, text = self._last  # one tuple: safe if two threads log at once
+        if last_record is not record:
+            text = super().format(record)
+            self._last = (record, text)
+        return text
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Puts records on the writer queue together with the handlers they are meant for"""
+
+    def __init__(self, log_queue: queue.Queue, targets: Iterable[logging.Handler]):
+        super().__init__(log_queue)
+        self.targets = tuple(targets)
+        self.setLevel(min(handler.level for handler in self.targets))
+        self._dropped = 0  # not yet reported in the log itself
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Rendering (JSON, colors, tracebacks) is left to the writer thread;
+        # %-args are merged now because callers may mutate them afterwards
+        if not isinstance(record.msg, dict):
+            if record.args:
+                record.msg = record.getMessage()
+                record.args = None
+            # Foreign (aiogram, SQLAlchemy) record: the update context is only
+            # visible on this thread; ExtraAdder renders the attributes
+            record.__dict__.update(structlog.contextvars.get_contextvars())
+            add_update_duration(None, None, record.__dict__)
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if record.levelno >= _BLOCKING_LEVEL:
+                self.queue.put((self.targets, record), timeout=_BLOCK_TIMEOUT)
+            else:
+                self.queue.put_nowait((self.targets, record))
+        except queue.Full:
+            self._dropped += 1
+            LOG_RECORDS_DROPPED.inc(level=record.levelname)
+            return
+        if self._dropped:
+            self._report_dropped()
+
+    def _report_dropped(self) -> None:
+        report = logging.makeLogRecord({
+            "name": __name__,
+            "levelno": logging.WARNING,
+            "levelname": "WARNING",
+            "msg": f"{self._dropped} log records dropped: log queue was full",
+        })
+        try:
+            self.queue.put_nowait((self.targets, report))
+        except queue.Full:
+            return
+        self._dropped = 0
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    """Writer thread: formats and writes each record with its target handlers"""
+
+    def handle(self, item) -> None:
+        targets, record = item
+        for handler in targets:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def stop(self) -> None:
+        if self._thread is not None:  # atexit after an explicit stop
+            super().stop()
+
+    def enqueue_sentinel(self) -> None:
+        # Waits for room instead of failing on a full queue: the thread is draining it
+        self.queue.put(self._sentinel)
+
+
+def _start_writer(loggers: Iterable[logging.Logger], queue_size: int) -> _QueueListener:
+    """Replace the loggers' handlers with one queue served by a writer thread"""
+    log_queue = queue.Queue(maxsize=queue_size)
+    sampler = DebugSampler(LOG_DEBUG_SAMPLE_RATE)
+    for logger in loggers:
+        handler = _QueueHandler(log_queue, logger.handlers)
+        handler.addFilter(sampler)
+        logger.handlers = [handler]
+
+    listener = _QueueListener(log_queue)
+    listener.start()
+    # Written out on exit: records still queued when the bot stops
+    atexit.register(listener.stop)
+    return listener
+
+
+def setup_logging(queue_size: int = LOG_QUEUE_SIZE) -> Optional[logging.handlers.QueueListener]:
     """
     Configure production-ready logging system.
 
+    queue_size: capacity of the writer queue; 0 writes synchronously on
+    the caller's thread (no sampling). Returns the writer, if any.
+
     Dev mode:
         - Colored console output (human-readable)
         - Debug file with all logs
@@ -30,6 +203,24 @@ def setup_logging():
         - Rotating file handlers (max 50MB total)
         - Minimal SQLAlchemy logging
     """
+    global _writer
+    if _writer is not None:
+        # Reconfiguring: write out what the previous writer still holds
+        atexit.unregister(_writer.stop)
+        _writer.stop()
+        _writer = None
+
+    # Nothing renders caller, thread or process fields: skip collecting
+    # them for every record (logging HOWTO, "Optimization")
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    if orjson is not None:
+        json_renderer = structlog.processors.JSONRenderer(serializer=_dumps)
+    else:
+        json_renderer = structlog.processors.JSONRenderer()
 
     # Create logs directory
     log_dir = Path("logs")
@@ -42,6 +233,8 @@ def setup_logging():
 
     # Pre-chain processors for foreign (non-structlog) logs
     pre_chain = [
+        structlog.contextvars.merge_contextvars,
+        add_update_duration,
         structlog.stdlib.add_log_level,
         structlog.stdlib.ExtraAdder(),
         timestamper,
@@ -73,6 +266,10 @@ def setup_logging():
             "formatter": "json",
             "encoding": "utf-8",
         },
+        # Keeps SQLAlchemy from adding its own stdout handler for DB_ECHO
+        "null": {
+            "class": "logging.NullHandler",
+        },
     }
 
     # Add debug file handler only in development
@@ -91,15 +288,15 @@ def setup_logging():
 
         "formatters": {
             "json": {
-                "()": structlog.stdlib.ProcessorFormatter,
+                "()": _ReusingFormatter,
                 "processors": [
                     structlog.stdlib.ProcessorFormatter.remove_processors_meta,
-                    structlog.processors.JSONRenderer(),
+                    json_renderer,
                 ],
                 "foreign_pre_chain": pre_chain,
             },
             "console": {
-                "()": structlog.stdlib.ProcessorFormatter,
+                "()": _ReusingFormatter,
                 "processors": [
                     structlog.stdlib.ProcessorFormatter.remove_processors_meta,
                     structlog.dev.ConsoleRenderer(colors=True),
@@ -119,10 +316,15 @@ def setup_logging():
             },
             # SQLAlchemy logs (reduce noise in production)
             "sqlalchemy.engine": {
-                "handlers": ["error_file"] if not is_dev else ["console", "debug_file"],
+                "handlers": ["console", "debug_file"] if is_dev else ["console", "error_file"] if DB_ECHO else ["error_file"],
                 "level": "WARNING" if is_dev else "ERROR",
                 "propagate": False,
             },
+            # DB_ECHO statements go up to sqlalchemy.engine
+            "sqlalchemy.engine.Engine": {
+                "handlers": ["null"],
+                "propagate": True,
+            },
             # Aiogram logs
             "aiogram": {
                 "handlers": ["console", "app_file", "error_file"],
@@ -142,6 +344,8 @@ def setup_logging():
         processors=[
             # Merge thread-local context (user_id, session_id, etc.)
             structlog.contextvars.merge_contextvars,
+            # Time since the update arrived
+            add_update_duration,
             # Filter by log level early
             structlog.stdlib.filter_by_level,
             # Add log level name
@@ -167,3 +371,8 @@ def setup_logging():
         ),
         cache_logger_on_first_use=True,
     )
+
+    if queue_size:
+        loggers = [logging.getLogger(name) for name in ("bot", "sqlalchemy.engine", "aiogram")]
+        _writer = _start_writer(loggers + [logging.getLogger()], queue_size)
+    return _writer
@@ -1,64 +1,176 @@
 import asyncio
+from typing import List
+
 import structlog
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 
-from bot.config import BOT_TOKEN
-from bot.database.engine import init_db
-from bot.handlers import start, problem_flow, history, payment, referral, subscription, settings, profile
+from bot.config import (
+    BOT_TOKEN, METRICS_ENABLED, METRICS_HOST, METRICS_PORT, RETENTION_ENABLED, SHUTDOWN_DRAIN_TIMEOUT,
+    SIMILARITY_ENABLED
+)
+from bot.database.crud import get_interrupted_sessions, mark_session_interrupted
+from bot.database.engine import AsyncSessionLocal, init_db
+from bot.handlers import (
+    admin, start, problem_flow, history, payment, referral, subscription, settings, profile, search
+)
+from bot.middleware.activity import ActivityMiddleware
 from bot.middleware.errors import ErrorHandlingMiddleware
+from bot.middleware.inflight import InflightMiddleware
+from bot.middleware.logging_context import HandlerContextMiddleware, UpdateContextMiddleware
+from bot.middleware.metrics import HandlerTimingMiddleware
+from bot.services.events import events, start_events_flusher
+from bot.services.inflight import GenerationSnapshot, inflight
+from bot.services.metrics import start_metrics_server
+from bot.services.retention import start_retention_scheduler
+from bot.services.stats import handle_stats_request, start_stats_flusher, stats
+from bot.services.similarity import load_similarity_index, similarity_index
 from bot.services.subscription_renewal import start_renewal_scheduler
+from bot.services.task_supervisor import supervisor
 from bot.logging_config import setup_logging
 
 # Configure production-ready logging
 setup_logging()
 logger = structlog.get_logger(__name__)
 
-async def main():
-    """Main bot function"""
-    # Initialize database
-    logger.info("Initializing database...")
-    await init_db()
-
-    # Create bot and dispatcher
-    bot = Bot(
-        token=BOT_TOKEN,
-        default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN)
-    )
+def create_dispatcher() -> Dispatcher:
+    """Create dispatcher with all middlewares and routers registered"""
     dp = Dispatcher()
 
+    # Outermost: shutdown waits for every update handler it has seen
+    dp.update.outer_middleware(InflightMiddleware())
+    # Trace id, update/user ids and duration on every log line of the update
+    dp.update.outer_middleware(UpdateContextMiddleware())
+    dp.update.outer_middleware(ActivityMiddleware())
+
     # Register error handling middleware
     dp.update.middleware(ErrorHandlingMiddleware())
-    logger.info("Error handling middleware initialized")
+    logger.info("error_middleware_initialized")
+
+    # Register handler timing middleware (inner, so handler names are known)
+    timing_middleware = HandlerTimingMiddleware()
+    dp.message.middleware(timing_middleware)
+    dp.callback_query.middleware(timing_middleware)
+    dp.pre_checkout_query.middleware(timing_middleware)
+    handler_context = HandlerContextMiddleware()
+    dp.message.middleware(handler_context)
+    dp.callback_query.middleware(handler_context)
+    dp.pre_checkout_query.middleware(handler_context)
 
     # Register routers
+    dp.include_router(admin.router)
     dp.include_router(start.router)
     dp.include_router(profile.router)  # Profile must be before problem_flow to catch "👤 Профиль" button
+    dp.include_router(search.router)  # Before problem_flow so /search works in any state
     dp.include_router(problem_flow.router)
     dp.include_router(history.router)
     dp.include_router(payment.router)
     dp.include_router(referral.router)
     dp.include_router(subscription.router)
     dp.include_router(settings.router)
-    logger.info("All routers registered")
+    logger.info("routers_registered")
+
+    return dp
+
+
+async def persist_interrupted(snapshots: List[GenerationSnapshot]) -> None:
+    """Flag sessions of generations cut off by shutdown (their steps are already checkpointed)"""
+    problem_ids = {snapshot.problem_id for snapshot in snapshots if snapshot.problem_id is not None}
+    async with AsyncSessionLocal() as session:
+        for problem_id in problem_ids:
+            await mark_session_interrupted(session, problem_id)
+        await session.commit()
+    logger.warning("interrupted_generations_saved", count=len(problem_ids))
+
+
+async def notify_interrupted(bot: Bot) -> None:
+    """Offer users whose generation was cut off by a restart to continue"""
+    async with AsyncSessionLocal() as session:
+        interrupted = await get_interrupted_sessions(session)
+        for problem_session, telegram_id in interrupted:
+            try:
+                await bot.send_message(
+                    telegram_id,
+                    "🔄 Бот перезапускался, пока я готовил ответ.\n\n"
+                    "Прогресс сохранён — нажми, чтобы продолжить с того же места.",
+                    reply_markup=problem_flow.resume_keyboard(problem_session.id)
+                )
+            except Exception as e:
+                logger.warning("resume_notification_failed", telegram_id=telegram_id, error=str(e))
+            problem_session.interrupted_at = None
+        await session.commit()
+    if interrupted:
+        logger.info("interrupted_sessions_notified", count=len(interrupted))
+
+
+async def main():
+    """Main bot function"""
+    # Initialize database
+    logger.info("database_initializing")
+    await init_db()
+
+    if SIMILARITY_ENABLED:
+        async with AsyncSessionLocal() as session:
+            loaded = await load_similarity_index(session, similarity_index)
+        logger.info("similarity_index_loaded", problems=loaded)
+
+    # Create bot and dispatcher
+    bot = Bot(
+        token=BOT_TOKEN,
+        default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN)
+    )
+    dp = create_dispatcher()
+
+    # Bot.me() is cached after the first call; fetch it now so handlers
+    # building referral/return links never wait for getMe
+    bot_me = await bot.me()
+    logger.info("bot_identity_cached", username=bot_me.username)
+
+    await notify_interrupted(bot)
+
+    # Start metrics endpoint
+    metrics_runner = None
+    if METRICS_ENABLED:
+        metrics_runner = await start_metrics_server(
+            METRICS_HOST, METRICS_PORT, routes={"/stats": handle_stats_request}
+        )
 
     # Start subscription renewal scheduler as background task
-    renewal_task = asyncio.create_task(start_renewal_scheduler(bot))
-    logger.info("Subscription renewal scheduler started")
+    supervisor.start_daemon(start_renewal_scheduler(bot), name="subscription_renewal")
+    logger.info("renewal_scheduler_started")
+
+    if RETENTION_ENABLED:
+        supervisor.start_daemon(start_retention_scheduler(), name="retention")
+    supervisor.start_daemon(start_stats_flusher(), name="stats_flush")
+    supervisor.start_daemon(start_events_flusher(), name="events_flush")
 
-    # Start polling
-    logger.info("Bot started successfully! Press Ctrl+C to stop.")
+    # Start polling (aiogram stops it on SIGINT/SIGTERM). Stopping polling
+    # leaves running handlers alone, so they are drained below while the
+    # Bot session is still open.
+    logger.info("bot_started")
     try:
-        await dp.start_polling(bot)
-    except KeyboardInterrupt:
-        logger.info("Bot stopped by user")
-        renewal_task.cancel()  # Stop renewal scheduler
-        try:
-            await renewal_task
-        except asyncio.CancelledError:
-            logger.info("Renewal scheduler stopped")
+        await dp.start_polling(bot, close_bot_session=False)
     finally:
+        unfinished = await inflight.drain(timeout=SHUTDOWN_DRAIN_TIMEOUT)
+        if unfinished:
+            await persist_interrupted(unfinished)
+        await inflight.cancel_all()
+        logger.info("update_handlers_stopped")
+
+        # Background work (notifications, cleanup) still needs the Bot session
+        await supervisor.drain(timeout=SHUTDOWN_DRAIN_TIMEOUT)
+        logger.info("background_tasks_stopped")
+        try:
+            await stats.flush()
+        except Exception:
+            logger.exception("stats_flush_failed")
+        try:
+            await events.flush()
+        except Exception:
+            logger.exception("events_flush_failed", buffered=len(events))
+        if metrics_runner:
+            await metrics_runner.cleanup()
         await bot.session.close()
 
 if __name__ == "__main__":
@@ -0,0 +1,29 @@
+"""
+Daily active users.
+
+Registered as an outer update middleware (after aiogram's user context), so
+every update from a user marks them active for /stats. Only an in-memory
+set is touched here; bot.services.stats writes it out on flush.
+"""
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.services.stats import stats
+
+
+class ActivityMiddleware(BaseMiddleware):
+    """Count the update's user in today's DAU"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is not None and not user.is_bot:
+            stats.record_activity(user.id)
+        return await handler(event, data)
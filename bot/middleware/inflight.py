@@ -0,0 +1,29 @@
+"""
+In-flight update tracking.
+
+Registered as an outer update middleware: every update handler task is
+known to bot.services.inflight, so shutdown can wait for it.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.services.inflight import inflight
+
+
+class InflightMiddleware(BaseMiddleware):
+    """Register the task processing the update in the in-flight registry"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        task = asyncio.current_task()
+        if task is not None:
+            inflight.track_update(task)
+        return await handler(event, data)
@@ -0,0 +1,72 @@
+"""
+Request context for logs.
+
+UpdateContextMiddleware (outer, update) binds a trace id, update_id and
+user_id into structlog contextvars and starts the update clock, so every
+log line written while the update is handled - in handlers, ClaudeService,
+SQL, background tasks it spawns - carries them plus duration_ms.
+HandlerContextMiddleware (inner) adds the handler name and the problem_id
+from FSM data once the handler is resolved.
+"""
+
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from structlog.contextvars import bind_contextvars, get_contextvars, reset_contextvars, unbind_contextvars
+
+from bot.logging_config import update_started
+
+
+class UpdateContextMiddleware(BaseMiddleware):
+    """Bind trace_id / update_id / user_id for the whole update"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        context = {"trace_id": uuid.uuid4().hex[:16]}
+        if isinstance(event, Update):
+            context["update_id"] = event.update_id
+        user = data.get("event_from_user")
+        if user is not None:
+            context["user_id"] = user.id
+
+        outer = get_contextvars().keys()
+        tokens = bind_contextvars(**context)
+        started = update_started.set(time.perf_counter())
+        try:
+            return await handler(event, data)
+        finally:
+            update_started.reset(started)
+            reset_contextvars(**tokens)
+            # Keys handlers bound themselves (problem_id) end with the update too
+            unbind_contextvars(*(get_contextvars().keys() - outer))
+
+
+class HandlerContextMiddleware(BaseMiddleware):
+    """Bind the resolved handler's name and the current problem_id"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        context = {"handler": getattr(getattr(handler_object, "callback", None), "__name__", "unknown")}
+        state = data.get("state")
+        if state is not None:
+            problem_id = (await state.get_data()).get("problem_id")
+            if problem_id is not None:
+                context["problem_id"] = problem_id
+
+        tokens = bind_contextvars(**context)
+        try:
+            return await handler(event, data)
+        finally:
+            reset_contextvars(**tokens)
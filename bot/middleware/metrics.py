@@ -0,0 +1,37 @@
+"""
+Handler timing middleware.
+
+Registered as an inner middleware, so the resolved handler is known and
+its function name can be used as the metric label.
+"""
+
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.services.metrics import HANDLER_LATENCY
+
+
+class HandlerTimingMiddleware(BaseMiddleware):
+    """Observe duration of every handler call in bot_handler_duration_seconds"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            return await handler(event, data)
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            HANDLER_LATENCY.observe(time.perf_counter() - start, handler=name, status=status)
@@ -1,9 +1,13 @@
 import anthropic
-from typing import Dict, List
+import asyncio
+from typing import Dict, List, Optional
 import time
 import structlog
 from bot.config import CLAUDE_API_KEY
+from bot.services.error_reporting import errors
 from bot.services.prompt_builder import PromptBuilder
+from bot.services.metrics import CLAUDE_LATENCY, record_claude_usage
+from bot.services.stats import stats
 
 logger = structlog.get_logger(__name__)
 
@@ -12,11 +16,58 @@ class ClaudeService:
     """Service for interacting with Claude API"""
 
     def __init__(self):
-        self.client = anthropic.Anthropic(api_key=CLAUDE_API_KEY)
+        # Async client: requests must not block the event loop for other users
+        self.client = anthropic.AsyncAnthropic(api_key=CLAUDE_API_KEY)
         self.model = "claude-sonnet-4-5-20250929"  # Updated to latest model
         self.max_retries = 3
         self.prompt_builder = PromptBuilder()
 
+    async def _create_message(self, operation: str, **kwargs):
+        """Call Claude Messages API, recording latency and token usage metrics"""
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            message = await self.client.messages.create(**kwargs)
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            CLAUDE_LATENCY.observe(time.perf_counter() - start, operation=operation, status=status)
+
+        record_claude_usage(operation, message.usage)
+        stats.record_tokens(operation, message.usage)
+        return message
+
+    async def prewarm_cache(self, user_context: Dict = None) -> None:
+        """
+        Write the user's system prompt to the prompt cache ahead of the first question.
+
+        Called while the user is typing the problem, so the first real request
+        reads the cached prefix instead of writing it. Costs one output token.
+        """
+        try:
+            await self._create_message(
+                "prewarm",
+                model=self.model,
+                max_tokens=1,
+                system=[
+                    {
+                        "type": "text",
+                        "text": self.prompt_builder.build_system_prompt(
+                            gender=user_context.get('gender') if user_context else None,
+                            age=user_context.get('age') if user_context else None,
+                            occupation=user_context.get('occupation') if user_context else None,
+                            work_format=user_context.get('work_format') if user_context else None
+                        ),
+                        "cache_control": {"type": "ephemeral"}
+                    }
+                ],
+                messages=[{"role": "user", "content": "."}]
+            )
+        except Exception as e:
+            # Best effort: the real request will simply write the cache itself
+            errors.report("claude_prewarm", e, level="warning")
+
     async def generate_question(
         self,
         problem_description: str,
@@ -38,7 +89,8 @@ class ClaudeService:
         )
 
         try:
-            message = self.client.messages.create(
+            message = await self._create_message(
+                "question",
                 model=self.model,
                 max_tokens=300,
                 system=[
@@ -69,14 +121,15 @@ class ClaudeService:
             return question
 
         except Exception as e:
-            print(f"❌ Error generating question: {e}")
+            errors.report("claude_question", e, step=step)
             return f"Расскажи подробнее о ситуации (вопрос {step}/5)"
 
     async def generate_solution(
         self,
         problem_description: str,
         conversation_history: List[Dict],
-        user_context: Dict = None
+        user_context: Dict = None,
+        similar_patterns: Optional[str] = None
     ) -> str:
         """Generate final solution with prompt caching and user context"""
         # Extract user context
@@ -87,8 +140,11 @@ class ClaudeService:
 
         context = self.prompt_builder.build_solution_context(
             problem_description=problem_description,
-            conversation_history=conversation_history
+            conversation_history=conversation_history,
+            similar_patterns=similar_patterns
         )
+        # Separate label so hinted and plain solutions can be compared in metrics
+        operation = "solution_hinted" if similar_patterns else "solution"
 
         # Build and log system prompt
         system_prompt = self.prompt_builder.build_system_prompt(
@@ -109,7 +165,8 @@ class ClaudeService:
 
         for attempt in range(self.max_retries):
             try:
-                message = self.client.messages.create(
+                message = await self._create_message(
+                    operation,
                     model=self.model,
                     max_tokens=2500,
                     system=[
@@ -135,7 +192,7 @@ class ClaudeService:
                 return solution
 
             except Exception as e:
-                print(f"❌ Error generating solution (attempt {attempt+1}/{self.max_retries}): {e}")
+                errors.report(f"claude_{operation}", e, attempt=attempt + 1, max_retries=self.max_retries)
                 if attempt == self.max_retries - 1:
                     return """🎯 В ЧЁМ СУТЬ
 Не удалось сгенерировать решение из-за технической ошибки.
@@ -148,7 +205,7 @@ class ClaudeService:
 
 💬 P.S.
 Извини за неудобства!"""
-                time.sleep(2 ** attempt)
+                await asyncio.sleep(2 ** attempt)
 
     async def generate_discussion_answer(
         self,
@@ -171,7 +228,8 @@ class ClaudeService:
         )
 
         try:
-            message = self.client.messages.create(
+            message = await self._create_message(
+                "discussion",
                 model=self.model,
                 max_tokens=500,  # Discussion answers are shorter
                 system=[
@@ -202,5 +260,5 @@ class ClaudeService:
             return answer
 
         except Exception as e:
-            print(f"❌ Error generating discussion answer: {e}")
+            errors.report("claude_discussion", e)
             return "Извини, возникла техническая ошибка. Попробуй переформулировать вопрос."
@@ -0,0 +1,100 @@
+"""
+Error reporting for services: classified, counted, rate-limited.
+
+report() counts every error in bot_errors_total by operation and kind
+(rate_limit, overloaded, server_error, timeout, connection, auth,
+bad_request, internal), so a Claude outage shows up as a metric. Identical
+errors (same operation, kind and exception type) are logged once, then at
+most once per ERROR_LOG_INTERVAL seconds or every ERROR_LOG_EVERY
+occurrences; the logged line carries how many were suppressed in between.
+"""
+import time
+from typing import Dict, Optional, Tuple
+
+import structlog
+from anthropic import APIConnectionError, APIStatusError, APITimeoutError
+
+from bot.config import ERROR_LOG_EVERY, ERROR_LOG_INTERVAL
+from bot.services.metrics import registry
+
+logger = structlog.get_logger(__name__)
+
+ERRORS = registry.counter("bot_errors_total", "Errors reported by services", labelnames=("operation", "kind"))
+ERROR_LOGS_SUPPRESSED = registry.counter(
+    "bot_error_logs_suppressed_total", "Repeated errors counted but not logged", labelnames=("operation",)
+)
+
+# Expected under load or during an outage: logged as warnings
+TRANSIENT_KINDS = frozenset(("rate_limit", "overloaded"))
+
+
+def classify(exc: BaseException) -> str:
+    """Error kind by exception type and HTTP status"""
+    if isinstance(exc, APITimeoutError):
+        return "timeout"
+    if isinstance(exc, APIConnectionError):
+        return "connection"
+    if isinstance(exc, APIStatusError):
+        status = exc.status_code
+        if status == 429:
+            return "rate_limit"
+        if status == 529:
+            return "overloaded"
+        if status >= 500:
+            return "server_error"
+        if status in (401, 403):
+            return "auth"
+        return "bad_request"
+    if isinstance(exc, TimeoutError):
+        return "timeout"
+    if isinstance(exc, ConnectionError):
+        return "connection"
+    return "internal"
+
+
+class ErrorReporter:
+    """Counts every error, logs one line per burst of identical ones"""
+
+    def __init__(self, interval: float = ERROR_LOG_INTERVAL, every: int = ERROR_LOG_EVERY):
+        self._interval = interval
+        self._every = every
+        # (operation, kind, exception type) -> [last logged at, suppressed since]
+        self._seen: Dict[Tuple[str, str, str], list] = {}
+
+    def report(self, operation: str, exc: BaseException, level: Optional[str] = None, **fields) -> str:
+        """Record an error; returns its kind"""
+        kind = classify(exc)
+        ERRORS.inc(operation=operation, kind=kind)
+
+        key = (operation, kind, type(exc).__name__)
+        now = time.monotonic()
+        state = self._seen.get(key)
+        if state is not None and now - state[0] < self._interval and state[1] + 1 < self._every:
+            state[1] += 1
+            ERROR_LOGS_SUPPRESSED.inc(operation=operation)
+            return kind
+
+        repeated = state[1] if state is not None else 0
+        self._seen[key] = [now, 0]
+
+        if level is None:
+            level = "warning" if kind in TRANSIENT_KINDS else "error"
+        status_code = getattr(exc, "status_code", None)
+        if status_code is not None:
+            fields["status_code"] = status_code
+        if repeated:
+            fields["repeated"] = repeated
+        getattr(logger, level)(
+            f"{operation}_failed",
+            kind=kind,
+            error_type=type(exc).__name__,
+            error=str(exc),
+            # Unexpected errors need the traceback, API errors do not
+            exc_info=exc if kind == "internal" else False,
+            **fields
+        )
+        return kind
+
+
+# Shared instance (ClaudeService and other services)
+errors = ErrorReporter()
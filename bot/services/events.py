@@ -0,0 +1,135 @@
+"""
+Funnel events: what users do, as typed rows in the events table.
+
+Handlers call events.track() (append to an in-memory ring buffer, no I/O).
+A supervisor daemon writes the buffer in batches of EVENTS_BATCH_SIZE rows
+(one multi-row insert each) as soon as a batch is full or every
+EVENTS_FLUSH_INTERVAL seconds. If the database falls behind, the buffer
+keeps the newest EVENTS_BUFFER_SIZE events and counts the dropped ones in
+bot_events_dropped_total.
+"""
+import asyncio
+import json
+from collections import deque
+from datetime import datetime
+from typing import Deque, List, NamedTuple, Optional
+
+import structlog
+from sqlalchemy import insert
+
+from bot.config import EVENTS_BATCH_SIZE, EVENTS_BUFFER_SIZE, EVENTS_FLUSH_INTERVAL
+from bot.database.engine import AsyncSessionLocal
+from bot.database.models import Event
+from bot.services.metrics import registry
+
+logger = structlog.get_logger(__name__)
+
+# Event names (events.name) and their properties
+START = "start"  # new, referral
+ONBOARDING_STEP = "onboarding_step"  # step: gender, birth_date, occupation
+ONBOARDING_COMPLETED = "onboarding_completed"  # work_format, referral
+PROBLEM_STARTED = "problem_started"  # problem_id
+QUESTION_ANSWERED = "question_answered"  # problem_id, step
+SOLUTION_DELIVERED = "solution_delivered"  # problem_id
+DISCUSSION_STARTED = "discussion_started"  # problem_id
+DISCUSSION_MESSAGE = "discussion_message"  # problem_id, paid
+PURCHASE_SCREEN = "purchase_screen"  # screen: purchase_type, subscriptions, packages, discussions
+PAYMENT_METHODS_SHOWN = "payment_methods_shown"  # package
+PAYMENT_INITIATED = "payment_initiated"  # provider, package
+PAYMENT_SUCCEEDED = "payment_succeeded"  # provider, package, amount, first_purchase
+
+EVENT_NAMES = frozenset((
+    START, ONBOARDING_STEP, ONBOARDING_COMPLETED, PROBLEM_STARTED, QUESTION_ANSWERED, SOLUTION_DELIVERED,
+    DISCUSSION_STARTED, DISCUSSION_MESSAGE, PURCHASE_SCREEN, PAYMENT_METHODS_SHOWN, PAYMENT_INITIATED,
+    PAYMENT_SUCCEEDED,
+))
+
+EVENTS_TRACKED = registry.counter("bot_events_total", "Funnel events tracked", labelnames=("name",))
+EVENTS_DROPPED = registry.counter("bot_events_dropped_total", "Funnel events dropped because the buffer was full")
+
+
+class TrackedEvent(NamedTuple):
+    created_at: datetime
+    name: str
+    telegram_id: Optional[int]
+    properties: Optional[dict]
+
+
+class EventTracker:
+    """Ring buffer of funnel events, flushed in batches"""
+
+    def __init__(self, capacity: int = EVENTS_BUFFER_SIZE, batch_size: int = EVENTS_BATCH_SIZE):
+        self._buffer: Deque[TrackedEvent] = deque(maxlen=capacity)
+        self._batch_size = batch_size
+        self._batch_ready = asyncio.Event()
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def track(self, name: str, telegram_id: Optional[int] = None, **properties) -> None:
+        """Buffer one event; properties must be JSON-serializable scalars"""
+        if name not in EVENT_NAMES:
+            raise ValueError(f"Unknown event: {name}")
+        if len(self._buffer) == self._buffer.maxlen:
+            EVENTS_DROPPED.inc()
+        self._buffer.append(TrackedEvent(datetime.utcnow(), name, telegram_id, properties or None))
+        EVENTS_TRACKED.inc(name=name)
+        if len(self._buffer) >= self._batch_size:
+            self._batch_ready.set()
+
+    def _requeue(self, batch: List[TrackedEvent]) -> None:
+        # Back to the front, as long as they fit next to events tracked meanwhile
+        space = self._buffer.maxlen - len(self._buffer)
+        kept = batch[max(len(batch) - space, 0):]
+        self._buffer.extendleft(reversed(kept))
+        if len(kept) < len(batch):
+            EVENTS_DROPPED.inc(len(batch) - len(kept))
+
+    async def flush(self) -> int:
+        """Write everything buffered, batch by batch; returns rows written"""
+        written = 0
+        async with self._lock:
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(self._batch_size, len(self._buffer)))]
+                try:
+                    async with AsyncSessionLocal() as session:
+                        await session.execute(insert(Event), [
+                            {
+                                "created_at": event.created_at,
+                                "name": event.name,
+                                "telegram_id": event.telegram_id,
+                                "properties": json.dumps(event.properties, separators=(",", ":"), default=str)
+                                if event.properties else None,
+                            }
+                            for event in batch
+                        ])
+                        await session.commit()
+                except Exception:
+                    self._requeue(batch)
+                    raise
+                written += len(batch)
+        return written
+
+    async def wait_for_batch(self, timeout: float) -> None:
+        """Return once a full batch is buffered or after timeout"""
+        try:
+            await asyncio.wait_for(self._batch_ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._batch_ready.clear()
+
+
+async def start_events_flusher() -> None:
+    """Flush when a batch is full or every EVENTS_FLUSH_INTERVAL seconds (supervisor daemon)"""
+    while True:
+        await events.wait_for_batch(EVENTS_FLUSH_INTERVAL)
+        try:
+            await events.flush()
+        except Exception:
+            logger.exception("events_flush_failed", buffered=len(events))
+            await asyncio.sleep(EVENTS_FLUSH_INTERVAL)
+
+
+# Shared instance (handlers, bot.main)
+events = EventTracker()
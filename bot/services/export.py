@@ -0,0 +1,213 @@
+"""
+Analytics export: stream tables into CSV or Parquet files in constant memory.
+
+Rows are read with yield_per (a server-side cursor on PostgreSQL, chunked
+fetches on SQLite) and written chunk by chunk, so the export can run next
+to the live bot. Only analytics columns are exported: no Telegram ids,
+names or problem texts.
+
+Incremental exports: every table has a change timestamp; rows changed since
+the previous run's watermark (kept in <out_dir>/export_state.json) go into
+a new file <out_dir>/<table>/<table>_<run>.csv. Runs overlap by
+WATERMARK_OVERLAP to catch rows committed late, so consumers keep the
+latest row per id. Parquet needs the optional pyarrow package.
+"""
+import csv
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import structlog
+from sqlalchemy import Boolean, DateTime, Integer, Numeric, func, select
+
+from bot.database.engine import AsyncSessionLocal
+from bot.database.models import Payment, Problem, Referral, Subscription, User
+
+logger = structlog.get_logger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+STATE_FILE = "export_state.json"
+FORMATS = ("csv", "parquet")
+# A row's timestamp is set before its transaction commits
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+
+@dataclass
+class ExportTable:
+    """Exported columns of one model and the timestamp that moves when a row changes"""
+    name: str
+    model: type
+    columns: Sequence[str]
+    changed_at: object  # column expression for the watermark
+
+
+EXPORT_TABLES: Dict[str, ExportTable] = {table.name: table for table in (
+    ExportTable(
+        "users", User,
+        ("id", "gender", "work_format", "occupation", "problems_remaining", "discussion_credits",
+         "last_purchased_package", "subscription_id", "referred_by", "referral_credits",
+         "created_at", "updated_at"),
+        func.coalesce(User.updated_at, User.created_at),
+    ),
+    ExportTable(
+        "problems", Problem,
+        ("id", "user_id", "problem_type", "methodology", "status", "created_at", "solved_at"),
+        func.coalesce(Problem.solved_at, Problem.created_at),
+    ),
+    ExportTable(
+        "payments", Payment,
+        ("id", "user_id", "amount", "currency", "provider", "status", "package_type", "created_at"),
+        Payment.created_at,
+    ),
+    ExportTable(
+        "subscriptions", Subscription,
+        ("id", "plan", "price", "solutions_per_month", "discussion_limit", "status",
+         "next_billing_date", "created_at", "cancelled_at", "updated_at"),
+        func.coalesce(Subscription.updated_at, Subscription.created_at),
+    ),
+    ExportTable(
+        "referrals", Referral,
+        ("id", "referrer_id", "referred_id", "reward_given", "reward_amount", "created_at", "rewarded_at"),
+        func.coalesce(Referral.rewarded_at, Referral.created_at),
+    ),
+)}
+
+
+class _CsvWriter:
+    def __init__(self, path: Path, table: ExportTable):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(table.columns)
+
+    def write(self, rows: List[tuple]) -> None:
+        self._writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row] for row in rows
+        )
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ParquetWriter:
+    """One row group per chunk; the schema comes from the model, not from the data"""
+
+    def __init__(self, path: Path, table: ExportTable):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        columns = table.model.__table__.c
+        self._schema = pa.schema([(name, self._arrow_type(columns[name].type)) for name in table.columns])
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+
+    def _arrow_type(self, column_type):
+        pa = self._pa
+        if isinstance(column_type, Boolean):
+            return pa.bool_()
+        if isinstance(column_type, Integer):
+            return pa.int64()
+        if isinstance(column_type, Numeric):
+            return pa.decimal128(column_type.precision or 18, column_type.scale or 0)
+        if isinstance(column_type, DateTime):
+            return pa.timestamp("us")
+        return pa.string()
+
+    def write(self, rows: List[tuple]) -> None:
+        columns = list(zip(*rows))
+        self._writer.write_table(self._pa.Table.from_arrays(
+            [self._pa.array(values, type=field.type) for values, field in zip(columns, self._schema)],
+            schema=self._schema
+        ))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def _open_writer(path: Path, table: ExportTable, fmt: str):
+    return _ParquetWriter(path, table) if fmt == "parquet" else _CsvWriter(path, table)
+
+
+def load_state(out_dir: Path) -> Dict[str, str]:
+    path = out_dir / STATE_FILE
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def save_state(out_dir: Path, state: Dict[str, str]) -> None:
+    path = out_dir / STATE_FILE
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True))
+    tmp.replace(path)
+
+
+async def export_table(
+    table: ExportTable,
+    path: Path,
+    fmt: str,
+    since: Optional[datetime],
+    until: datetime,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
+    """Stream rows changed in (since, until] into path; returns count (no file if 0)"""
+    query = (
+        select(*(table.model.__table__.c[name] for name in table.columns))
+        .where(table.changed_at <= until)
+        .order_by(table.model.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    if since is not None:
+        query = query.where(table.changed_at > since)
+
+    count = 0
+    writer = None
+    try:
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(query)
+            async for chunk in result.partitions():
+                if writer is None:
+                    writer = _open_writer(path, table, fmt)
+                writer.write([tuple(row) for row in chunk])
+                count += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+async def run_export(
+    out_dir: Path,
+    fmt: str = "csv",
+    tables: Sequence[str] = tuple(EXPORT_TABLES),
+    full: bool = False,
+    since: Optional[datetime] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict[str, int]:
+    """
+    Export tables changed since their watermark; returns rows per table.
+
+    full ignores the watermarks, since overrides them. The watermark of a
+    table moves only after its file is written completely.
+    """
+    if fmt == "parquet":
+        import pyarrow  # noqa: F401  fail before any file is written
+    out_dir.mkdir(parents=True, exist_ok=True)
+    state = load_state(out_dir)
+    until = datetime.utcnow()
+    run_id = f"{until:%Y%m%d_%H%M%S}"
+    exported = {}
+
+    for name in tables:
+        table = EXPORT_TABLES[name]
+        table_since = since
+        if table_since is None and not full and name in state:
+            table_since = datetime.fromisoformat(state[name]) - WATERMARK_OVERLAP
+        table_dir = out_dir / name
+        table_dir.mkdir(exist_ok=True)
+        path = table_dir / f"{name}_{run_id}{'_full' if table_since is None else ''}.{fmt}"
+
+        exported[name] = await export_table(table, path, fmt, table_since, until, chunk_size)
+        state[name] = until.isoformat()
+        save_state(out_dir, state)
+        logger.info("table_exported", table=name, rows=exported[name], since=table_since, format=fmt)
+    return exported
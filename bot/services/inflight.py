@@ -0,0 +1,101 @@
+"""
+In-flight work tracking for graceful shutdown.
+
+Every update handler task is registered (InflightMiddleware), and Claude
+generations additionally register which problem they belong to. The flow
+position itself is checkpointed into the sessions table at every step
+(problem_flow). On SIGTERM, bot.main stops polling, waits for the handlers
+up to a deadline, flags the sessions of generations that are still running
+as interrupted and only then cancels them. On the next start the users get
+a "continue" button (problem_flow.resume_problem).
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+import structlog
+
+from bot.services.metrics import registry
+
+logger = structlog.get_logger(__name__)
+
+INFLIGHT = registry.gauge(
+    "bot_inflight",
+    "Update handlers and Claude generations currently running",
+    labelnames=("kind",),
+)
+
+
+@dataclass
+class GenerationSnapshot:
+    """Problem a running generation belongs to"""
+    kind: str  # 'questioning', 'solution', 'discussion' (Session.state)
+    telegram_id: int
+    user_id: Optional[int]
+    problem_id: Optional[int]
+
+
+class InflightRegistry:
+    """Running update handlers and the generations inside them"""
+
+    def __init__(self):
+        self._updates: Set[asyncio.Task] = set()
+        self._generations: Dict[asyncio.Task, GenerationSnapshot] = {}
+
+    def counts(self) -> Dict[str, int]:
+        return {"updates": len(self._updates), "generations": len(self._generations)}
+
+    def _update_gauges(self) -> None:
+        for kind, value in self.counts().items():
+            INFLIGHT.set(value, kind=kind)
+
+    def track_update(self, task: asyncio.Task) -> None:
+        self._updates.add(task)
+        task.add_done_callback(self._update_done)
+        self._update_gauges()
+
+    def _update_done(self, task: asyncio.Task) -> None:
+        self._updates.discard(task)
+        self._update_gauges()
+
+    @asynccontextmanager
+    async def generation(self, snapshot: GenerationSnapshot) -> AsyncIterator[None]:
+        """Mark the current handler as generating; its session is flagged if shutdown interrupts it"""
+        task = asyncio.current_task()
+        self._generations[task] = snapshot
+        self._update_gauges()
+        try:
+            yield
+        finally:
+            self._generations.pop(task, None)
+            self._update_gauges()
+
+    async def drain(self, timeout: float) -> List[GenerationSnapshot]:
+        """
+        Wait up to timeout for running handlers.
+
+        Returns snapshots of generations that did not finish; their tasks are
+        left running so the caller can flag their sessions before cancel_all().
+        """
+        pending = set(self._updates)
+        if pending:
+            logger.info("draining_inflight_updates", updates=len(pending),
+                        generations=len(self._generations), timeout=timeout)
+            started = time.perf_counter()
+            _, pending = await asyncio.wait(pending, timeout=timeout)
+            logger.info("inflight_drain_finished", unfinished=len(pending),
+                        waited=round(time.perf_counter() - started, 2))
+        return [snapshot for task, snapshot in self._generations.items() if task in pending]
+
+    async def cancel_all(self) -> None:
+        """Cancel handlers that outlived the drain deadline"""
+        pending = [task for task in self._updates if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+# Shared instance (middleware, problem_flow, bot.main)
+inflight = InflightRegistry()
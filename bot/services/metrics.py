@@ -0,0 +1,352 @@
+"""
+In-process metrics with a Prometheus-compatible /metrics endpoint.
+
+Features:
+- Counters, gauges and histograms kept in plain Python dicts (no dependencies)
+- O(log buckets) histogram observation, cumulative buckets computed only on scrape
+- Async timing helpers for handlers, Claude requests and DB statements
+- Lightweight aiohttp server exposing metrics in Prometheus text format
+"""
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import structlog
+from aiohttp import web
+
+logger = structlog.get_logger(__name__)
+
+# Latency buckets in seconds: from fast DB statements up to long Claude generations
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape_label(value: str) -> str:
+    """Escape label value per Prometheus text format"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Render label set as {a="x",b="y"} (empty string when there are no labels)"""
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """Render float the way Prometheus expects (+Inf, integers without .0)"""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class for metrics with optional labels"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple([labels.get(name, "") for name in self.labelnames])
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down (queue sizes, in-flight requests)"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Histogram(_Metric):
+    """
+    Latency histogram with fixed buckets.
+
+    observe() only increments one bucket counter; cumulative counts
+    are computed at render time so the hot path stays cheap.
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple([labels.get(name, "") for name in self.labelnames])
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe duration of the wrapped block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def quantile(self, q: float, **labels: str) -> Optional[float]:
+        """Approximate quantile (upper bucket bound), used for logs and admin views"""
+        counts = self._counts.get(self._key(labels))
+        if not counts:
+            return None
+        target = q * sum(counts)
+        running = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            running += bucket_count
+            if running >= target:
+                return bound
+        return float("inf")
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key in sorted(self._counts):
+            counts = self._counts[key]
+            running = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                running += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {running}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(self._sums[key])}")
+            lines.append(f"{self.name}_count{labels} {running}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds all metrics of the process and renders them for scraping"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format"""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+# Global registry used by the whole bot
+registry = MetricsRegistry()
+
+# Hot-path metrics
+HANDLER_LATENCY = registry.histogram(
+    "bot_handler_duration_seconds",
+    "Time spent in aiogram handlers",
+    labelnames=("handler", "status"),
+)
+CLAUDE_LATENCY = registry.histogram(
+    "bot_claude_request_duration_seconds",
+    "Duration of Claude API requests",
+    labelnames=("operation", "status"),
+)
+CLAUDE_TOKENS = registry.counter(
+    "bot_claude_tokens_total",
+    "Tokens reported by Claude API usage",
+    labelnames=("operation", "kind"),
+)
+TIME_TO_QUESTION = registry.histogram(
+    "bot_time_to_question_seconds",
+    "Time from the user's message to the next analysis question being shown",
+    labelnames=("step", "mode"),
+)
+FORMATTING_FALLBACKS = registry.counter(
+    "bot_message_plain_fallback_total",
+    "Messages re-sent as plain text after Telegram rejected HTML entities",
+)
+DB_LATENCY = registry.histogram(
+    "bot_db_statement_duration_seconds",
+    "Duration of SQL statements",
+    labelnames=("statement",),
+)
+
+
+def record_claude_usage(operation: str, usage) -> None:
+    """Add Claude usage block to token counters"""
+    CLAUDE_TOKENS.inc(usage.input_tokens, operation=operation, kind="input")
+    CLAUDE_TOKENS.inc(usage.output_tokens, operation=operation, kind="output")
+    CLAUDE_TOKENS.inc(
+        getattr(usage, 'cache_creation_input_tokens', 0) or 0,
+        operation=operation, kind="cache_creation",
+    )
+    CLAUDE_TOKENS.inc(
+        getattr(usage, 'cache_read_input_tokens', 0) or 0,
+        operation=operation, kind="cache_read",
+    )
+
+
+def instrument_engine(sync_engine) -> None:
+    """
+    Time every SQL statement executed through the engine.
+
+    Uses SQLAlchemy cursor events, so it covers all AsyncSessionLocal sessions
+    without wrapping each call site.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get("query_start_time")
+        if not start_times:
+            return
+        elapsed = time.perf_counter() - start_times.pop()
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement else "UNKNOWN"
+        DB_LATENCY.observe(elapsed, statement=verb)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(context):
+        # after_cursor_execute never fires for a failed statement: drop its start
+        # time, or the next statement on this connection would pop the wrong one
+        if context.connection is None:
+            return
+        start_times = context.connection.info.get("query_start_time")
+        if start_times:
+            start_times.pop()
+
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(
+        text=registry.render(),
+        # Prometheus text exposition format; aiohttp's content_type= cannot carry version
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+async def start_metrics_server(
+    host: str,
+    port: int,
+    routes: Optional[Dict[str, Callable[[web.Request], Awaitable[web.Response]]]] = None
+) -> web.AppRunner:
+    """
+    Start HTTP server with /metrics endpoint.
+
+    Args:
+        host: Interface to bind (keep 127.0.0.1 unless scraped remotely)
+        port: TCP port
+        routes: Extra GET handlers by path (e.g. /stats)
+
+    Returns:
+        AppRunner (call runner.cleanup() on shutdown)
+    """
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    for path, handler in (routes or {}).items():
+        app.router.add_get(path, handler)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info("metrics_server_started", host=host, port=port)
+    return runner
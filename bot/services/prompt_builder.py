@@ -1,4 +1,8 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+import structlog
+
+logger = structlog.get_logger(__name__)
 
 
 class PromptBuilder:
@@ -7,7 +11,7 @@ class PromptBuilder:
     def __init__(self):
         """Initialize with the optimized system prompt"""
         self.system_prompt = self._build_core_prompt()
-        print("✅ PromptBuilder initialized with optimized prompt")
+        logger.debug("prompt_builder_initialized")
 
     def _build_gender_specific_addon(self, gender: str) -> str:
         """Build gender-specific addon for system prompt"""
@@ -333,7 +337,8 @@ class PromptBuilder:
     def build_solution_context(
         self,
         problem_description: str,
-        conversation_history: List[Dict]
+        conversation_history: List[Dict],
+        similar_patterns: Optional[str] = None
     ) -> str:
         """Build context for generating final solution"""
         # Compact conversation format
@@ -342,10 +347,17 @@ class PromptBuilder:
             for msg in conversation_history
         ])
 
+        patterns_text = ""
+        if similar_patterns:
+            patterns_text = (
+                "\n\nПохожие проблемы у других людей чаще всего сводились к "
+                f"(это гипотезы, проверь их по ответам, не копируй):\n{similar_patterns}"
+            )
+
         return f"""Проблема: {problem_description}
 
 Анализ:
-{conversation_text}
+{conversation_text}{patterns_text}
 
 Создай решение по формату из системного промпта.
 ВАЖНО: Не показывай свои размышления! Сразу начинай с раздела "🎯 В ЧЁМ СУТЬ".
@@ -0,0 +1,339 @@
+"""
+Data retention: archive or delete old rows without blocking the bot.
+
+Policies are per table and configured in bot.config (RETENTION_*_DAYS, 0
+disables a policy). Archived rows are stored in archived_records as
+zlib-compressed JSON (a problem together with its dialogue) and removed
+from the hot tables, the search index and the similarity index. Every
+batch is a short transaction followed by a pause, so the bot's writes
+interleave with the job. Freed pages are returned to the OS with
+incremental_vacuum when the SQLite file has auto_vacuum=INCREMENTAL (new
+databases; existing ones: scripts/retention.py --enable-incremental-vacuum).
+
+Runs daily inside the bot (start_retention_scheduler) or from
+scripts/retention.py.
+"""
+import asyncio
+import base64
+import json
+import time
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import structlog
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.config import (
+    RETENTION_ABANDONED_PROBLEMS_DAYS,
+    RETENTION_BATCH_PAUSE,
+    RETENTION_BATCH_SIZE,
+    RETENTION_EVENTS_DAYS,
+    RETENTION_HOUR,
+    RETENTION_PAYMENTS_DAYS,
+    RETENTION_SESSIONS_DAYS,
+    RETENTION_SOLVED_PROBLEMS_DAYS,
+    RETENTION_VACUUM_PAGES
+)
+from bot.database.engine import AsyncSessionLocal, engine
+from bot.database.models import ArchivedRecord, Base, ConversationTurn, Event, Payment, Problem, Session
+from bot.services.metrics import registry
+from bot.services.search import remove_from_index
+from bot.services.similarity import forget_problems
+
+logger = structlog.get_logger(__name__)
+
+RETENTION_ROWS = registry.counter(
+    "bot_retention_rows_total",
+    "Rows removed from hot tables by retention",
+    labelnames=("policy", "action"),
+)
+TABLE_ROWS = registry.gauge(
+    "bot_table_rows",
+    "Rows per table at the last retention run",
+    labelnames=("table",),
+)
+TABLE_BYTES = registry.gauge(
+    "bot_table_bytes",
+    "Bytes per table at the last retention run (when the database reports them)",
+    labelnames=("table",),
+)
+DATABASE_BYTES = registry.gauge(
+    "bot_database_bytes",
+    "Database size at the last retention run",
+    labelnames=("kind",),
+)
+
+
+@dataclass
+class RetentionPolicy:
+    """Rows of one model that expire max_age_days after their timestamp"""
+    name: str
+    model: type
+    max_age_days: int
+    archive: bool  # False: deleted without a copy
+    expired: Callable[[datetime], object]  # WHERE clause for a cutoff
+
+    @property
+    def action(self) -> str:
+        return "archive" if self.archive else "delete"
+
+
+def configured_policies() -> List[RetentionPolicy]:
+    return [
+        RetentionPolicy(
+            "solved_problems", Problem, RETENTION_SOLVED_PROBLEMS_DAYS, archive=True,
+            expired=lambda cutoff: (Problem.status.in_(("solved", "archived")))
+            & (func.coalesce(Problem.solved_at, Problem.created_at) < cutoff),
+        ),
+        RetentionPolicy(
+            "abandoned_problems", Problem, RETENTION_ABANDONED_PROBLEMS_DAYS, archive=True,
+            expired=lambda cutoff: (Problem.status == "active") & (Problem.created_at < cutoff),
+        ),
+        RetentionPolicy(
+            "sessions", Session, RETENTION_SESSIONS_DAYS, archive=False,
+            expired=lambda cutoff: Session.created_at < cutoff,
+        ),
+        RetentionPolicy(
+            "payments", Payment, RETENTION_PAYMENTS_DAYS, archive=True,
+            expired=lambda cutoff: Payment.created_at < cutoff,
+        ),
+        RetentionPolicy(
+            "events", Event, RETENTION_EVENTS_DAYS, archive=False,
+            expired=lambda cutoff: Event.created_at < cutoff,
+        ),
+    ]
+
+
+@dataclass
+class RetentionReport:
+    removed: Dict[str, int] = field(default_factory=dict)  # policy name -> rows
+    released_pages: int = 0
+    tables: Dict[str, Dict[str, int]] = field(default_factory=dict)  # table -> rows/bytes
+    database_bytes: Dict[str, int] = field(default_factory=dict)  # total/free
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    raise TypeError(f"Cannot archive {type(value).__name__}")
+
+
+def encode_payload(data: dict) -> bytes:
+    return zlib.compress(json.dumps(data, ensure_ascii=False, default=_json_default).encode("utf-8"))
+
+
+def decode_payload(payload: bytes) -> dict:
+    """Archived row as a dict (datetimes as ISO strings, binary columns base64)"""
+    return json.loads(zlib.decompress(payload))
+
+
+async def _archive_rows(session: AsyncSession, model: type, ids: Sequence[int]) -> None:
+    rows = (await session.execute(select(model.__table__).where(model.id.in_(ids)))).mappings().all()
+    conversations: Dict[int, List[dict]] = {}
+    if model is Problem:
+        turns = await session.execute(
+            select(ConversationTurn.problem_id, ConversationTurn.role, ConversationTurn.content,
+                   ConversationTurn.created_at)
+            .where(ConversationTurn.problem_id.in_(ids))
+            .order_by(ConversationTurn.problem_id, ConversationTurn.seq)
+        )
+        for turn in turns:
+            conversations.setdefault(turn.problem_id, []).append(
+                {"role": turn.role, "content": turn.content, "created_at": turn.created_at}
+            )
+
+    for row in rows:
+        data = dict(row)
+        if model is Problem:
+            data["conversation"] = conversations.get(row["id"], [])
+        session.add(ArchivedRecord(
+            source_table=model.__tablename__,
+            source_id=row["id"],
+            user_id=row["user_id"],
+            created_at=row["created_at"],
+            payload=encode_payload(data),
+        ))
+
+
+async def _remove_rows(session: AsyncSession, policy: RetentionPolicy, ids: Sequence[int]) -> None:
+    """Archive (if the policy says so) and delete one batch (caller commits)"""
+    if policy.archive:
+        await _archive_rows(session, policy.model, ids)
+    if policy.model is Problem:
+        # Explicit: SQLite doesn't enforce ON DELETE without PRAGMA foreign_keys
+        await session.execute(delete(ConversationTurn).where(ConversationTurn.problem_id.in_(ids)))
+        await session.execute(delete(Session).where(Session.problem_id.in_(ids)))
+        await remove_from_index(session, list(ids))
+    await session.execute(delete(policy.model).where(policy.model.id.in_(ids)))
+
+
+async def count_expired(policy: RetentionPolicy) -> int:
+    cutoff = datetime.utcnow() - timedelta(days=policy.max_age_days)
+    async with AsyncSessionLocal() as session:
+        return await session.scalar(select(func.count()).select_from(policy.model).where(policy.expired(cutoff)))
+
+
+async def apply_policy(
+    policy: RetentionPolicy,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    pause: float = RETENTION_BATCH_PAUSE
+) -> int:
+    """Remove expired rows batch by batch, oldest first; returns count"""
+    cutoff = datetime.utcnow() - timedelta(days=policy.max_age_days)
+    query = select(policy.model.id).where(policy.expired(cutoff)).order_by(policy.model.id).limit(batch_size)
+    total = 0
+    while True:
+        async with AsyncSessionLocal() as session:
+            ids = list((await session.execute(query)).scalars())
+            if not ids:
+                break
+            await _remove_rows(session, policy, ids)
+            await session.commit()
+        total += len(ids)
+        RETENTION_ROWS.inc(len(ids), policy=policy.name, action=policy.action)
+        if policy.model is Problem:
+            forget_problems(ids)
+        if len(ids) < batch_size:
+            break
+        await asyncio.sleep(pause)
+    return total
+
+
+async def _pragma(conn, name: str) -> int:
+    return (await conn.exec_driver_sql(f"PRAGMA {name}")).scalar()
+
+
+async def incremental_vacuum(pages_per_step: int = RETENTION_VACUUM_PAGES, pause: float = RETENTION_BATCH_PAUSE) -> int:
+    """Give free SQLite pages back to the OS in small steps; returns pages released"""
+    async with engine.connect() as conn:
+        if conn.dialect.name != "sqlite":
+            return 0  # PostgreSQL: autovacuum reuses the space
+        free = await _pragma(conn, "freelist_count")
+        if await _pragma(conn, "auto_vacuum") != 2:
+            if free:
+                logger.info("incremental_vacuum_disabled", free_pages=free)
+            return 0
+
+    released = 0
+    while free:
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            # execute() steps the pragma once, releasing a single page;
+            # executescript() runs it to completion
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.executescript(f"PRAGMA incremental_vacuum({pages_per_step})")
+            left = await _pragma(conn, "freelist_count")
+        if left >= free:
+            break
+        released += free - left
+        free = left
+        await asyncio.sleep(pause)
+    return released
+
+
+async def enable_incremental_vacuum() -> None:
+    """
+    Switch an existing SQLite file to auto_vacuum=INCREMENTAL.
+
+    Needs a full VACUUM (rewrites the file and blocks writers while it runs),
+    so run it once in a quiet moment.
+    """
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        await conn.exec_driver_sql("VACUUM")
+
+
+async def table_sizes(session: AsyncSession) -> Dict[str, Dict[str, int]]:
+    """Rows per table, plus bytes where the database can tell (dbstat / pg_total_relation_size)"""
+    tables = sorted(Base.metadata.tables)
+    sizes = {name: {"rows": await session.scalar(text(f"SELECT count(*) FROM {name}"))} for name in tables}
+
+    dialect = session.bind.dialect.name
+    if dialect == "sqlite":
+        try:
+            result = await session.execute(text("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"))
+        except DBAPIError:
+            return sizes  # SQLite built without the dbstat table
+        for name, size in result:
+            if name in sizes:
+                sizes[name]["bytes"] = int(size)
+    elif dialect == "postgresql":
+        for name in tables:
+            sizes[name]["bytes"] = await session.scalar(text("SELECT pg_total_relation_size(:name)"), {"name": name})
+    return sizes
+
+
+async def database_size(session: AsyncSession) -> Tuple[int, int]:
+    """(total bytes, free bytes inside the file)"""
+    if session.bind.dialect.name == "sqlite":
+        page_size = await session.scalar(text("PRAGMA page_size"))
+        pages = await session.scalar(text("PRAGMA page_count"))
+        free = await session.scalar(text("PRAGMA freelist_count"))
+        return pages * page_size, free * page_size
+    if session.bind.dialect.name == "postgresql":
+        return await session.scalar(text("SELECT pg_database_size(current_database())")), 0
+    return 0, 0
+
+
+async def collect_sizes(report: RetentionReport) -> None:
+    async with AsyncSessionLocal() as session:
+        report.tables = await table_sizes(session)
+        total, free = await database_size(session)
+    report.database_bytes = {"total": total, "free": free}
+    for name, size in report.tables.items():
+        TABLE_ROWS.set(size["rows"], table=name)
+        if "bytes" in size:
+            TABLE_BYTES.set(size["bytes"], table=name)
+    for kind, value in report.database_bytes.items():
+        DATABASE_BYTES.set(value, kind=kind)
+
+
+async def run_retention(dry_run: bool = False) -> RetentionReport:
+    """Apply every enabled policy, vacuum, report sizes; dry_run only counts expired rows"""
+    started = time.perf_counter()
+    report = RetentionReport()
+    for policy in configured_policies():
+        if policy.max_age_days <= 0:
+            continue
+        if dry_run:
+            report.removed[policy.name] = await count_expired(policy)
+        else:
+            report.removed[policy.name] = await apply_policy(policy)
+    if not dry_run:
+        report.released_pages = await incremental_vacuum()
+    await collect_sizes(report)
+
+    logger.info(
+        "retention_finished",
+        dry_run=dry_run,
+        removed=report.removed,
+        released_pages=report.released_pages,
+        database_bytes=report.database_bytes,
+        rows={name: size["rows"] for name, size in report.tables.items()},
+        duration=round(time.perf_counter() - started, 2),
+    )
+    return report
+
+
+async def start_retention_scheduler():
+    """Run retention daily at RETENTION_HOUR UTC (supervisor daemon)"""
+    while True:
+        now = datetime.utcnow()
+        next_run = now.replace(hour=RETENTION_HOUR, minute=0, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        await asyncio.sleep((next_run - now).total_seconds())
+        try:
+            await run_retention()
+        except Exception:
+            logger.exception("retention_failed")
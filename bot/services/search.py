@@ -0,0 +1,224 @@
+"""
+Full-text search over a user's past problems and solutions.
+
+On SQLite the search uses an FTS5 table (problems_fts, rowid = problems.id)
+that is updated incrementally when a solution is saved. Each row carries an
+"owner" token, so the per-user filter is resolved by the FTS index itself
+instead of scanning every match. Other databases, or SQLite builds without
+FTS5, fall back to LIKE queries over the problems table.
+"""
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+import structlog
+from sqlalchemy import and_, or_, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from bot.database.models import Problem
+from bot.services.solution_parser import decode_sections
+from bot.utils.text import strip_markdown
+
+logger = structlog.get_logger(__name__)
+
+FTS_TABLE = "problems_fts"
+MAX_QUERY_TERMS = 8
+SNIPPET_TOKENS = 16
+
+_CREATE_FTS = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    owner, title, root_cause, solution,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+# Column weights for bm25(): owner, title, root_cause, solution
+_RANKING = "bm25({table}, 0.0, 10.0, 4.0, 1.0)".format(table=FTS_TABLE)
+
+_TERM = re.compile(r"\w+")
+
+# None until checked: FTS5 table exists and is usable
+_fts_ready: Optional[bool] = None
+
+
+@dataclass
+class SearchResult:
+    """One matching problem"""
+    problem_id: int
+    title: str
+    snippet: str
+
+
+async def ensure_search_index(conn: AsyncConnection) -> bool:
+    """Create the FTS5 table if the database supports it (called from init_db)"""
+    global _fts_ready
+    if conn.dialect.name != "sqlite":
+        _fts_ready = False
+        return False
+    try:
+        await conn.execute(text(_CREATE_FTS))
+        _fts_ready = True
+    except OperationalError as e:
+        # SQLite compiled without FTS5
+        logger.warning("fts5_unavailable", error=str(e))
+        _fts_ready = False
+    return _fts_ready
+
+
+async def _has_fts(session: AsyncSession) -> bool:
+    global _fts_ready
+    if _fts_ready is None:
+        if session.bind.dialect.name != "sqlite":
+            _fts_ready = False
+        else:
+            result = await session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE}
+            )
+            _fts_ready = result.scalar() is not None
+    return _fts_ready
+
+
+def _owner_token(user_id: int) -> str:
+    return f"u{user_id}"
+
+
+def _query_terms(query: str) -> List[str]:
+    return _TERM.findall(query.lower())[:MAX_QUERY_TERMS]
+
+
+async def index_problem(session: AsyncSession, problem: Problem, solution_text: Optional[str]) -> None:
+    """
+    Add or replace one problem in the search index.
+
+    Runs in the caller's transaction, so the index is committed together
+    with the solution.
+    """
+    if not await _has_fts(session):
+        return
+    await session.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": problem.id})
+    await session.execute(
+        text(
+            f"INSERT INTO {FTS_TABLE} (rowid, owner, title, root_cause, solution) "
+            "VALUES (:id, :owner, :title, :root_cause, :solution)"
+        ),
+        {
+            "id": problem.id,
+            "owner": _owner_token(problem.user_id),
+            "title": problem.title,
+            "root_cause": strip_markdown(problem.root_cause or ""),
+            "solution": strip_markdown(solution_text or ""),
+        }
+    )
+
+
+async def remove_from_index(session: AsyncSession, problem_ids: List[int]) -> None:
+    """Drop deleted problems from the search index"""
+    if not problem_ids or not await _has_fts(session):
+        return
+    await session.execute(
+        text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"),
+        [{"id": problem_id} for problem_id in problem_ids]
+    )
+
+
+async def rebuild_search_index(session: AsyncSession, batch_size: int = 500) -> int:
+    """Re-index all solved problems (initial backfill); returns number of rows"""
+    if not await _has_fts(session):
+        return 0
+    await session.execute(text(f"DELETE FROM {FTS_TABLE}"))
+
+    count = 0
+    last_id = 0
+    while True:
+        result = await session.execute(
+            select(Problem)
+            .where(Problem.id > last_id, Problem.status == "solved")
+            .order_by(Problem.id)
+            .limit(batch_size)
+        )
+        problems = result.scalars().all()
+        if not problems:
+            break
+        for problem in problems:
+            if problem.solution_data:
+                solution_text = decode_sections(problem.solution_data).to_text()
+            else:
+                solution_text = problem.action_plan
+            await index_problem(session, problem, solution_text)
+            count += 1
+        last_id = problems[-1].id
+        session.expunge_all()
+    return count
+
+
+async def search_problems(
+    session: AsyncSession,
+    user_id: int,
+    query: str,
+    limit: int = 10
+) -> List[SearchResult]:
+    """Best matches among user's problems, most relevant first"""
+    terms = _query_terms(query)
+    if not terms:
+        return []
+    if await _has_fts(session):
+        return await _search_fts(session, user_id, terms, limit)
+    return await _search_like(session, user_id, terms, limit)
+
+
+async def _search_fts(session: AsyncSession, user_id: int, terms: List[str], limit: int) -> List[SearchResult]:
+    # Every term is a quoted prefix query, so user input can't inject FTS syntax;
+    # terms are limited to the text columns, or "u7" would match the owner token
+    match = (
+        f"owner:{_owner_token(user_id)} AND {{title root_cause solution}}: ("
+        + " AND ".join(f'"{term}"*' for term in terms)
+        + ")"
+    )
+    result = await session.execute(
+        text(
+            f"SELECT rowid, title, "
+            f"snippet({FTS_TABLE}, 3, '«', '»', '…', {SNIPPET_TOKENS}) AS solution_snippet, "
+            f"snippet({FTS_TABLE}, 2, '«', '»', '…', {SNIPPET_TOKENS}) AS cause_snippet "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match "
+            f"ORDER BY {_RANKING} LIMIT :limit"
+        ),
+        {"match": match, "limit": limit}
+    )
+    results = []
+    for row in result:
+        # Prefer the fragment that actually contains a highlighted term
+        snippet = row.solution_snippet if "«" in (row.solution_snippet or "") else row.cause_snippet
+        results.append(SearchResult(row.rowid, row.title, snippet or ""))
+    return results
+
+
+def _make_snippet(text_value: str, terms: List[str], width: int = 120) -> str:
+    """Fragment of text around the first matching term (LIKE fallback)"""
+    lowered = text_value.lower()
+    positions = [lowered.find(term) for term in terms]
+    positions = [p for p in positions if p >= 0]
+    if not positions:
+        return text_value[:width] + ("…" if len(text_value) > width else "")
+    start = max(0, min(positions) - width // 3)
+    fragment = text_value[start:start + width]
+    return ("…" if start else "") + fragment + ("…" if start + width < len(text_value) else "")
+
+
+async def _search_like(session: AsyncSession, user_id: int, terms: List[str], limit: int) -> List[SearchResult]:
+    columns = (Problem.title, Problem.root_cause, Problem.preview)
+    conditions = [
+        or_(*(column.ilike(f"%{term}%") for column in columns))
+        for term in terms
+    ]
+    result = await session.execute(
+        select(Problem.id, Problem.title, Problem.preview, Problem.root_cause)
+        .where(Problem.user_id == user_id, Problem.status == "solved", and_(*conditions))
+        .order_by(Problem.created_at.desc(), Problem.id.desc())
+        .limit(limit)
+    )
+    return [
+        SearchResult(row.id, row.title, _make_snippet(strip_markdown(row.preview or row.root_cause or ""), terms))
+        for row in result
+    ]
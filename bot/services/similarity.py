@@ -0,0 +1,254 @@
+"""
+Local similarity index over past problems.
+
+Problem texts are turned into hashed character n-gram TF-IDF vectors kept in
+a fixed-size NumPy matrix (ring buffer of the most recent solved problems).
+No external vector service: the index is rebuilt from the database on start
+and updated in-process when a solution is saved.
+
+The index is used to give Claude short, anonymized "patterns seen before"
+hints when a new problem is close to problems other users already solved.
+"""
+import math
+import random
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+import numpy as np
+import structlog
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.config import SIMILARITY_ENABLED, SIMILARITY_HINTS_RATE, SIMILARITY_MAX_ITEMS
+from bot.database.models import Problem
+from bot.services.metrics import registry
+from bot.utils.text import estimate_tokens, strip_markdown, truncate_at_sentence
+
+logger = structlog.get_logger(__name__)
+
+DEFAULT_DIMENSIONS = 2 ** 11
+NGRAM_SIZES = (3, 4, 5)
+# Only the beginning of a problem is used: it carries the gist and keeps hashing cheap
+MAX_TEXT_LENGTH = 600
+
+MIN_SCORE = 0.28
+# A hint is only given when the pattern was seen for at least this many other problems
+MIN_SUPPORT = 2
+MAX_HINTS = 3
+
+SIMILARITY_LOOKUPS = registry.counter(
+    "bot_similarity_lookups_total",
+    "Similarity index lookups before solution generation",
+    labelnames=("result",),
+)
+SIMILARITY_HINT_TOKENS = registry.counter(
+    "bot_similarity_hint_tokens_total",
+    "Estimated prompt tokens added by similarity hints",
+)
+
+_NON_WORD = re.compile(r"[^\w]+")
+_EMAIL = re.compile(r"\S+@\S+\.\w+")
+_URL = re.compile(r"https?://\S+")
+_MENTION = re.compile(r"@\w+")
+_NUMBER = re.compile(r"\d[\d\s\-()]{3,}\d")
+# Capitalized word in the middle of a sentence: most likely a name
+_NAME = re.compile(r"(?<=[\w,] )[A-ZА-ЯЁ][a-zа-яё]+")
+
+
+@dataclass
+class SimilarProblem:
+    """Index hit; insight is already anonymized"""
+    problem_id: int
+    score: float
+    insight: str
+
+
+def _normalize(text: str) -> str:
+    text = text[:MAX_TEXT_LENGTH].lower().replace("ё", "е")
+    return f" {_NON_WORD.sub(' ', text).strip()} "
+
+
+def vectorize(text: str, dimensions: int = DEFAULT_DIMENSIONS) -> np.ndarray:
+    """Log-scaled term frequencies of hashed character n-grams"""
+    codes = np.frombuffer(_normalize(text).encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    counts = np.zeros(dimensions, dtype=np.float32)
+    for size in NGRAM_SIZES:
+        windows = len(codes) - size + 1
+        if windows <= 0:
+            continue
+        # Polynomial rolling hash over all windows at once (stable across runs, unlike hash())
+        hashes = np.full(windows, size, dtype=np.int64)
+        for offset in range(size):
+            hashes = (hashes * 1000003 + codes[offset:offset + windows]) & 0xFFFFFFFF
+        counts += np.bincount(hashes % dimensions, minlength=dimensions).astype(np.float32)
+    return np.log1p(counts)
+
+
+def anonymize(text: str) -> str:
+    """Drop contact details, numbers and probable names from an insight"""
+    text = _EMAIL.sub("[email]", text)
+    text = _URL.sub("[ссылка]", text)
+    text = _MENTION.sub("[ник]", text)
+    text = _NUMBER.sub("[число]", text)
+    return _NAME.sub("[имя]", text)
+
+
+class SimilarityIndex:
+    """Ring buffer of TF vectors with document frequencies for IDF weighting"""
+
+    def __init__(self, max_items: int = 2000, dimensions: int = DEFAULT_DIMENSIONS):
+        self.max_items = max_items
+        self.dimensions = dimensions
+        self._tf = np.zeros((max_items, dimensions), dtype=np.float32)
+        # Squared TF kept alongside, so row norms need no per-query np.square
+        self._tf_sq = np.zeros((max_items, dimensions), dtype=np.float32)
+        self._df = np.zeros(dimensions, dtype=np.float32)
+        # Row norms depend on IDF, i.e. on every row: cached until add/remove
+        self._row_norms: Optional[np.ndarray] = None
+        self._problem_ids = np.full(max_items, -1, dtype=np.int64)
+        self._user_ids = np.full(max_items, -1, dtype=np.int64)
+        self._insights: List[Optional[str]] = [None] * max_items
+        self._size = 0
+        self._next = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, problem_id: int, user_id: int, text: str, insight: Optional[str]) -> None:
+        """Insert a solved problem, evicting the oldest one when full"""
+        vector = vectorize(text, self.dimensions)
+        slot = self._next
+        if self._problem_ids[slot] >= 0:
+            self._df -= self._tf[slot] > 0
+        self._tf[slot] = vector
+        self._tf_sq[slot] = vector * vector
+        self._df += vector > 0
+        self._row_norms = None
+        self._problem_ids[slot] = problem_id
+        self._user_ids[slot] = user_id
+        self._insights[slot] = insight
+        self._next = (slot + 1) % self.max_items
+        self._size = min(self._size + 1, self.max_items)
+
+    def remove(self, problem_ids: Iterable[int]) -> int:
+        """Drop problems (archived/deleted) from the index; returns count"""
+        slots = np.flatnonzero(np.isin(self._problem_ids[:self._size], list(problem_ids)))
+        for slot in slots:
+            # An empty slot scores 0 and is skipped by query(); add() reuses it in ring order
+            self._df -= self._tf[slot] > 0
+            self._tf[slot] = 0
+            self._tf_sq[slot] = 0
+            self._problem_ids[slot] = -1
+            self._user_ids[slot] = -1
+            self._insights[slot] = None
+        if len(slots):
+            self._row_norms = None
+        return len(slots)
+
+    def query(
+        self,
+        text: str,
+        limit: int = MAX_HINTS,
+        min_score: float = MIN_SCORE,
+        exclude_user_id: Optional[int] = None
+    ) -> List[SimilarProblem]:
+        """Most similar indexed problems by TF-IDF cosine, best first"""
+        if not self._size or limit <= 0:
+            return []
+
+        size = self._size
+        idf = np.log((1 + size) / (1 + self._df)) + 1
+        idf_sq = idf * idf
+        query = vectorize(text, self.dimensions)
+        query_norm = math.sqrt(float(np.dot(query * query, idf_sq)))
+        if not query_norm:
+            return []
+
+        if self._row_norms is None:
+            self._row_norms = np.maximum(np.sqrt(self._tf_sq[:size] @ idf_sq), 1e-12)
+        # cos(tf_i*idf, q*idf) without materializing the weighted matrix
+        scores = (self._tf[:size] @ (query * idf_sq)) / (self._row_norms * query_norm)
+        if exclude_user_id is not None:
+            scores[self._user_ids[:size] == exclude_user_id] = 0.0
+
+        # Only the top `limit` need ordering: partition first, then sort those
+        if limit < size:
+            candidates = np.argpartition(scores, -limit)[-limit:]
+        else:
+            candidates = np.arange(size)
+        candidates = candidates[np.argsort(scores[candidates])[::-1]]
+        return [
+            SimilarProblem(int(self._problem_ids[i]), float(scores[i]), self._insights[i])
+            for i in candidates
+            if scores[i] >= min_score and self._insights[i]
+        ]
+
+
+def prepare_insight(root_cause: Optional[str]) -> Optional[str]:
+    """Short anonymized version of a solution's core section"""
+    if not root_cause:
+        return None
+    return anonymize(truncate_at_sentence(strip_markdown(root_cause), 200, 50))
+
+
+def build_similarity_hint(matches: List[SimilarProblem]) -> Optional[str]:
+    """Prompt block with patterns seen before; None below MIN_SUPPORT matches"""
+    if len(matches) < MIN_SUPPORT:
+        return None
+    insights = list(dict.fromkeys(match.insight for match in matches))
+    return "\n".join(f"- {insight}" for insight in insights)
+
+
+async def load_similarity_index(session: AsyncSession, index: SimilarityIndex) -> int:
+    """Fill index with the most recent solved problems; returns count"""
+    result = await session.execute(
+        select(Problem.id, Problem.user_id, Problem.title, Problem.root_cause)
+        .where(Problem.status == "solved")
+        .order_by(Problem.id.desc())
+        .limit(index.max_items)
+    )
+    # Oldest first, so ring buffer eviction order matches insertion order
+    rows = list(result)[::-1]
+    for row in rows:
+        index.add(row.id, row.user_id, row.title, prepare_insight(row.root_cause))
+    return len(rows)
+
+
+# Shared in-process index, filled on startup (bot.main)
+similarity_index = SimilarityIndex(max_items=SIMILARITY_MAX_ITEMS)
+
+
+def similar_patterns_hint(problem_text: str, user_id: Optional[int]) -> Optional[str]:
+    """
+    Hint block for the solution prompt, or None.
+
+    Problems of the same user are skipped. SIMILARITY_HINTS_RATE < 1 keeps
+    a holdout group, so token usage of operation="solution" vs
+    "solution_hinted" can be compared in bot_claude_tokens_total.
+    """
+    if not SIMILARITY_ENABLED:
+        return None
+
+    hint = build_similarity_hint(similarity_index.query(problem_text, exclude_user_id=user_id))
+    if hint is None:
+        SIMILARITY_LOOKUPS.inc(result="no_match")
+        return None
+    if random.random() >= SIMILARITY_HINTS_RATE:
+        SIMILARITY_LOOKUPS.inc(result="holdout")
+        return None
+
+    SIMILARITY_LOOKUPS.inc(result="hint")
+    SIMILARITY_HINT_TOKENS.inc(estimate_tokens(hint))
+    return hint
+
+
+def remember_solution(problem_id: int, user_id: int, problem_text: str, root_cause: Optional[str]) -> None:
+    """Add a freshly solved problem to the shared index"""
+    if SIMILARITY_ENABLED:
+        similarity_index.add(problem_id, user_id, problem_text, prepare_insight(root_cause))
+
+
+def forget_problems(problem_ids: Iterable[int]) -> int:
+    """Remove archived problems from the shared index"""
+    return similarity_index.remove(problem_ids)
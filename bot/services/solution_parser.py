@@ -0,0 +1,131 @@
+"""
+Solution post-processing.
+
+Claude answers in a fixed structure (see PromptBuilder):
+🎯 В ЧЁМ СУТЬ / 💡 МЕХАНИЗМ / 📋 ПЛАН ДЕЙСТВИЙ / 🎯 ЧТО ИЗМЕНИТСЯ / ⚡ ПЛАН Б.
+The solution is parsed once at save time and stored as compact section data
+plus a ready-to-send plain-text preview for the history view.
+"""
+import json
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from bot.utils.text import prepare_problem_text
+
+# Heading line: section emoji, optional markdown, title in caps
+_HEADING = re.compile(r"^(?:🎯|💡|📋|⚡)\s*\**(?P<title>[^*\n]+?)\**\s*$", re.MULTILINE)
+
+# Heading keyword -> section key; "ПЛАН Б" must be checked before "ПЛАН"
+_SECTION_KEYWORDS = (
+    ("СУТЬ", "core"),
+    ("МЕХАНИЗМ", "mechanism"),
+    ("ПЛАН Б", "plan_b"),
+    ("ПЛАН", "plan"),
+    ("ИЗМЕНИТСЯ", "outcome"),
+)
+
+# First byte of stored solution data
+_FORMAT_JSON = b"\x00"
+_FORMAT_ZLIB = b"\x01"
+
+PREVIEW_PLAN_LENGTH = 1500
+
+
+@dataclass
+class SolutionSection:
+    """One part of the solution; heading is '' for text before the first heading"""
+    key: str  # 'core', 'mechanism', 'plan', 'outcome', 'plan_b', 'other'
+    heading: str
+    body: str
+
+
+@dataclass
+class SolutionSections:
+    """Parsed solution; to_text() rebuilds the text (whitespace-normalized)"""
+    sections: List[SolutionSection] = field(default_factory=list)
+
+    def get(self, key: str) -> Optional[str]:
+        for section in self.sections:
+            if section.key == key and section.body:
+                return section.body
+        return None
+
+    @property
+    def core(self) -> Optional[str]:
+        return self.get("core")
+
+    @property
+    def plan(self) -> Optional[str]:
+        return self.get("plan")
+
+    def to_text(self) -> str:
+        parts = []
+        for section in self.sections:
+            if section.heading:
+                parts.append(f"{section.heading}\n{section.body}" if section.body else section.heading)
+            elif section.body:
+                parts.append(section.body)
+        return "\n\n".join(parts)
+
+
+def _section_key(title: str) -> str:
+    title = title.upper()
+    for keyword, key in _SECTION_KEYWORDS:
+        if keyword in title:
+            return key
+    return "other"
+
+
+def parse_solution(text: str) -> SolutionSections:
+    """Split solution text into sections by heading lines"""
+    parsed = SolutionSections()
+    if not text:
+        return parsed
+
+    matches = list(_HEADING.finditer(text))
+    intro = text[:matches[0].start()] if matches else text
+    if intro.strip():
+        parsed.sections.append(SolutionSection("other", "", intro.strip()))
+
+    for index, match in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(text)
+        parsed.sections.append(SolutionSection(
+            key=_section_key(match.group("title")),
+            heading=match.group(0).strip(),
+            body=text[match.end():end].strip(),
+        ))
+    return parsed
+
+
+def encode_sections(parsed: SolutionSections, compress: bool = True) -> bytes:
+    """Serialize sections for the problems.solution_data column"""
+    payload = json.dumps(
+        [[s.key, s.heading, s.body] for s in parsed.sections],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    if compress:
+        return _FORMAT_ZLIB + zlib.compress(payload, 6)
+    return _FORMAT_JSON + payload
+
+
+def decode_sections(data: bytes) -> SolutionSections:
+    """Inverse of encode_sections()"""
+    marker, payload = data[:1], data[1:]
+    if marker == _FORMAT_ZLIB:
+        payload = zlib.decompress(payload)
+    elif marker != _FORMAT_JSON:
+        raise ValueError(f"Unknown solution data format: {marker!r}")
+    return SolutionSections([SolutionSection(*item) for item in json.loads(payload)])
+
+
+def build_preview(title: str, parsed: SolutionSections) -> str:
+    """Plain-text history view, computed once when the solution is saved"""
+    return prepare_problem_text(
+        title=title,
+        root_cause=parsed.core,
+        action_plan=parsed.plan or parsed.to_text(),
+        max_plan_length=PREVIEW_PLAN_LENGTH,
+    )
@@ -0,0 +1,200 @@
+"""
+Product counters for /stats and the admin JSON endpoint.
+
+Handlers and the renewal job call stats.record() (in memory, no I/O);
+every STATS_FLUSH_INTERVAL seconds the buffered increments are added to
+daily_stats with one upsert per key. Dashboards only read daily_stats, a
+few rows per day, so they answer instantly at any data size.
+
+DAU: users seen by a handler are buffered too; the flush moves
+users.last_active_on forward with one UPDATE ... RETURNING, so each user is
+counted once per day even across restarts.
+"""
+import asyncio
+import hmac
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, Set, Tuple
+
+import structlog
+from aiohttp import web
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from bot.config import STATS_API_TOKEN, STATS_FLUSH_INTERVAL
+from bot.database.models import DailyStat, User
+
+logger = structlog.get_logger(__name__)
+
+# Metric names (daily_stats.metric)
+ACTIVE_USERS = "active_users"
+NEW_USERS = "new_users"
+PROBLEMS_STARTED = "problems_started"
+PROBLEMS_SOLVED = "problems_solved"
+FIRST_PURCHASES = "first_purchases"
+PAYMENTS = "payments"  # dimension: provider
+REVENUE = "revenue"  # dimension: provider (RUB for yookassa, XTR for telegram_stars)
+SUBSCRIPTIONS_STARTED = "subscriptions_started"  # dimension: plan
+SUBSCRIPTIONS_RENEWED = "subscriptions_renewed"
+SUBSCRIPTIONS_ENDED = "subscriptions_ended"
+TOKENS = "tokens_{kind}"  # dimension: Claude operation
+
+PERIODS = {"today": 1, "7d": 7, "30d": 30}
+
+StatKey = Tuple[date, str, str]
+
+
+class StatsRollup:
+    """Buffered increments of daily_stats"""
+
+    def __init__(self):
+        self._pending: Counter = Counter()
+        self._active: Dict[date, Set[int]] = {}
+        self._seen: Set[int] = set()  # telegram ids already counted today by this process
+        self._seen_day: date = date.min
+
+    def record(self, metric: str, value: float = 1, dimension: str = "") -> None:
+        self._pending[(datetime.utcnow().date(), metric, dimension or "")] += value
+
+    def record_activity(self, telegram_id: int) -> None:
+        """Count the user for today's DAU (one DB write per user per day)"""
+        today = datetime.utcnow().date()
+        if today != self._seen_day:
+            self._seen, self._seen_day = set(), today
+        if telegram_id not in self._seen:
+            self._seen.add(telegram_id)
+            self._active.setdefault(today, set()).add(telegram_id)
+
+    def record_tokens(self, operation: str, usage) -> None:
+        """Claude usage block, same kinds as bot_claude_tokens_total"""
+        self.record(TOKENS.format(kind="input"), usage.input_tokens, operation)
+        self.record(TOKENS.format(kind="output"), usage.output_tokens, operation)
+        cache_read = getattr(usage, "cache_read_input_tokens", 0) or 0
+        if cache_read:
+            self.record(TOKENS.format(kind="cache_read"), cache_read, operation)
+
+    async def flush(self) -> None:
+        """Add buffered increments to daily_stats; kept in the buffer if the write fails"""
+        # Imported here: bot.database.crud records stats, and the engine module imports crud via migrations
+        from bot.database.engine import AsyncSessionLocal
+
+        pending, self._pending = self._pending, Counter()
+        active, self._active = self._active, {}
+        if not pending and not active:
+            return
+        try:
+            async with AsyncSessionLocal() as session:
+                for day, telegram_ids in active.items():
+                    result = await session.execute(
+                        update(User)
+                        .where(
+                            User.telegram_id.in_(telegram_ids),
+                            (User.last_active_on.is_(None)) | (User.last_active_on < day)
+                        )
+                        .values(last_active_on=day)
+                        .returning(User.id)
+                        .execution_options(synchronize_session=False)
+                    )
+                    counted = len(result.all())
+                    if counted:
+                        pending[(day, ACTIVE_USERS, "")] += counted
+
+                insert = pg_insert if session.bind.dialect.name == "postgresql" else sqlite_insert
+                for (day, metric, dimension), value in pending.items():
+                    statement = insert(DailyStat).values(day=day, metric=metric, dimension=dimension, value=value)
+                    await session.execute(statement.on_conflict_do_update(
+                        index_elements=["day", "metric", "dimension"],
+                        set_={"value": DailyStat.value + statement.excluded.value},
+                    ))
+                await session.commit()
+        except Exception:
+            self._pending.update(pending)
+            for day, telegram_ids in active.items():
+                self._active.setdefault(day, set()).update(telegram_ids)
+            raise
+
+
+def _period_start(days: int) -> date:
+    return datetime.utcnow().date() - timedelta(days=days - 1)
+
+
+async def get_dashboard() -> dict:
+    """Aggregates for today / 7 days / 30 days from daily_stats only"""
+    from bot.database.engine import AsyncSessionLocal
+
+    await stats.flush()
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(
+            select(DailyStat.day, DailyStat.metric, DailyStat.dimension, DailyStat.value)
+            .where(DailyStat.day >= _period_start(max(PERIODS.values())))
+        )).all()
+        subscriptions = dict((await session.execute(
+            select(DailyStat.metric, func.sum(DailyStat.value))
+            .where(DailyStat.metric.in_((SUBSCRIPTIONS_STARTED, SUBSCRIPTIONS_ENDED)))
+            .group_by(DailyStat.metric)
+        )).all())
+
+    dashboard = {
+        "generated_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "active_subscriptions": int(
+            (subscriptions.get(SUBSCRIPTIONS_STARTED) or 0) - (subscriptions.get(SUBSCRIPTIONS_ENDED) or 0)
+        ),
+        "periods": {},
+    }
+    for period, days in PERIODS.items():
+        start = _period_start(days)
+        totals: Counter = Counter()
+        by_dimension: Dict[str, Counter] = {}
+        active_by_day: Counter = Counter()
+        for day, metric, dimension, value in rows:
+            if day < start:
+                continue
+            totals[metric] += value
+            if dimension:
+                by_dimension.setdefault(metric, Counter())[dimension] += value
+            if metric == ACTIVE_USERS:
+                active_by_day[day] += value
+
+        started, solved = totals[PROBLEMS_STARTED], totals[PROBLEMS_SOLVED]
+        dashboard["periods"][period] = {
+            "dau": round(sum(active_by_day.values()) / days, 1),
+            "new_users": int(totals[NEW_USERS]),
+            "problems_started": int(started),
+            "problems_solved": int(solved),
+            "solve_rate": round(solved / started, 3) if started else None,
+            "first_purchases": int(totals[FIRST_PURCHASES]),
+            "conversion": round(totals[FIRST_PURCHASES] / totals[NEW_USERS], 3) if totals[NEW_USERS] else None,
+            "payments": {provider: int(count) for provider, count in by_dimension.get(PAYMENTS, {}).items()},
+            "revenue": dict(by_dimension.get(REVENUE, {})),
+            "subscriptions_started": int(totals[SUBSCRIPTIONS_STARTED]),
+            "subscriptions_renewed": int(totals[SUBSCRIPTIONS_RENEWED]),
+            "subscriptions_ended": int(totals[SUBSCRIPTIONS_ENDED]),
+            "tokens": {
+                kind: int(totals[TOKENS.format(kind=kind)]) for kind in ("input", "output", "cache_read")
+            },
+        }
+    return dashboard
+
+
+async def handle_stats_request(request: web.Request) -> web.Response:
+    """GET /stats on the metrics server; needs "Authorization: Bearer STATS_API_TOKEN" when the token is set"""
+    if STATS_API_TOKEN:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied, STATS_API_TOKEN):
+            return web.json_response({"error": "unauthorized"}, status=401)
+    return web.json_response(await get_dashboard())
+
+
+async def start_stats_flusher() -> None:
+    """Flush counters every STATS_FLUSH_INTERVAL seconds (supervisor daemon)"""
+    while True:
+        await asyncio.sleep(STATS_FLUSH_INTERVAL)
+        try:
+            await stats.flush()
+        except Exception:
+            logger.exception("stats_flush_failed")
+
+
+# Shared instance (handlers, crud, renewal job, bot.main)
+stats = StatsRollup()
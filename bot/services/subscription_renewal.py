@@ -22,7 +22,7 @@ async def check_and_renew_subscriptions(bot):
     Args:
         bot: Telegram bot instance for sending notifications
     """
-    logger.info("Starting subscription renewal check")
+    logger.info("renewal_check_started")
 
     try:
         async with AsyncSessionLocal() as session:
@@ -32,7 +32,7 @@ async def check_and_renew_subscriptions(bot):
             )
             subscriptions = result.scalars().all()
 
-            logger.info(f"Found {len(subscriptions)} active subscriptions")
+            logger.info("active_subscriptions_found", count=len(subscriptions))
 
             for subscription in subscriptions:
                 try:
@@ -61,7 +61,7 @@ async def _process_subscription(session: AsyncSession, subscription: Subscriptio
     user = result.scalar_one_or_none()
 
     if not user:
-        logger.warning(f"No user found for subscription {subscription.id}")
+        logger.warning("subscription_user_missing", subscription_id=subscription.id)
         return
 
     # Calculate days until renewal
@@ -70,18 +70,18 @@ async def _process_subscription(session: AsyncSession, subscription: Subscriptio
     # Send reminder 3 days before renewal
     if days_until_renewal == 3:
         await _send_renewal_reminder(bot, user, subscription, days=3)
-        logger.info(f"Sent 3-day reminder to user {user.telegram_id}")
+        logger.info("renewal_reminder_sent", telegram_id=user.telegram_id)
 
     # Send reminder on renewal day
     elif days_until_renewal == 0:
         await _send_renewal_request(bot, user, subscription)
-        logger.info(f"Sent renewal request to user {user.telegram_id}")
+        logger.info("renewal_request_sent", telegram_id=user.telegram_id)
 
     # Auto-cancel 3 days after expiration if not renewed
     elif days_until_renewal == -3:
         await cancel_subscription(session, subscription.id)
         await _send_cancellation_notice(bot, user, subscription)
-        logger.info(f"Auto-cancelled subscription for user {user.telegram_id}")
+        logger.info("subscription_auto_cancelled", telegram_id=user.telegram_id)
 
 
 async def _send_renewal_reminder(bot, user: User, subscription: Subscription, days: int):
@@ -99,7 +99,7 @@ async def _send_renewal_reminder(bot, user: User, subscription: Subscription, da
     try:
         await bot.send_message(user.telegram_id, text, parse_mode="HTML")
     except Exception as e:
-        logger.error(f"Failed to send reminder to {user.telegram_id}: {e}")
+        logger.error("renewal_reminder_failed", telegram_id=user.telegram_id, error=str(e))
 
 
 async def _send_renewal_request(bot, user: User, subscription: Subscription):
@@ -130,7 +130,7 @@ async def _send_renewal_request(bot, user: User, subscription: Subscription):
     try:
         await bot.send_message(user.telegram_id, text, reply_markup=keyboard, parse_mode="HTML")
     except Exception as e:
-        logger.error(f"Failed to send renewal request to {user.telegram_id}: {e}")
+        logger.error("renewal_request_failed", telegram_id=user.telegram_id, error=str(e))
 
 
 async def _send_cancellation_notice(bot, user: User, subscription: Subscription):
@@ -147,12 +147,12 @@ async def _send_cancellation_notice(bot, user: User, subscription: Subscription)
     try:
         await bot.send_message(user.telegram_id, text, parse_mode="HTML")
     except Exception as e:
-        logger.error(f"Failed to send cancellation notice to {user.telegram_id}: {e}")
+        logger.error("cancellation_notice_failed", telegram_id=user.telegram_id, error=str(e))
 
 
 async def start_renewal_scheduler(bot):
     """Start background task for subscription renewals (runs daily at 03:00 UTC)"""
-    logger.info("Starting subscription renewal scheduler")
+    logger.info("renewal_scheduler_starting")
 
     while True:
         try:
@@ -165,7 +165,7 @@ async def start_renewal_scheduler(bot):
                 next_run += timedelta(days=1)
 
             sleep_seconds = (next_run - now).total_seconds()
-            logger.info(f"Next renewal check scheduled in {sleep_seconds/3600:.1f} hours at {next_run}")
+            logger.info("renewal_check_scheduled", in_hours=round(sleep_seconds / 3600, 1), at=next_run.isoformat())
 
             # Sleep until next scheduled run
             await asyncio.sleep(sleep_seconds)
@@ -174,7 +174,7 @@ async def start_renewal_scheduler(bot):
             await check_and_renew_subscriptions(bot)
 
         except asyncio.CancelledError:
-            logger.info("Subscription renewal scheduler stopped")
+            logger.info("renewal_scheduler_stopped")
             break
         except Exception as e:
             logger.error("renewal_scheduler_error", error=str(e))
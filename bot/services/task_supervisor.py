@@ -0,0 +1,145 @@
+"""
+Owner of the bot's background tasks.
+
+Handlers offload side effects (referrer notifications, status message
+cleanup, cache pre-warm) with supervisor.spawn() instead of bare
+asyncio.create_task(). The supervisor keeps strong references, bounds how
+many of these run at once, logs failures and drains them on shutdown.
+
+Long-running loops (subscription renewal) are registered with
+start_daemon(): they are not limited by the semaphore and are cancelled
+last during drain().
+"""
+import asyncio
+from typing import Coroutine, Dict, Optional, Set
+
+import structlog
+
+from bot.config import BACKGROUND_TASK_CONCURRENCY
+from bot.services.metrics import registry
+
+logger = structlog.get_logger(__name__)
+
+BACKGROUND_TASKS = registry.gauge(
+    "bot_background_tasks",
+    "Background tasks owned by the supervisor",
+    labelnames=("state",),
+)
+BACKGROUND_TASK_RESULTS = registry.counter(
+    "bot_background_task_results_total",
+    "Finished background tasks",
+    labelnames=("task", "result"),
+)
+
+
+class TaskSupervisor:
+    """Bounded, observable fire-and-forget tasks with graceful drain"""
+
+    def __init__(self, max_concurrency: int = 20):
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+        self._daemons: Dict[str, asyncio.Task] = {}
+        self._running = 0
+        self._accepting = True
+
+    @property
+    def accepting(self) -> bool:
+        return self._accepting
+
+    def stats(self) -> Dict[str, int]:
+        """Current counts: queued (waiting for a slot), running, daemons"""
+        return {
+            "queued": len(self._tasks) - self._running,
+            "running": self._running,
+            "daemons": sum(1 for task in self._daemons.values() if not task.done()),
+        }
+
+    def _update_gauges(self) -> None:
+        for state, value in self.stats().items():
+            BACKGROUND_TASKS.set(value, state=state)
+
+    def spawn(self, coro: Coroutine, name: str) -> Optional[asyncio.Task]:
+        """
+        Run coro in the background; returns None if shutdown has started.
+
+        Failures are logged and counted, never raised to the caller.
+        """
+        if not self._accepting:
+            coro.close()
+            BACKGROUND_TASK_RESULTS.inc(task=name, result="rejected")
+            logger.warning("background_task_rejected", task=name, reason="shutting_down")
+            return None
+
+        task = asyncio.create_task(self._run(coro, name), name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self._update_gauges()
+        return task
+
+    async def _run(self, coro: Coroutine, name: str) -> None:
+        result = "ok"
+        try:
+            async with self._semaphore:
+                self._running += 1
+                self._update_gauges()
+                try:
+                    await coro
+                finally:
+                    self._running -= 1
+        except asyncio.CancelledError:
+            result = "cancelled"
+            raise
+        except Exception:
+            result = "error"
+            logger.exception("background_task_failed", task=name)
+        finally:
+            coro.close()  # no-op if it ran; avoids "never awaited" when cancelled while queued
+            BACKGROUND_TASK_RESULTS.inc(task=name, result=result)
+            # Done callback removes the task after this returns
+            asyncio.get_running_loop().call_soon(self._update_gauges)
+
+    def start_daemon(self, coro: Coroutine, name: str) -> asyncio.Task:
+        """Start a long-running loop; an unexpected exit is logged"""
+        task = asyncio.create_task(coro, name=name)
+        self._daemons[name] = task
+        task.add_done_callback(self._on_daemon_done)
+        self._update_gauges()
+        return task
+
+    def _on_daemon_done(self, task: asyncio.Task) -> None:
+        self._update_gauges()
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.error("daemon_failed", task=task.get_name(), error=repr(task.exception()))
+        elif self._accepting:
+            logger.warning("daemon_exited", task=task.get_name())
+
+    async def drain(self, timeout: float) -> None:
+        """
+        Stop accepting work, wait up to timeout for running tasks, cancel the rest.
+
+        Daemons are cancelled after the regular tasks finished or timed out.
+        """
+        self._accepting = False
+        pending = set(self._tasks)
+        if pending:
+            logger.info("draining_background_tasks", count=len(pending), timeout=timeout)
+            done, pending = await asyncio.wait(pending, timeout=timeout)
+        if pending:
+            logger.warning("background_tasks_cancelled", count=len(pending),
+                           tasks=sorted(task.get_name() for task in pending))
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        daemons = [task for task in self._daemons.values() if not task.done()]
+        for task in daemons:
+            task.cancel()
+        await asyncio.gather(*daemons, return_exceptions=True)
+        self._update_gauges()
+
+
+# Shared instance for handlers and bot.main
+supervisor = TaskSupervisor(max_concurrency=BACKGROUND_TASK_CONCURRENCY)
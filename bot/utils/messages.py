@@ -0,0 +1,139 @@
+"""Sending long Claude outputs to Telegram safely"""
+import re
+from typing import Awaitable, Callable, List, Optional
+
+import structlog
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message
+
+from bot.services.metrics import FORMATTING_FALLBACKS
+from bot.utils.text import strip_markdown, to_telegram_html
+
+logger = structlog.get_logger(__name__)
+
+# Telegram limit for message text, counted in UTF-16 code units after entity parsing
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# Solution sections start with these emojis (see PromptBuilder solution format)
+_SECTION_START = re.compile(r"\n+(?=🎯|💡|📋|⚡)")
+
+
+def _utf16_len(text: str) -> int:
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _hard_split(line: str, limit: int) -> List[str]:
+    """Split a single overlong line, preferring word boundaries"""
+    parts = []
+    while _utf16_len(line) > limit:
+        head = line[:limit]
+        surplus = _utf16_len(head) - limit
+        while surplus > 0:
+            # A char is at most two UTF-16 units
+            head = head[:len(head) - (surplus + 1) // 2]
+            surplus = _utf16_len(head) - limit
+        space = head.rfind(" ")
+        if space > limit // 2:
+            head = head[:space]
+        parts.append(head)
+        line = line[len(head):].lstrip(" ")
+    if line:
+        parts.append(line)
+    return parts
+
+
+def _split_piece(text: str, limit: int, separators: tuple) -> List[str]:
+    """Recursively split by paragraph, then line, then words until pieces fit"""
+    if _utf16_len(text) <= limit:
+        return [text]
+    if not separators:
+        return _hard_split(text, limit)
+
+    separator, rest = separators[0], separators[1:]
+    pieces = []
+    for part in text.split(separator):
+        pieces.extend(_split_piece(part, limit, rest))
+    return _pack(pieces, limit, separator)
+
+
+def _pack(pieces: List[str], limit: int, separator: str) -> List[str]:
+    """Greedily join pieces with separator while the result fits into limit"""
+    chunks: List[str] = []
+    current = ""
+    current_len = 0
+    separator_len = _utf16_len(separator)
+    for piece in pieces:
+        piece_len = _utf16_len(piece)
+        if current and current_len + separator_len + piece_len <= limit:
+            current += separator + piece
+            current_len += separator_len + piece_len
+        else:
+            if current:
+                chunks.append(current)
+            current, current_len = piece, piece_len
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def split_message(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    """
+    Split markdown text into chunks that fit into one Telegram message.
+
+    Prefers solution section boundaries (🎯/💡/📋/⚡), then paragraphs, lines
+    and words. Markdown entities never span lines, so every chunk can be
+    rendered on its own and stays balanced. Raw length is used as the
+    measure: it is never smaller than the visible text length.
+    """
+    if not text:
+        return []
+    if _utf16_len(text) <= limit:
+        return [text]
+
+    pieces = []
+    for section in _SECTION_START.split(text):
+        pieces.extend(_split_piece(section.strip("\n"), limit, ("\n\n", "\n")))
+    chunks = (chunk.strip("\n") for chunk in _pack(pieces, limit, "\n\n"))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+async def _send_chunk(send: Callable[..., Awaitable], chunk: str, **kwargs):
+    """Send one chunk as HTML, falling back to plain text if Telegram rejects it"""
+    try:
+        return await send(to_telegram_html(chunk), parse_mode="HTML", **kwargs)
+    except TelegramBadRequest as e:
+        if "can't parse entities" not in str(e).lower():
+            raise
+        logger.warning("message_html_rejected", error=str(e), length=len(chunk))
+        FORMATTING_FALLBACKS.inc()
+        return await send(strip_markdown(chunk), parse_mode=None, **kwargs)
+
+
+async def answer_formatted(message: Message, text: str, reply_markup=None) -> Optional[Message]:
+    """
+    Reply with Claude markdown text, split into as many messages as needed.
+
+    reply_markup is attached to the last chunk. Returns the last sent message.
+    """
+    chunks = split_message(text)
+    sent = None
+    for index, chunk in enumerate(chunks):
+        markup = reply_markup if index == len(chunks) - 1 else None
+        sent = await _send_chunk(message.answer, chunk, reply_markup=markup)
+    return sent
+
+
+async def edit_formatted(message: Message, text: str, reply_markup=None) -> Optional[Message]:
+    """
+    Replace a status message with Claude markdown text.
+
+    The first chunk goes into the edited message, the rest are sent as
+    new messages. reply_markup is attached to the last chunk.
+    """
+    chunks = split_message(text)
+    sent = None
+    for index, chunk in enumerate(chunks):
+        markup = reply_markup if index == len(chunks) - 1 else None
+        send = message.edit_text if index == 0 else message.answer
+        sent = await _send_chunk(send, chunk, reply_markup=markup)
+    return sent
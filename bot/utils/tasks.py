@@ -0,0 +1,17 @@
+"""Concurrency helpers for handlers (background work goes to bot.services.task_supervisor)"""
+import asyncio
+from typing import Any, Awaitable, List
+
+
+async def _await(call: Awaitable) -> Any:
+    return await call
+
+
+async def gather_calls(*calls: Awaitable) -> List[Any]:
+    """
+    asyncio.gather() for independent awaitables, results in argument order.
+
+    aiogram methods (message.answer(), callback.answer(), ...) are awaitable
+    models rather than coroutines and can't be passed to gather() directly.
+    """
+    return await asyncio.gather(*(_await(call) for call in calls))
@@ -1,7 +1,97 @@
 """Text utilities for safe message formatting"""
+import math
 import re
 from typing import Optional
 
+# One alternation, tried left to right at each position, so fenced code wins over
+# inline code and ** wins over *. Every branch starts with a literal character
+# (the \w lookbehind for _ comes after it), which lets the regex engine skip
+# plain text quickly; greedy unrolled loops instead of lazy .+? avoid per-char
+# backtracking. Code spans are literal; emphasis content is tokenized again to
+# support nesting (**bold with *italic* inside**). Bold may end with an italic
+# closer (**bold *it***, ***both***), and emphasis needs a non-space character
+# right inside its delimiters, so "x ** y ** z" stays plain text.
+_MARKDOWN_TOKEN = re.compile(
+    r"```(?:[^\n`]*\n)?(?P<pre>[^`]*(?:`(?!``)[^`]*)*)```"
+    r"|`(?P<code>[^`\n]+)`"
+    r"|\[(?P<link_text>[^\]\n]+)\]\((?P<link_url>[^)\s]+)\)"
+    r"|\*\*(?=\*?[^\s*])(?P<bold>[^*\n]*(?:\*(?:(?!\*)|(?=\*\*(?!\*)))[^*\n]*)*)(?<!\s)\*\*"
+    r"|__(?=[^\s_])(?P<bold_alt>[^_\n]+(?:_(?!_)[^_\n]*)*)(?<!\s)__"
+    r"|~~(?=[^\s~])(?P<strike>[^~\n]+)(?<!\s)~~"
+    r"|\*(?P<italic>[^\s*](?:[^*\n]*[^\s*])?)\*"
+    r"|_(?<!\w_)(?P<italic_alt>[^\s_](?:[^_\n]*[^\s_])?)_(?!\w)"
+)
+_MARKDOWN_CHARS = re.compile(r"[*_`~\[]")
+
+# Emphasis group name -> Telegram HTML tag / MarkdownV2 marker
+_HTML_TAGS = {"bold": "b", "bold_alt": "b", "italic": "i", "italic_alt": "i", "strike": "s"}
+_MARKDOWN_V2_MARKERS = {"bold": "*", "bold_alt": "*", "italic": "_", "italic_alt": "_", "strike": "~"}
+
+_MARKDOWN_V2_SPECIAL = re.compile(r"([_*\[\]()~`>#+\-=|{}.!\\])")
+_MARKDOWN_V2_CODE_SPECIAL = re.compile(r"([`\\])")
+_MARKDOWN_V2_URL_SPECIAL = re.compile(r"([)\\])")
+
+
+def _strip_token(match: re.Match) -> str:
+    kind = match.lastgroup
+    if kind == "link_url":
+        return _strip(match.group("link_text"))
+    if kind in _HTML_TAGS:
+        return _strip(match.group(kind))
+    return match.group(kind)
+
+
+def _strip(text: str) -> str:
+    if not _MARKDOWN_CHARS.search(text):
+        return text
+    return _MARKDOWN_TOKEN.sub(_strip_token, text)
+
+
+def _html_token(match: re.Match) -> str:
+    # Input is already HTML-escaped, only quotes in URLs need extra care
+    kind = match.lastgroup
+    if kind == "link_url":
+        url = match.group("link_url").replace('"', "&quot;")
+        return f'<a href="{url}">{_html(match.group("link_text"))}</a>'
+    tag = _HTML_TAGS.get(kind)
+    if tag:
+        return f"<{tag}>{_html(match.group(kind))}</{tag}>"
+    return f"<{kind}>{match.group(kind)}</{kind}>"
+
+
+def _html(text: str) -> str:
+    if not _MARKDOWN_CHARS.search(text):
+        return text
+    return _MARKDOWN_TOKEN.sub(_html_token, text)
+
+
+def _markdown_v2(text: str) -> str:
+    # Text between entities needs escaping, so walk the matches explicitly
+    parts = []
+    pos = 0
+    for match in _MARKDOWN_TOKEN.finditer(text):
+        parts.append(escape_markdown_v2(text[pos:match.start()]))
+        pos = match.end()
+
+        kind = match.lastgroup
+        if kind == "link_url":
+            url = _MARKDOWN_V2_URL_SPECIAL.sub(r"\\\1", match.group("link_url"))
+            parts.append(f"[{_markdown_v2(match.group('link_text'))}]({url})")
+        elif kind in _MARKDOWN_V2_MARKERS:
+            marker = _MARKDOWN_V2_MARKERS[kind]
+            parts.append(f"{marker}{_markdown_v2(match.group(kind))}{marker}")
+        else:
+            code = _MARKDOWN_V2_CODE_SPECIAL.sub(r"\\\1", match.group(kind))
+            parts.append(f"```\n{code}```" if kind == "pre" else f"`{code}`")
+
+    parts.append(escape_markdown_v2(text[pos:]))
+    return "".join(parts)
+
+
+def escape_markdown_v2(text: str) -> str:
+    """Escape all characters reserved by Telegram MarkdownV2"""
+    return _MARKDOWN_V2_SPECIAL.sub(r"\\\1", text)
+
 
 def strip_markdown(text: str) -> str:
     """
@@ -15,26 +105,26 @@ def strip_markdown(text: str) -> str:
     """
     if not text:
         return ""
+    return _strip(text)
 
-    # Remove bold (**text** or __text__)
-    text = re.sub(r'\*\*(.+?)\*\*', r'\1', text)
-    text = re.sub(r'__(.+?)__', r'\1', text)
-
-    # Remove italic (*text* or _text_)
-    text = re.sub(r'\*(.+?)\*', r'\1', text)
-    text = re.sub(r'_(.+?)_', r'\1', text)
 
-    # Remove strikethrough (~~text~~)
-    text = re.sub(r'~~(.+?)~~', r'\1', text)
+def to_telegram_html(text: str) -> str:
+    """
+    Convert Claude-style markdown to Telegram HTML (parse_mode="HTML").
 
-    # Remove code (`text` or ```text```)
-    text = re.sub(r'`(.+?)`', r'\1', text)
-    text = re.sub(r'```(.+?)```', r'\1', text, flags=re.DOTALL)
+    Everything outside of recognized entities is HTML-escaped, so the result
+    never fails to parse regardless of stray *, _ or < in the text.
+    """
+    if not text:
+        return ""
+    return _html(text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;"))
 
-    # Remove links [text](url)
-    text = re.sub(r'\[(.+?)\]\(.+?\)', r'\1', text)
 
-    return text
+def to_markdown_v2(text: str) -> str:
+    """Convert Claude-style markdown to escaped Telegram MarkdownV2"""
+    if not text:
+        return ""
+    return _markdown_v2(text)
 
 
 def truncate_at_sentence(text: str, max_length: int = 300, min_length: int = 100) -> str:
@@ -70,13 +160,19 @@ def truncate_at_sentence(text: str, max_length: int = 300, min_length: int = 100
     return cutoff_text + "..."
 
 
+def estimate_tokens(text: str) -> int:
+    """Rough token count for Russian text (~3 chars per token)"""
+    return math.ceil(len(text) / 3)
+
+
 def safe_format_text(text: str, parse_mode: Optional[str] = None) -> str:
     """
     Format text safely for Telegram, removing markdown if needed.
 
     Args:
         text: Input text
-        parse_mode: If None, strips markdown. If "HTML" or "Markdown", keeps it.
+        parse_mode: If None, strips markdown. "HTML" and "MarkdownV2" convert
+            markdown to that syntax; "Markdown" keeps text as is.
 
     Returns:
         Safe text for Telegram
@@ -93,6 +189,10 @@ def safe_format_text(text: str, parse_mode: Optional[str] = None) -> str:
     if parse_mode is None:
         # Escape HTML-like tags
         text = text.replace('<', '&lt;').replace('>', '&gt;')
+    elif parse_mode == "HTML":
+        text = to_telegram_html(text)
+    elif parse_mode == "MarkdownV2":
+        text = to_markdown_v2(text)
 
     return text
 
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Run the bot against SQLite and PostgreSQL and exercise the backend-specific code.
+
+For every backend, on a fresh database:
+1. scripts/migrate_db.py --yes creates the schema
+2. benchmarks.loadtest drives full user flows through the real dispatcher
+3. services that have per-dialect branches run over the loadtest data:
+   daily_stats upsert, events flush, search index rebuild, retention
+   (dry run, table sizes, vacuum), export, and the whole migration chain
+   applied again over the populated database (CONCURRENTLY indexes,
+   daily_stats backfill); a payment and a subscription are added first,
+   since loadtest users never pay
+
+PostgreSQL needs a server where the given role may create databases; a
+temporary bot_check_<pid> database is created and dropped afterwards.
+
+Usage:
+    python scripts/check_backends.py                         # SQLite only
+    python scripts/check_backends.py --postgres postgresql+asyncpg://postgres@localhost:5432/postgres
+    python scripts/check_backends.py --postgres ... --users 50 --keep
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Settings bot.config insists on; nothing here talks to Telegram or Claude
+BOT_ENV = {
+    "BOT_TOKEN": "123:check",
+    "CLAUDE_API_KEY": "check",
+    "YOOKASSA_SHOP_ID": "check",
+    "YOOKASSA_SECRET_KEY": "check",
+    "ENVIRONMENT": "production",
+    "METRICS_ENABLED": "false",
+}
+
+
+def run(cmd, database_url: str, cwd: Path) -> None:
+    env = dict(os.environ, **BOT_ENV, DATABASE_URL=database_url, PYTHONPATH=str(ROOT))
+    subprocess.run(cmd, cwd=cwd, env=env, check=True)
+
+
+async def exercise_services() -> None:
+    """Child process: DATABASE_URL points at a database the loadtest has filled"""
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import select, text
+
+    from bot.database.engine import AsyncSessionLocal, engine
+    from bot.database.migrations import LATEST_VERSION, get_schema_version, upgrade, verify_schema
+    from bot.database.models import Payment, Problem, Subscription, User
+    from bot.services import events as funnel
+    from bot.services.export import run_export
+    from bot.services.retention import incremental_vacuum, run_retention
+    from bot.services.search import rebuild_search_index, search_problems
+    from bot.services.stats import NEW_USERS, get_dashboard, stats
+
+    def ok(step: str, detail: str = "") -> None:
+        print(f"  ✓ {step}" + (f": {detail}" if detail else ""))
+
+    async with AsyncSessionLocal() as session:
+        user = (await session.execute(select(User).order_by(User.id).limit(1))).scalar_one()
+        problem = (await session.execute(select(Problem).where(Problem.user_id == user.id).limit(1))).scalar_one()
+        session.add(Payment(user_id=user.id, amount=100, currency="XTR", provider="telegram_stars",
+                            status="completed", package_type="starter"))
+        subscription = Subscription(plan="standard", price=300, solutions_per_month=10, discussion_limit=20,
+                                    next_billing_date=datetime.utcnow() + timedelta(days=30))
+        session.add(subscription)
+        await session.flush()
+        user.subscription_id = subscription.id
+        await session.commit()
+
+    # Two flushes of the same key: insert, then the ON CONFLICT update
+    for _ in range(2):
+        stats.record(NEW_USERS)
+        stats.record_activity(user.telegram_id)
+        await stats.flush()
+    dashboard = await get_dashboard()
+    ok("daily_stats upsert", f"{len(dashboard)} dashboard sections")
+
+    funnel.events.track(funnel.START, user.telegram_id, new=False)
+    ok("events flush", f"{await funnel.events.flush()} rows")
+
+    async with AsyncSessionLocal() as session:
+        indexed = await rebuild_search_index(session)
+        await session.commit()
+        found = await search_problems(session, user.id, problem.title.split()[0])
+    ok("search rebuild", f"{indexed} problems indexed, {len(found)} hits")
+
+    report = await run_retention(dry_run=True)
+    ok("retention dry run", f"{report.database_bytes['total']} bytes, {len(report.tables)} tables sized")
+    ok("incremental vacuum", f"{await incremental_vacuum(pause=0)} pages released")
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        exported = await run_export(Path(out_dir), full=True)
+        exported.update(await run_export(Path(out_dir)))
+    ok("export", ", ".join(f"{name} {rows}" for name, rows in exported.items()))
+
+    # Every migration again, over real rows: they must all be idempotent
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP TABLE schema_version"))
+        await conn.execute(text("DELETE FROM daily_stats"))  # lets v007 backfill again
+    applied = await upgrade(engine, log=lambda line: None)
+    async with engine.connect() as conn:
+        version = await get_schema_version(conn)
+    await verify_schema(engine)
+    ok("migrations rerun", f"{len(applied)} applied, schema version {version}/{LATEST_VERSION}")
+    await engine.dispose()
+
+
+async def create_database(server_url: str, name: str, drop: bool = False) -> str:
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    admin = create_async_engine(server_url, isolation_level="AUTOCOMMIT")
+    try:
+        async with admin.connect() as conn:
+            await conn.execute(text(f"DROP DATABASE IF EXISTS {name}"))
+            if not drop:
+                await conn.execute(text(f"CREATE DATABASE {name}"))
+    finally:
+        await admin.dispose()
+    return server_url.rsplit("/", 1)[0] + f"/{name}"
+
+
+def check_backend(label: str, database_url: str, users: int, workdir: Path) -> None:
+    print(f"\n🗄  {label}: {database_url}")
+    started = time.perf_counter()
+
+    run([sys.executable, str(ROOT / "scripts" / "migrate_db.py"), "--yes"], database_url, workdir)
+
+    report_path = workdir / "loadtest.json"
+    run([sys.executable, "-m", "benchmarks.loadtest", "--users", str(users),
+         "--database-url", database_url, "--json", str(report_path)], database_url, workdir)
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    if report["errors"] or report["completed_flows"] != users:
+        raise RuntimeError(f"loadtest: {report['completed_flows']}/{users} flows, errors {report['errors']}")
+    print(f"  ✓ loadtest: {users} flows, {report['updates_per_second']:.1f} updates/s")
+
+    run([sys.executable, str(Path(__file__).resolve()), "--services"], database_url, workdir)
+    print(f"✅ {label} ok ({time.perf_counter() - started:.1f}s)")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the bot against SQLite and PostgreSQL")
+    parser.add_argument("--postgres", help="Server URL (postgresql+asyncpg://user@host:port/maintenance_db)")
+    parser.add_argument("--users", type=int, default=20, help="Loadtest users per backend (default: 20)")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary databases")
+    parser.add_argument("--services", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.services:
+        asyncio.run(exercise_services())
+        return 0
+
+    workdir = Path(tempfile.mkdtemp(prefix="bot-check-"))
+    pg_name = f"bot_check_{os.getpid()}"
+    try:
+        check_backend("SQLite", f"sqlite+aiosqlite:///{workdir / 'check.db'}", args.users, workdir)
+        if args.postgres:
+            database_url = asyncio.run(create_database(args.postgres, pg_name))
+            check_backend("PostgreSQL", database_url, args.users, workdir)
+        else:
+            print("\n⚠️  PostgreSQL skipped (pass --postgres)")
+    except (subprocess.CalledProcessError, RuntimeError) as e:
+        print(f"💥 {e}")
+        return 1
+    finally:
+        if args.postgres and not args.keep:
+            asyncio.run(create_database(args.postgres, pg_name, drop=True))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -70,12 +70,7 @@ else
 fi
 
 echo "Шаг 7/8: Инициализация базы данных..."
-python << EOF
-import asyncio
-from bot.database.engine import init_db
-asyncio.run(init_db())
-print("База данных инициализирована успешно!")
-EOF
+python scripts/migrate_db.py --yes
 
 echo "Шаг 8/8: Настройка systemd service..."
 cp "$INSTALL_DIR/problem-solver-bot.service" "/etc/systemd/system/$SERVICE_NAME.service"
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Export analytics tables (users, problems, payments, subscriptions, referrals)
+to CSV or Parquet, see bot/services/export.py.
+
+Streams rows in chunks, so it can run next to the bot. Without --full only
+rows changed since the previous run are exported (watermarks in
+<out-dir>/export_state.json).
+
+Usage:
+    python scripts/export_data.py                          # incremental CSV into ./exports
+    python scripts/export_data.py --full --format parquet  # everything, needs pyarrow
+    python scripts/export_data.py --tables payments,subscriptions --since 2025-01-01
+"""
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.database.engine import engine
+from bot.services.export import DEFAULT_CHUNK_SIZE, EXPORT_TABLES, FORMATS, run_export
+
+
+async def main(args) -> None:
+    tables = args.tables.split(",") if args.tables else list(EXPORT_TABLES)
+    unknown = [name for name in tables if name not in EXPORT_TABLES]
+    if unknown:
+        raise SystemExit(f"❌ Unknown tables: {', '.join(unknown)} (available: {', '.join(EXPORT_TABLES)})")
+
+    since = datetime.fromisoformat(args.since) if args.since else None
+    out_dir = Path(args.out_dir)
+    print(f"📤 Exporting {', '.join(tables)} → {out_dir} ({args.format})")
+    try:
+        exported = await run_export(
+            out_dir, args.format, tables, full=args.full, since=since, chunk_size=args.chunk_size
+        )
+    except ImportError:
+        raise SystemExit("❌ Parquet needs pyarrow: pip install pyarrow")
+    finally:
+        await engine.dispose()
+
+    for name, rows in exported.items():
+        print(f"   • {name}: {rows} rows")
+    print("✅ Done")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export analytics tables")
+    parser.add_argument("--out-dir", default="exports", help="Output directory (default: exports)")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--tables", help=f"Comma-separated subset of: {', '.join(EXPORT_TABLES)}")
+    parser.add_argument("--full", action="store_true", help="Ignore watermarks, export all rows")
+    parser.add_argument("--since", help="Export rows changed after this UTC time (ISO), overrides watermarks")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per fetch")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Run data retention now (the bot also runs it daily, see bot/services/retention.py).
+
+Old problems and payments are moved to archived_records (compressed),
+old sessions are deleted, in short batches, so it can run next to the bot.
+
+Usage:
+    python scripts/retention.py --dry-run                   # what would be removed + table sizes
+    python scripts/retention.py                             # apply policies from .env (RETENTION_*)
+    python scripts/retention.py --enable-incremental-vacuum # one-off VACUUM so freed space shrinks the file
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.database.engine import engine
+from bot.services.retention import RetentionReport, configured_policies, enable_incremental_vacuum, run_retention
+
+
+def _format_bytes(value: int) -> str:
+    return f"{value / (1024 * 1024):.1f} MB"
+
+
+def print_report(report: RetentionReport, dry_run: bool) -> None:
+    policies = {policy.name: policy for policy in configured_policies()}
+    print("🗂  Policies:")
+    for name, policy in policies.items():
+        if policy.max_age_days <= 0:
+            print(f"   • {name}: disabled")
+            continue
+        verb = "expired" if dry_run else ("archived" if policy.archive else "deleted")
+        print(f"   • {name} (> {policy.max_age_days} days, {policy.action}): {report.removed.get(name, 0)} {verb}")
+
+    if not dry_run:
+        print(f"🧹 Pages released by incremental_vacuum: {report.released_pages}")
+
+    print("📊 Tables:")
+    for name, size in sorted(report.tables.items(), key=lambda item: -item[1].get("bytes", item[1]["rows"])):
+        size_text = f", {_format_bytes(size['bytes'])}" if "bytes" in size else ""
+        print(f"   • {name}: {size['rows']} rows{size_text}")
+    if report.database_bytes.get("total"):
+        print(f"💾 Database: {_format_bytes(report.database_bytes['total'])}"
+              f" (free inside the file: {_format_bytes(report.database_bytes['free'])})")
+
+
+async def main(args) -> None:
+    if args.enable_incremental_vacuum:
+        print("⏳ VACUUM with auto_vacuum=INCREMENTAL (rewrites the whole file)...")
+        await enable_incremental_vacuum()
+        print("✅ Done")
+    else:
+        report = await run_retention(dry_run=args.dry_run)
+        print_report(report, args.dry_run)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive/delete old rows")
+    parser.add_argument("--dry-run", action="store_true", help="Only count expired rows and show table sizes")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="Switch an existing SQLite file to auto_vacuum=INCREMENTAL (full VACUUM)")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        print("\n❌ Cancelled (finished batches stay applied).")
+        sys.exit(1)
@@ -25,25 +25,28 @@ if [ ! -d "$INSTALL_DIR" ]; then
     exit 1
 fi
 
-echo "Шаг 1/5: Остановка бота..."
+echo "Шаг 1/6: Остановка бота..."
 systemctl stop "$SERVICE_NAME"
 
-echo "Шаг 2/5: Обновление кода из Git..."
+echo "Шаг 2/6: Обновление кода из Git..."
 cd "$INSTALL_DIR"
 git pull origin main
 
-echo "Шаг 3/5: Обновление зависимостей..."
+echo "Шаг 3/6: Обновление зависимостей..."
 source venv/bin/activate
 pip install --upgrade pip
 pip install -r requirements.txt
 
-echo "Шаг 4/5: Обновление systemd service (если изменился)..."
+echo "Шаг 4/6: Миграции базы данных..."
+python scripts/migrate_db.py --yes
+
+echo "Шаг 5/6: Обновление systemd service (если изменился)..."
 if [ -f "$INSTALL_DIR/problem-solver-bot.service" ]; then
     cp "$INSTALL_DIR/problem-solver-bot.service" "/etc/systemd/system/$SERVICE_NAME.service"
     systemctl daemon-reload
 fi
 
-echo "Шаг 5/5: Запуск бота..."
+echo "Шаг 6/6: Запуск бота..."
 systemctl start "$SERVICE_NAME"
 
 echo ""